@@ -1,5 +1,9 @@
-from google.cloud import bigquery
 import csv
+import argparse
+
+import dd_paths  # noqa: F401
+from bigquery_client import query_to_rows
+from query_cache import get_query_cache
 
 # Configurable experiment tags list
 EXPERIMENT_TAGS = [
@@ -16,12 +20,13 @@ EXPERIMENT_TAGS = [
     'up_funnel_prof_sub_no_bgc_missed'
 ]
 
-def analyze_experiment_eligibility(tags_to_analyze=None):
+def analyze_experiment_eligibility(tags_to_analyze=None, use_cache=True):
     """
     Analyze why leads from run_opportunity_query (no experiment) are not eligible for experiment tags
     
     Args:
         tags_to_analyze: List of experiment tags to analyze. If None, uses default list.
+        use_cache: If False, ignore the local result cache and query BigQuery.
     """
     if tags_to_analyze is None:
         tags_to_analyze = EXPERIMENT_TAGS
@@ -93,27 +98,13 @@ def analyze_experiment_eligibility(tags_to_analyze=None):
     """
     
     try:
-        # Initialize BigQuery client
-        client = bigquery.Client(project="getsaleswarehouse")
-        print("Connected to BigQuery")
-        
         # Run query
         print("Executing eligibility analysis query...")
-        query_job = client.query(query)
-        results = query_job.result()
-        
-        # Convert to list first to avoid pandas dependency issues
-        rows = []
-        schema = results.schema
-        
-        for row in results:
-            rows.append(dict(row))
+        rows, columns = query_to_rows(query, use_cache=use_cache, label="experiment eligibility")
         
         print(f"Query successful! Retrieved {len(rows)} leads without experiments")
         
         if len(rows) > 0:
-            # Get column names from schema
-            columns = [field.name for field in schema]
             print(f"Columns: {columns}")
             
             print("\\nFirst 10 rows:")
@@ -205,8 +196,13 @@ def update_experiment_tags(new_tags):
     print(f"Updated experiment tags list to: {new_tags}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze experiment eligibility for leads without experiments")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and query BigQuery")
+    args = parser.parse_args()
+    
     # Run the analysis
-    results = analyze_experiment_eligibility()
+    results = analyze_experiment_eligibility(use_cache=not args.no_cache)
+    get_query_cache().report()
     
     # Example of how to customize tags:
     # custom_tags = ['instant_dash_bgc_pass_approved_no_delivery', 'dropshipping_approved_no_delivery']
@@ -0,0 +1,14 @@
+"""
+DD Paths - Puts the shared FGS modules (shared/) on sys.path
+Scripts in this folder import it before the BigQuery client or query cache: import dd_paths  # noqa: F401
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# FGS/shared, three levels up from DD Analysis/Data/Scripts
+SHARED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(SCRIPTS_DIR))), 'shared')
+
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
@@ -1,12 +1,16 @@
-import sys
-import os
-sys.path.append('/Users/MacFGS/Machine/gsi_ai_analysis/SMS Analysis/DDOK/scripts')
+import argparse
+import dd_paths  # noqa: F401
 
 from bigquery_client import query_to_dataframe
+from query_cache import get_query_cache
 import pandas as pd
 
 def main():
     """Run opportunity query and save results"""
+    parser = argparse.ArgumentParser(description="Run the opportunity query")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and query BigQuery")
+    args = parser.parse_args()
+    
     query = """
     select
     opportunity_uuid
@@ -19,7 +23,7 @@ def main():
     """
     
     print("Executing opportunity query...")
-    df = query_to_dataframe(query)
+    df = query_to_dataframe(query, use_cache=not args.no_cache)
     
     if df is not None:
         print(f"Query successful! Retrieved {len(df)} rows")
@@ -32,6 +36,7 @@ def main():
         print(f"\nResults saved to {output_file}")
     else:
         print("Query failed")
+    get_query_cache().report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
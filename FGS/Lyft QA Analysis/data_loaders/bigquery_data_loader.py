@@ -8,18 +8,39 @@ import pandas as pd
 import numpy as np
 from google.cloud import bigquery
 from pathlib import Path
+from datetime import datetime, timezone
 import logging
 from typing import Dict, List, Optional
 
+import lyft_paths  # noqa: F401
+from columnar_store import parse_bool
+from conversion_cube import ConversionCube
+from incremental_store import IncrementalStore, read_text_csv, window_month
+from bigquery_client import get_bigquery_client
+from query_cache import cache_key, get_query_cache
+# One change-detection predicate for every opportunity extract
+from bigquery_manual_loader import OPPORTUNITY_CHANGED_SINCE
+
 logger = logging.getLogger(__name__)
 
 class BigQueryDataLoader:
     def __init__(self, project_id: str = None):
-        """Initialize BigQuery client"""
-        self.client = bigquery.Client(project=project_id)
+        """Use the process-wide BigQuery client for project_id (created on first query)"""
+        self.project_id = project_id
+    
+    @property
+    def client(self):
+        """Shared BigQuery client for project_id"""
+        return get_bigquery_client(self.project_id)
     
-    def fetch_opportunity_data(self) -> pd.DataFrame:
-        """Fetch opportunity data from BigQuery"""
+    def fetch_opportunity_data(self, incremental: bool = False, use_cache: bool = True) -> pd.DataFrame:
+        """Fetch opportunity data from BigQuery
+        
+        incremental=True keeps the month in the local store (data/store/opportunity_metrics/) and
+        only fetches opportunities first contacted, converted or approved since the last run,
+        upserting them by opportunity_uuid. The first run of a month is a full load.
+        Otherwise a fresh cached result of the same query is reused (use_cache=False re-queries).
+        """
         
         query = """
         select
@@ -36,14 +57,45 @@ class BigQueryDataLoader:
           then if(date_diff(date(approved_date) , application_date , day) <= 30 , 'true' , 'false')
           end upfunnel_next_step_conversion
         from `getsaleswarehouse.gsi_mart_lyft.lyft_dim_opp` 
-        where date_trunc(date(first_contacted_date_time_c) , month) = date_trunc(date_sub(current_date , interval 1 month) , month)
+        where date_trunc(date(first_contacted_date_time_c) , month) = date_trunc(date_sub(current_date , interval 1 month) , month){changed_since}
         """
         
-        logger.info("Fetching opportunity data from BigQuery...")
+        store = IncrementalStore('opportunity_metrics', ['opportunity_uuid'])
+        partition = window_month()
+        changed_since = store.changed_since(partition) if incremental else None
+        
+        job_config = None
+        if changed_since is not None:
+            logger.info(f"Fetching opportunity data changed since {changed_since} from BigQuery...")
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter('changed_since', 'DATE', changed_since)
+            ])
+        else:
+            logger.info("Fetching opportunity data from BigQuery...")
+        query = query.format(changed_since=OPPORTUNITY_CHANGED_SINCE if changed_since is not None else '')
         
         try:
-            df = self.client.query(query).to_dataframe()
-            logger.info(f"Fetched {len(df)} opportunity records")
+            started_at = datetime.now(timezone.utc)
+            query_cache, key = get_query_cache(), cache_key(query)
+            df = query_cache.get(key, label="opportunity metrics") if use_cache and not incremental else None
+            
+            if df is not None:
+                # Dates come back from the cache as their text
+                df['first_contact_date'] = pd.to_datetime(df['first_contact_date']).dt.date
+            else:
+                df = self.client.query(query, job_config=job_config).to_dataframe()
+                logger.info(f"Fetched {len(df)} opportunity records")
+                if not incremental:
+                    query_cache.put(key, df, label="opportunity metrics")
+            
+            if incremental:
+                # The stored month, typed like a fresh to_dataframe() fetch
+                store.merge(partition, df, started_at, replace=changed_since is None)
+                df = read_text_csv(store.partition_path(partition))
+                df['first_contact_date'] = pd.to_datetime(df['first_contact_date']).dt.date
+                df['full_conversion'] = parse_bool(df['full_conversion'])
+                logger.info(f"Stored month holds {len(df)} opportunity records")
+            
             return df
         except Exception as e:
             logger.error(f"Error fetching BigQuery data: {e}")
@@ -57,51 +109,46 @@ class BigQueryDataLoader:
         # Define performance groups
         performance_groups = ['experiment', 'language', 'first_contact_method']
         
+        # Roll the conversion cube up to the populated groups only (no cartesian product of unique values)
+        groups = ConversionCube.from_raw(df).rollup(performance_groups)
+        
+        # Keep the first-appearance order of each dimension's values
+        order = [pd.Categorical(groups.index.get_level_values(dim), categories=df[dim].dropna().unique()).codes for dim in performance_groups]
+        groups = groups.iloc[np.lexsort(order[::-1])].reset_index()
+        
         # Calculate conversion rates by group
         metrics_list = []
         
-        for experiment in df['experiment'].unique():
-            for language in df['language'].unique():
-                for contact_method in df['first_contact_method'].unique():
-                    
-                    # Filter data for this combination
-                    subset = df[
-                        (df['experiment'] == experiment) & 
-                        (df['language'] == language) & 
-                        (df['first_contact_method'] == contact_method)
-                    ]
-                    
-                    if len(subset) == 0:
-                        continue
-                    
-                    # Calculate full conversion rate
-                    total_opps = len(subset)
-                    full_conversions = subset['full_conversion'].sum()
-                    full_conversion_rate = full_conversions / total_opps if total_opps > 0 else 0
-                    
-                    # Calculate upfunnel conversion rate (where applicable)
-                    upfunnel_subset = subset[subset['upfunnel_next_step_conversion'] != 'n/a']
-                    upfunnel_conversions = len(upfunnel_subset[upfunnel_subset['upfunnel_next_step_conversion'] == 'true'])
-                    upfunnel_total = len(upfunnel_subset)
-                    upfunnel_conversion_rate = upfunnel_conversions / upfunnel_total if upfunnel_total > 0 else 0
-                    
-                    # Create unique identifier for this performance group
-                    rep_id = f"{experiment}_{language}_{contact_method}".replace(' ', '_').replace('-', '_')
-                    
-                    metrics_list.append({
-                        'rep_id': rep_id,
-                        'rep_name': f"{experiment} - {language} - {contact_method}",
-                        'experiment': experiment,
-                        'language': language,
-                        'first_contact_method': contact_method,
-                        'total_opportunities': total_opps,
-                        'full_conversions': full_conversions,
-                        'full_conversion_rate': full_conversion_rate,
-                        'upfunnel_conversions': upfunnel_conversions,
-                        'upfunnel_total': upfunnel_total,
-                        'upfunnel_conversion_rate': upfunnel_conversion_rate,
-                        'primary_conversion_rate': full_conversion_rate  # Use full conversion as primary metric
-                    })
+        for group in groups.itertuples(index=False):
+            experiment, language, contact_method = group.experiment, group.language, group.first_contact_method
+            
+            # Calculate full conversion rate
+            total_opps = group.opportunities
+            full_conversions = group.conversions
+            full_conversion_rate = full_conversions / total_opps if total_opps > 0 else 0
+            
+            # Calculate upfunnel conversion rate (where applicable)
+            upfunnel_conversions = group.upfunnel_conversions
+            upfunnel_total = group.upfunnel_total
+            upfunnel_conversion_rate = upfunnel_conversions / upfunnel_total if upfunnel_total > 0 else 0
+            
+            # Create unique identifier for this performance group
+            rep_id = f"{experiment}_{language}_{contact_method}".replace(' ', '_').replace('-', '_')
+            
+            metrics_list.append({
+                'rep_id': rep_id,
+                'rep_name': f"{experiment} - {language} - {contact_method}",
+                'experiment': experiment,
+                'language': language,
+                'first_contact_method': contact_method,
+                'total_opportunities': total_opps,
+                'full_conversions': full_conversions,
+                'full_conversion_rate': full_conversion_rate,
+                'upfunnel_conversions': upfunnel_conversions,
+                'upfunnel_total': upfunnel_total,
+                'upfunnel_conversion_rate': upfunnel_conversion_rate,
+                'primary_conversion_rate': full_conversion_rate  # Use full conversion as primary metric
+            })
         
         metrics_df = pd.DataFrame(metrics_list)
         
@@ -225,6 +272,15 @@ class BigQueryDataLoader:
 def main():
     """Main data loading workflow"""
     
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch Lyft opportunity performance data from BigQuery')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fetch only opportunities changed since the last run and upsert them into data/store/')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached query results and query BigQuery')
+    args = parser.parse_args()
+    
     # Initialize BigQuery loader
     loader = BigQueryDataLoader()
     
@@ -233,7 +289,8 @@ def main():
     
     try:
         # Fetch opportunity data
-        opp_df = loader.fetch_opportunity_data()
+        opp_df = loader.fetch_opportunity_data(incremental=args.incremental, use_cache=not args.no_cache)
+        get_query_cache().report()
         
         # Calculate performance metrics
         metrics_df = loader.calculate_performance_metrics(opp_df)
@@ -5,19 +5,53 @@ Processes BigQuery results manually and saves to CSV
 """
 
 from google.cloud import bigquery
-import csv
 import pandas as pd
 from collections import defaultdict
+from datetime import datetime, timezone
 import logging
+from result_pages import PAGE_SIZE, cached_results_to_csv, stream_results_to_csv
+import os
+
+import lyft_paths  # noqa: F401
+from columnar_store import RAW_DATA_SCHEMA, parse_bool, write_columnar_store
+from incremental_store import IncrementalStore, read_text_csv, window_month
+from bigquery_client import get_bigquery_client
+from query_cache import cache_key, get_query_cache
 
 logger = logging.getLogger(__name__)
 
+RAW_DATA_COLUMNS = [
+    'opportunity_uuid', 'language', 'experiment', 'first_contact_date',
+    'owner_username', 'owner_name', 'first_contact_method', 
+    'full_conversion', 'upfunnel_next_step_conversion', 
+    'what_are_your_goals_or_motivations_to_start_driving_for_lyft',
+    'what_else_do_you_need_to_submit', 'estimated_bgc_date', 'additional_notes'
+]
+
+# Incremental loads re-read only opportunities first contacted, converted or approved since the watermark
+OPPORTUNITY_CHANGED_SINCE = """
+        and (date(first_contacted_date_time_c) >= @changed_since
+          or date(first_ride_at) >= @changed_since
+          or date(approved_date) >= @changed_since)"""
+
 class ManualBigQueryLoader:
     def __init__(self, project_id: str = "getsaleswarehouse"):
-        self.client = bigquery.Client(project=project_id)
+        self.project_id = project_id
+    
+    @property
+    def client(self):
+        """Shared BigQuery client for project_id"""
+        return get_bigquery_client(self.project_id)
     
-    def fetch_and_save_opportunity_data(self, output_file: str = "data/bigquery_raw_data.csv"):
-        """Fetch opportunity data and save to CSV manually"""
+    def fetch_and_save_opportunity_data(self, output_file: str = "data/bigquery_raw_data.csv", page_size: int = PAGE_SIZE,
+                                        incremental: bool = False, use_cache: bool = True):
+        """Fetch opportunity data and stream it to CSV page by page
+        
+        incremental=True keeps the month in the local store (data/store/opportunities/) and only
+        fetches opportunities changed since the last run, upserting them by opportunity_uuid so
+        late conversions overwrite the stored row. The first run of a month is a full load.
+        Otherwise a fresh cached result of the same query is reused (use_cache=False re-queries).
+        """
         
         query = """
         with notes as (
@@ -56,47 +90,47 @@ class ManualBigQueryLoader:
         ,coalesce(additional_notes , 'ignore question 4') additional_notes
         from `getsaleswarehouse.gsi_mart_lyft.lyft_dim_opp` l 
         left join notes n on l.opportunity_uuid = n.opportunity_uuid 
-        where date_trunc(date(first_contacted_date_time_c) , month) = date_trunc(date_sub(current_date , interval 1 month) , month)
+        where date_trunc(date(first_contacted_date_time_c) , month) = date_trunc(date_sub(current_date , interval 1 month) , month){changed_since}
         """
         
-        print("🔄 Fetching opportunity data from BigQuery...")
+        store = IncrementalStore('opportunities', ['opportunity_uuid'])
+        partition = window_month()
+        changed_since = store.changed_since(partition) if incremental else None
+        
+        job_config = None
+        if changed_since is not None:
+            print(f"🔄 Fetching opportunities changed since {changed_since} from BigQuery...")
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter('changed_since', 'DATE', changed_since)
+            ])
+        else:
+            print("🔄 Fetching opportunity data from BigQuery...")
+        query = query.format(changed_since=OPPORTUNITY_CHANGED_SINCE if changed_since is not None else '')
         
         try:
-            query_job = self.client.query(query)
-            results = query_job.result()
+            started_at = datetime.now(timezone.utc)
             
-            # Save to CSV manually
-            with open(output_file, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Write header
-                writer.writerow([
-                    'opportunity_uuid', 'language', 'experiment', 'first_contact_date',
-                    'owner_username', 'owner_name', 'first_contact_method', 
-                    'full_conversion', 'upfunnel_next_step_conversion', 
-                    'what_are_your_goals_or_motivations_to_start_driving_for_lyft',
-                    'what_else_do_you_need_to_submit', 'estimated_bgc_date', 'additional_notes'
-                ])
+            if not incremental:
+                # Stream each result page straight to disk (or write back a fresh cached result)
+                row_count = cached_results_to_csv(
+                    lambda: self.client.query(query).result(page_size=page_size),
+                    output_file, RAW_DATA_COLUMNS, get_query_cache(), cache_key(query),
+                    label="opportunity records", use_cache=use_cache
+                )
+            else:
+                # Stream the changed rows to a staging file, then upsert them into the stored month
+                fetch_file = store.staging_path(partition)
+                os.makedirs(os.path.dirname(fetch_file), exist_ok=True)
+                results = self.client.query(query, job_config=job_config).result(page_size=page_size)
+                stream_results_to_csv(results, fetch_file, RAW_DATA_COLUMNS, label="opportunity records")
                 
-                # Write data rows
-                row_count = 0
-                for row in results:
-                    writer.writerow([
-                        row.opportunity_uuid,
-                        row.language,
-                        row.experiment,
-                        str(row.first_contact_date) if row.first_contact_date else '',
-                        row.owner_username,
-                        row.owner_name,
-                        row.first_contact_method,
-                        row.full_conversion,
-                        row.upfunnel_next_step_conversion,
-                        row.what_are_your_goals_or_motivations_to_start_driving_for_lyft if row.what_are_your_goals_or_motivations_to_start_driving_for_lyft else '',
-                        row.what_else_do_you_need_to_submit if row.what_else_do_you_need_to_submit else '',
-                        row.estimated_bgc_date if row.estimated_bgc_date else '',
-                        row.additional_notes if row.additional_notes else ''
-                    ])
-                    row_count += 1
+                merged = store.merge(partition, read_text_csv(fetch_file), started_at, replace=changed_since is None)
+                os.remove(fetch_file)
+                store.export(partition, output_file)
+                row_count = len(merged)
+            
+            # Typed columnar copy the analysis stages load instead of re-parsing the CSV
+            write_columnar_store(output_file, RAW_DATA_SCHEMA)
             
             print(f"✅ Saved {row_count} records to {output_file}")
             return row_count
@@ -114,7 +148,7 @@ class ManualBigQueryLoader:
         df = pd.read_csv(csv_file)
         
         # Convert boolean strings to actual booleans
-        df['full_conversion'] = df['full_conversion'].astype(bool)
+        df['full_conversion'] = parse_bool(df['full_conversion'])
         
         # Calculate performance by individual rep
         performance_groups = []
@@ -280,16 +314,24 @@ class ManualBigQueryLoader:
 def main():
     """Main workflow"""
     
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch Lyft opportunity data from BigQuery')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fetch only opportunities changed since the last run and upsert them into data/store/')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached query results and query BigQuery')
+    parser.add_argument('--no-archive', action='store_true', help='Keep existing results in place (run_analysis.py archives them once per run)')
+    args = parser.parse_args()
+    
     # Archive existing results before starting new analysis
-    import sys
-    import os
-    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities'))
-    try:
-        from archive_manager import ArchiveManager
-        archive_manager = ArchiveManager()
-        archive_manager.prepare_for_new_analysis()
-    except ImportError:
-        print("⚠️  Archive manager not available, continuing without archiving...")
+    if not args.no_archive:
+        try:
+            from archive_manager import ArchiveManager
+            archive_manager = ArchiveManager()
+            archive_manager.prepare_for_new_analysis()
+        except ImportError:
+            print("⚠️  Archive manager not available, continuing without archiving...")
     
     # Create data directory
     import os
@@ -301,7 +343,8 @@ def main():
     try:
         # Fetch and save raw data
         raw_file = "data/bigquery_raw_data.csv"
-        row_count = loader.fetch_and_save_opportunity_data(raw_file)
+        row_count = loader.fetch_and_save_opportunity_data(raw_file, incremental=args.incremental, use_cache=not args.no_cache)
+        get_query_cache().report()
         
         # Process into QA-ready format
         commission_file, conversion_file, tasks_file = loader.create_qa_data_files(raw_file)
@@ -4,18 +4,48 @@ BigQuery Task Data Loader - Fetches real task data with communication content
 """
 
 from google.cloud import bigquery
-import csv
 import pandas as pd
 import logging
+from datetime import datetime, timezone
+from result_pages import PAGE_SIZE, cached_results_to_csv, stream_results_to_csv
+import os
+
+import lyft_paths  # noqa: F401
+from columnar_store import TASK_DATA_SCHEMA, parse_bool, write_columnar_store
+from incremental_store import IncrementalStore, read_text_csv, window_month
+from bigquery_client import get_bigquery_client
+from query_cache import cache_key, get_query_cache
 
 logger = logging.getLogger(__name__)
 
+TASK_DATA_COLUMNS = [
+    'opportunity_uuid', 'owner_username', 'language', 'experiment', 'first_contact_method',
+    'task_start_timestamp', 'task_type', 'task_stage', 'direction', 'contact_flag',
+    'include_in_conext_analysis', 'task_summary', 'task_id'
+]
+
+# Incremental loads re-read only tasks started since the watermark
+TASK_CHANGED_SINCE = """
+        and date(task_start_timestamp) >= @changed_since"""
+
 class BigQueryTaskLoader:
     def __init__(self, project_id: str = "getsaleswarehouse"):
-        self.client = bigquery.Client(project=project_id)
+        self.project_id = project_id
     
-    def fetch_task_data(self, output_file: str = "data/tasks_data_bigquery.csv"):
-        """Fetch real task data from BigQuery"""
+    @property
+    def client(self):
+        """Shared BigQuery client for project_id"""
+        return get_bigquery_client(self.project_id)
+    
+    def fetch_task_data(self, output_file: str = "data/tasks_data_bigquery.csv", page_size: int = PAGE_SIZE,
+                        incremental: bool = False, use_cache: bool = True):
+        """Fetch real task data from BigQuery, streaming it to CSV page by page
+        
+        incremental=True keeps the month in the local store (data/store/tasks/) and only fetches
+        tasks started since the last run (less the lookback, for late transcripts), upserting
+        them by task_id. The first run of a month is a full load.
+        Otherwise a fresh cached result of the same query is reused (use_cache=False re-queries).
+        """
         
         query = """
         with opps as (
@@ -58,48 +88,53 @@ class BigQueryTaskLoader:
           when task_type = 'Call'
           then coalesce(call_summary , 'No Summary, ignore for analysis')
           end task_summary
+        ,oa.task_id
         from opps o 
         join `getsaleswarehouse.gsi_mart_core.sms_materialized_outreach_activities` oa on o.opportunity_uuid = oa.opportunity_uuid
         left join `getsaleswarehouse.gsi_intermediate.execvision_call_transcripts` cc on oa.task_id = cc.task_id
         where task_stage in ('first_contact' , 'post_contact')
-        and not coalesce(automated_system_flag , false)
+        and not coalesce(automated_system_flag , false){changed_since}
         """
         
-        print("🔄 Fetching task data from BigQuery...")
+        store = IncrementalStore('tasks', ['task_id'])
+        partition = window_month()
+        changed_since = store.changed_since(partition) if incremental else None
+        
+        job_config = None
+        if changed_since is not None:
+            print(f"🔄 Fetching tasks started since {changed_since} from BigQuery...")
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter('changed_since', 'DATE', changed_since)
+            ])
+        else:
+            print("🔄 Fetching task data from BigQuery...")
+        query = query.format(changed_since=TASK_CHANGED_SINCE if changed_since is not None else '')
         
         try:
-            query_job = self.client.query(query)
-            results = query_job.result()
+            started_at = datetime.now(timezone.utc)
             
-            # Save to CSV manually
-            with open(output_file, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Write header
-                writer.writerow([
-                    'opportunity_uuid', 'owner_username', 'language', 'experiment', 'first_contact_method',
-                    'task_start_timestamp', 'task_type', 'task_stage', 'direction', 'contact_flag',
-                    'include_in_conext_analysis', 'task_summary'
-                ])
+            if not incremental:
+                # Stream each result page straight to disk, call transcripts make rows large
+                # (or write back a fresh cached result)
+                row_count = cached_results_to_csv(
+                    lambda: self.client.query(query).result(page_size=page_size),
+                    output_file, TASK_DATA_COLUMNS, get_query_cache(), cache_key(query),
+                    label="task records", use_cache=use_cache
+                )
+            else:
+                # Stream the changed rows to a staging file, then upsert them into the stored month
+                fetch_file = store.staging_path(partition)
+                os.makedirs(os.path.dirname(fetch_file), exist_ok=True)
+                results = self.client.query(query, job_config=job_config).result(page_size=page_size)
+                stream_results_to_csv(results, fetch_file, TASK_DATA_COLUMNS, label="task records")
                 
-                # Write data rows
-                row_count = 0
-                for row in results:
-                    writer.writerow([
-                        row.opportunity_uuid,
-                        row.owner_username,
-                        row.language,
-                        row.experiment,
-                        row.first_contact_method,
-                        str(row.task_start_timestamp) if row.task_start_timestamp else '',
-                        row.task_type,
-                        row.task_stage,
-                        row.direction,
-                        row.contact_flag,
-                        row.include_in_conext_analysis,
-                        row.task_summary
-                    ])
-                    row_count += 1
+                merged = store.merge(partition, read_text_csv(fetch_file), started_at, replace=changed_since is None)
+                os.remove(fetch_file)
+                store.export(partition, output_file)
+                row_count = len(merged)
+            
+            # Typed columnar copy the analysis stages load instead of re-parsing the CSV
+            write_columnar_store(output_file, TASK_DATA_SCHEMA)
             
             print(f"✅ Saved {row_count} task records to {output_file}")
             return row_count
@@ -116,8 +151,8 @@ class BigQueryTaskLoader:
         df = pd.read_csv(csv_file)
         
         # Convert boolean columns
-        df['contact_flag'] = df['contact_flag'].fillna(False).astype(bool)
-        df['include_in_conext_analysis'] = df['include_in_conext_analysis'].fillna(False).astype(bool)
+        df['contact_flag'] = parse_bool(df['contact_flag'])
+        df['include_in_conext_analysis'] = parse_bool(df['include_in_conext_analysis'])
         
         # Basic statistics
         total_tasks = len(df)
@@ -173,6 +208,15 @@ class BigQueryTaskLoader:
 def main():
     """Main task data loading workflow"""
     
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch Lyft task/communication data from BigQuery')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fetch only tasks started since the last run and upsert them into data/store/')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached query results and query BigQuery')
+    args = parser.parse_args()
+    
     # Create data directory
     import os
     os.makedirs("data", exist_ok=True)
@@ -182,7 +226,8 @@ def main():
     
     try:
         # Fetch task data
-        task_count = loader.fetch_task_data()
+        task_count = loader.fetch_task_data(incremental=args.incremental, use_cache=not args.no_cache)
+        get_query_cache().report()
         
         # Analyze data quality
         stats = loader.analyze_task_quality()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Combined Extract Loader - Opportunities, notes and tasks from one scan of the opportunity base
+One multi-statement job stores the month's opportunities in a temporary table and derives both exports from it
+"""
+
+from google.cloud import bigquery
+from datetime import datetime, timezone
+from result_pages import PAGE_SIZE, stream_results_to_csv
+from bigquery_manual_loader import ManualBigQueryLoader, RAW_DATA_COLUMNS, OPPORTUNITY_CHANGED_SINCE
+from bigquery_task_loader import BigQueryTaskLoader, TASK_DATA_COLUMNS, TASK_CHANGED_SINCE
+import os
+import sys
+
+import lyft_paths  # noqa: F401
+from columnar_store import RAW_DATA_SCHEMA, TASK_DATA_SCHEMA, write_columnar_store
+from incremental_store import IncrementalStore, read_text_csv, window_month
+from bigquery_client import get_bigquery_client
+from query_cache import cache_key, get_query_cache
+
+# The script's SELECT statements, in order: each one's result is written to its own export
+COMBINED_OUTPUTS = ['opportunities', 'tasks']
+
+class CombinedExtractLoader:
+    def __init__(self, project_id: str = "getsaleswarehouse"):
+        self.project_id = project_id
+    
+    @property
+    def client(self):
+        """Shared BigQuery client for project_id"""
+        return get_bigquery_client(self.project_id)
+    
+    def build_script(self, opportunities_changed_since=None, tasks_changed_since=None):
+        """The multi-statement script: the opportunity base into a temp table, then one SELECT per output
+        
+        lyft_dim_opp is scanned once for the month, and the notes lookup only reads leads in that
+        base, so both exports always cover the same opportunities. A changed_since date narrows
+        that output the way the separate loaders' incremental queries do.
+        """
+        
+        # Each output gets its own watermark parameter
+        opportunity_filter = OPPORTUNITY_CHANGED_SINCE.replace('@changed_since', '@opportunities_changed_since')
+        task_filter = TASK_CHANGED_SINCE.replace('@changed_since', '@tasks_changed_since')
+        
+        script = """
+        create temp table opps as
+        select
+         opportunity_uuid
+        ,coalesce(language_c , 'English') language
+        ,project experiment
+        ,first_contacted_date_time_c
+        ,owner_username
+        ,owner_name
+        ,first_contact_method
+        ,first_ride_at
+        ,exposure_date
+        ,application_date
+        ,approved_date
+        from `getsaleswarehouse.gsi_mart_lyft.lyft_dim_opp`
+        where date_trunc(date(first_contacted_date_time_c) , month) = date_trunc(date_sub(current_date , interval 1 month) , month);
+        
+        with notes as (
+          select
+           question_1
+          ,question_2
+          ,question_3
+          ,coalesce(o.description ,l.notes_c_c) additional_notes
+          ,l.opportunity_uuid
+          from `getsaleswarehouse.gsi_intermediate.last_submitted_outreach_notes` o
+          join `getsaleswarehouse.gsi_mart_core.sfdc_lead` l on o.salesforce_id =l.id and l.opportunity_type_c in ('Lyft Funnel Conversion Launch' , 'Lyft W Plus Funnel Conversion', 'Lyft W Plus Funnel Conversion Stale AnA')
+          where l.opportunity_uuid in (select opportunity_uuid from opps)
+        )
+        
+        select
+         l.opportunity_uuid
+        ,language
+        ,experiment
+        ,date(first_contacted_date_time_c) first_contact_date
+        ,owner_username
+        ,owner_name
+        ,first_contact_method
+        ,case
+          when experiment in ('Lyft Funnel Conversion - Stale')
+          then if(date_diff(date(first_ride_at) , exposure_date , day) <= 30 , true, false)
+          else if(date_diff(date(first_ride_at) , application_date , day) <= 30 , true, false)
+          end full_conversion
+        ,case
+          when experiment not in ('Lyft Funnel Conversion - Upfunnel')
+          then 'n/a'
+          when experiment in ('Lyft Funnel Conversion - Upfunnel')
+          then if(date_diff(date(approved_date) , application_date , day) <= 30 , 'true' , 'false')
+          end upfunnel_next_step_conversion
+        ,coalesce(question_1 , 'ignore question 1') what_are_your_goals_or_motivations_to_start_driving_for_lyft
+        ,coalesce(question_2 , 'ignore question 2') what_else_do_you_need_to_submit
+        ,coalesce(question_3 , 'ignore question 3') estimated_bgc_date
+        ,coalesce(additional_notes , 'ignore question 4') additional_notes
+        from opps l
+        left join notes n on l.opportunity_uuid = n.opportunity_uuid
+        where true{opportunities_changed_since};
+        
+        select
+         o.opportunity_uuid
+        ,o.owner_username
+        ,o.language
+        ,o.experiment
+        ,o.first_contact_method
+        ,task_start_timestamp
+        ,task_type
+        ,task_stage
+        ,direction
+        ,contact_flag
+        ,case
+          when task_type = 'Call' and call_summary = 'Due to the brevity of the meeting transcript, there is no call summary.'
+          then false
+          when task_type = 'Call' and not coalesce(contact_flag , false)
+          then false
+          when task_type = 'Call' and call_summary is null
+          then false
+          else true
+          end include_in_conext_analysis
+        ,case
+          when task_type = 'SMS'
+          then message
+          when task_type = 'Call' and call_summary = 'Due to the brevity of the meeting transcript, there is no call summary.'
+          then 'Call to Short, ignore for analysis'
+          when task_type = 'Call' and not coalesce(contact_flag , false)
+          then 'No Contact, ignore for analysis'
+          when task_type = 'Call'
+          then coalesce(call_summary , 'No Summary, ignore for analysis')
+          end task_summary
+        ,oa.task_id
+        from opps o
+        join `getsaleswarehouse.gsi_mart_core.sms_materialized_outreach_activities` oa on o.opportunity_uuid = oa.opportunity_uuid
+        left join `getsaleswarehouse.gsi_intermediate.execvision_call_transcripts` cc on oa.task_id = cc.task_id
+        where task_stage in ('first_contact' , 'post_contact')
+        and not coalesce(automated_system_flag , false){tasks_changed_since};
+        """
+        
+        return script.format(
+            opportunities_changed_since=opportunity_filter if opportunities_changed_since is not None else '',
+            tasks_changed_since=task_filter if tasks_changed_since is not None else ''
+        )
+    
+    def run_script(self, script, job_config=None, page_size: int = PAGE_SIZE):
+        """Run the script as one job, returns {output: paged results} from its SELECT statements
+        
+        Each statement of a script runs as a child job; the SELECT children (in the order they
+        ran) hold the outputs, and their results page like any other query's.
+        """
+        
+        job = self.client.query(script, job_config=job_config)
+        job.result()
+        
+        if job.total_bytes_processed is not None:
+            print(f"   📉 Combined extract scanned {job.total_bytes_processed / 1024 ** 3:,.2f} GB")
+        
+        children = sorted(self.client.list_jobs(parent_job=job), key=lambda child: child.created)
+        selects = [child for child in children if child.statement_type == 'SELECT']
+        if len(selects) != len(COMBINED_OUTPUTS):
+            raise ValueError(f"Expected {len(COMBINED_OUTPUTS)} SELECT statements in the combined extract, got {len(selects)}")
+        return {output: child.result(page_size=page_size) for output, child in zip(COMBINED_OUTPUTS, selects)}
+    
+    def cached_exports(self, outputs, cache_keys, use_cache: bool = True):
+        """Copy every export from the query cache, returns their row counts, or None unless all were cached
+        
+        The exports of one job must come from the same snapshot, so a single miss means the job
+        runs again and refreshes them all; lookups stop at the first miss.
+        """
+        
+        if not use_cache:
+            return None
+        row_counts = {}
+        for output, (output_file, _, _, _, label) in outputs.items():
+            row_counts[output] = get_query_cache().get_file(cache_keys[output], output_file, label=label)
+            if row_counts[output] is None:
+                return None
+        return row_counts
+    
+    def fetch_opportunities_and_tasks(self, opportunity_file: str = "data/bigquery_raw_data.csv",
+                                      task_file: str = "data/tasks_data_bigquery.csv", page_size: int = PAGE_SIZE,
+                                      incremental: bool = False, use_cache: bool = True):
+        """Fetch the opportunity and task exports with one combined job, returns their row counts
+        
+        The files, local stores (data/store/opportunities/, data/store/tasks/) and cache behave
+        exactly as with the separate loaders, so the two modes can be switched between runs.
+        Both outputs are served from the cache together or not at all: if either entry is missing,
+        the job runs once and both are refreshed, so the files always share one snapshot.
+        """
+        
+        outputs = {
+            'opportunities': (opportunity_file, RAW_DATA_COLUMNS, RAW_DATA_SCHEMA,
+                              IncrementalStore('opportunities', ['opportunity_uuid']), "opportunity records"),
+            'tasks': (task_file, TASK_DATA_COLUMNS, TASK_DATA_SCHEMA,
+                      IncrementalStore('tasks', ['task_id']), "task records")
+        }
+        partition = window_month()
+        changed_since = {
+            output: store.changed_since(partition) if incremental else None
+            for output, (_, _, _, store, _) in outputs.items()
+        }
+        
+        query_parameters = [
+            bigquery.ScalarQueryParameter(f'{output}_changed_since', 'DATE', since)
+            for output, since in changed_since.items() if since is not None
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters) if query_parameters else None
+        for output, since in changed_since.items():
+            if since is not None:
+                print(f"🔄 Fetching {output} changed since {since} from BigQuery (combined extract)...")
+        if not query_parameters:
+            print("🔄 Fetching opportunity and task data from BigQuery (combined extract)...")
+        script = self.build_script(changed_since['opportunities'], changed_since['tasks'])
+        
+        cache_keys = {output: cache_key(script, params={'output': output}) for output in outputs}
+        
+        try:
+            started_at = datetime.now(timezone.utc)
+            row_counts = self.cached_exports(outputs, cache_keys, use_cache) if not incremental else None
+            
+            if row_counts is None:
+                script_results = self.run_script(script, job_config, page_size)
+                row_counts = {}
+                
+                for output, (output_file, columns, _, store, label) in outputs.items():
+                    if not incremental:
+                        row_counts[output] = stream_results_to_csv(script_results[output], output_file, columns, label=label)
+                        get_query_cache().put_file(cache_keys[output], output_file, row_counts[output], label=label)
+                    else:
+                        # Stream the changed rows to a staging file, then upsert them into the stored month
+                        fetch_file = store.staging_path(partition)
+                        os.makedirs(os.path.dirname(fetch_file), exist_ok=True)
+                        stream_results_to_csv(script_results[output], fetch_file, columns, label=label)
+                        
+                        merged = store.merge(partition, read_text_csv(fetch_file), started_at, replace=changed_since[output] is None)
+                        os.remove(fetch_file)
+                        store.export(partition, output_file)
+                        row_counts[output] = len(merged)
+            
+            for output, (output_file, _, schema, _, label) in outputs.items():
+                # Typed columnar copy the analysis stages load instead of re-parsing the CSV
+                write_columnar_store(output_file, schema)
+                print(f"✅ Saved {row_counts[output]} {label} to {output_file}")
+            
+            return row_counts
+        
+        except Exception as e:
+            print(f"❌ Error fetching combined extract: {e}")
+            raise
+
+def main():
+    """Main combined extract workflow"""
+    
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch Lyft opportunity and task data from BigQuery in one combined job')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fetch only opportunities and tasks changed since the last run and upsert them into data/store/')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached query results and query BigQuery')
+    args = parser.parse_args()
+    
+    # Create data directory
+    os.makedirs("data", exist_ok=True)
+    
+    # Initialize loader
+    loader = CombinedExtractLoader()
+    
+    try:
+        # Fetch both exports from one scan of the opportunity base
+        raw_file = "data/bigquery_raw_data.csv"
+        row_counts = loader.fetch_opportunities_and_tasks(raw_file, incremental=args.incremental, use_cache=not args.no_cache)
+        get_query_cache().report()
+        
+        # Same follow-up steps as the separate loaders
+        commission_file, conversion_file, tasks_file = ManualBigQueryLoader(loader.project_id).create_qa_data_files(raw_file)
+        stats = BigQueryTaskLoader(loader.project_id).analyze_task_quality()
+        
+        print(f"\n🎯 Combined Extract Complete!")
+        print(f"📊 {row_counts['opportunities']:,} opportunities and {row_counts['tasks']:,} tasks fetched")
+        print(f"✅ {stats['usable_tasks']:,} tasks ready for content analysis")
+        print(f"📁 Data saved to: {raw_file}, data/tasks_data_bigquery.csv")
+        print(f"   - {commission_file}")
+        print(f"   - {conversion_file}")
+    
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,46 @@ Control Group Data Loader - Fetches control group baseline conversion rates
 from google.cloud import bigquery
 import pandas as pd
 import logging
+from datetime import datetime, timezone
+import os
+
+import lyft_paths  # noqa: F401
+from control_baselines import ControlBaselineIndex
+from incremental_store import IncrementalStore, window_month
+from bigquery_client import get_bigquery_client
+from query_cache import cache_key, get_query_cache
 
 logger = logging.getLogger(__name__)
 
+CONTROL_BASELINE_COLUMNS = [
+    'xp_month', 'language', 'experiment', 'leads', 'full_conversion',
+    'upfunnel_next_step_conversion', 'control_conversion_rate'
+]
+
+# Incremental loads re-aggregate only months whose 30-day conversion windows were still open at the watermark
+CONTROL_CHANGED_SINCE = """
+        and date_trunc(date(experiment_tag_date) , month) >= date_trunc(date_sub(@changed_since , interval 30 day) , month)"""
+
 class ControlGroupLoader:
     def __init__(self, project_id: str = "getsaleswarehouse"):
-        self.client = bigquery.Client(project=project_id)
+        self.project_id = project_id
+        self._baseline_index = None
+    
+    @property
+    def client(self):
+        """Shared BigQuery client for project_id"""
+        return get_bigquery_client(self.project_id)
     
-    def fetch_control_baselines(self, output_file: str = "data/control_baselines.csv"):
-        """Fetch control group baseline conversion rates by experiment and language"""
+    def fetch_control_baselines(self, output_file: str = "data/control_baselines.csv", months: int = 1,
+                                incremental: bool = False, use_cache: bool = True):
+        """Fetch control group baseline conversion rates by month, experiment and language
+        
+        months=1 fetches the previous month; months=3 covers the previous quarter in one file.
+        incremental=True keeps the window in the local store (data/store/control_baselines/) and
+        re-aggregates only months that can still gain conversions, upserting them by
+        (xp_month, experiment, language). Otherwise a fresh cached result of the same query is
+        reused (use_cache=False re-queries).
+        """
         
         query = """
         select
@@ -34,41 +65,68 @@ class ControlGroupLoader:
           then if(date_diff(date(approved_date) , application_date , day) <= 30 , 1 , 0)
           end) upfunnel_next_step_conversion
         from `getsaleswarehouse.gsi_mart_lyft.lyft_dim_opp` 
-        where date_trunc(date(experiment_tag_date) , month) = date_trunc(date_sub(current_date , interval 1 month) , month)
-        and opportunity_treatment_group = 'Control'
+        where date_trunc(date(experiment_tag_date) , month) between date_trunc(date_sub(current_date , interval {months} month) , month)
+          and date_trunc(date_sub(current_date , interval 1 month) , month)
+        and opportunity_treatment_group = 'Control'{changed_since}
         group by 1,2,3
+        order by 1,2,3
         """
         
-        print("🔄 Fetching control group baseline data from BigQuery...")
+        store = IncrementalStore('control_baselines', ['xp_month', 'experiment', 'language'])
+        partition = f"{window_month()}_{months}m"
+        changed_since = store.changed_since(partition) if incremental else None
+        
+        job_config = None
+        if changed_since is not None:
+            print(f"🔄 Fetching control group baselines still open on {changed_since} from BigQuery...")
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter('changed_since', 'DATE', changed_since)
+            ])
+        else:
+            print("🔄 Fetching control group baseline data from BigQuery...")
+        query = query.format(months=months, changed_since=CONTROL_CHANGED_SINCE if changed_since is not None else '')
         
         try:
-            query_job = self.client.query(query)
-            results = query_job.result()
+            started_at = datetime.now(timezone.utc)
+            query_cache, key = get_query_cache(), cache_key(query)
+            df = query_cache.get(key, label="control baselines") if use_cache and not incremental else None
             
-            # Convert to DataFrame
-            data = []
-            for row in results:
-                data.append({
-                    'xp_month': str(row.xp_month),
-                    'language': row.language_c if row.language_c else 'English',
-                    'experiment': row.experiment,
-                    'leads': row.leads,
-                    'full_conversion': row.full_conversion,
-                    'upfunnel_next_step_conversion': row.upfunnel_next_step_conversion,
-                    'control_conversion_rate': row.full_conversion / row.leads if row.leads > 0 else 0
-                })
+            if df is None:
+                query_job = self.client.query(query, job_config=job_config)
+                results = query_job.result()
+                
+                # Convert to DataFrame
+                data = []
+                for row in results:
+                    data.append({
+                        'xp_month': str(row.xp_month),
+                        'language': row.language_c if row.language_c else 'English',
+                        'experiment': row.experiment,
+                        'leads': row.leads,
+                        'full_conversion': row.full_conversion,
+                        'upfunnel_next_step_conversion': row.upfunnel_next_step_conversion,
+                        'control_conversion_rate': row.full_conversion / row.leads if row.leads > 0 else 0
+                    })
+                
+                df = pd.DataFrame(data, columns=CONTROL_BASELINE_COLUMNS)
+                if not incremental:
+                    query_cache.put(key, df, label="control baselines")
             
-            df = pd.DataFrame(data)
+            if incremental:
+                store.merge(partition, df, started_at, replace=changed_since is None)
+                # The stored window in query order (month, language, experiment), typed like a fresh fetch
+                df = pd.read_csv(store.partition_path(partition)).sort_values(['xp_month', 'language', 'experiment'], ignore_index=True)
             
             # Save to CSV
             df.to_csv(output_file, index=False)
+            self._baseline_index = ControlBaselineIndex(df)
             
             print(f"✅ Saved {len(df)} control baseline records to {output_file}")
             
             # Display baseline summary
             print("\n📊 Control Group Baselines:")
             for _, row in df.iterrows():
-                print(f"   {row['experiment']} - {row['language']}: {row['control_conversion_rate']:.1%} ({row['full_conversion']}/{row['leads']})")
+                print(f"   {row['xp_month']} {row['experiment']} - {row['language']}: {row['control_conversion_rate']:.1%} ({row['full_conversion']}/{row['leads']})")
             
             return len(df)
             
@@ -76,24 +134,25 @@ class ControlGroupLoader:
             print(f"❌ Error fetching control baseline data: {e}")
             raise
     
-    def get_control_baseline(self, experiment, language, control_df=None):
-        """Get control baseline conversion rate for a specific experiment and language"""
+    def load_baseline_index(self, control_file: str = "data/control_baselines.csv"):
+        """Load the (xp_month, experiment, language) baseline index once and reuse it"""
+        
+        if self._baseline_index is None:
+            self._baseline_index = ControlBaselineIndex.from_csv(control_file)
+        return self._baseline_index
+    
+    def get_control_baseline(self, experiment, language, control_df=None, xp_month=None):
+        """Get control baseline conversion rate for a specific experiment and language (and month, if given)"""
         
-        if control_df is None:
-            try:
-                control_df = pd.read_csv("data/control_baselines.csv")
-            except FileNotFoundError:
-                print("⚠️  Control baselines not found, using default 0%")
-                return 0.0
+        baseline_index = self.load_baseline_index() if control_df is None else ControlBaselineIndex(control_df)
+        if baseline_index.empty:
+            return 0.0
         
-        # Find matching baseline
-        match = control_df[
-            (control_df['experiment'] == experiment) &
-            (control_df['language'] == language)
-        ]
+        # Month/experiment/language match, falling back to experiment+language, then the experiment's baseline
+        baseline = baseline_index.lookup(experiment, language, xp_month)
         
-        if not match.empty:
-            return match.iloc[0]['control_conversion_rate']
+        if baseline is not None:
+            return baseline
         else:
             print(f"⚠️  No control baseline found for {experiment} - {language}, using 0%")
             return 0.0
@@ -101,8 +160,18 @@ class ControlGroupLoader:
 def main():
     """Main control group loading workflow"""
     
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch control group baseline conversion rates')
+    parser.add_argument('--months', type=int, default=1,
+                        help='Number of completed months to fetch (default: 1, use 3 for quarterly lift reports)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-aggregate only months still gaining conversions and upsert them into data/store/')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached query results and query BigQuery')
+    args = parser.parse_args()
+    
     # Create data directory
-    import os
     os.makedirs("data", exist_ok=True)
     
     # Initialize loader
@@ -110,10 +179,12 @@ def main():
     
     try:
         # Fetch control baselines
-        baseline_count = loader.fetch_control_baselines()
+        baseline_count = loader.fetch_control_baselines(months=args.months, incremental=args.incremental,
+                                                        use_cache=not args.no_cache)
+        get_query_cache().report()
         
         print(f"\n🎯 Control Group Loading Complete!")
-        print(f"📊 {baseline_count} experiment-language baselines fetched")
+        print(f"📊 {baseline_count} month-experiment-language baselines fetched ({args.months} month(s))")
         print(f"📁 Data saved to: data/control_baselines.csv")
         
         print(f"\n🚀 Ready to calculate lift metrics against control baselines!")
@@ -6,10 +6,122 @@ Handles proper paths and executes the complete analysis workflow
 
 import os
 import sys
+import time
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-def run_complete_analysis():
+# Stages of the full workflow: name -> (label, command, stages whose outputs it needs,
+# stages whose outputs it reads if they succeed)
+def full_workflow_stages(loader_args, template_args, combined=False):
+    """The full workflow as a stage graph
+    
+    The warehouse fetches share no inputs, so they run side by side. Template analysis
+    needs the opportunity and task exports; it waits for the control baselines too, but
+    runs on without them (0% baselines) if that fetch fails. Enhanced analysis reuses the
+    columnar copies, conversion cube and engagement table that template analysis builds,
+    so it follows it rather than racing it to write them. combined=True fetches
+    opportunities and tasks in one combined job.
+    """
+    python = sys.executable
+    if combined:
+        extracts = {
+            'opportunities_tasks': ("📦 Opportunity and task data from BigQuery (combined extract)",
+                                    [python, "data_loaders/combined_extract_loader.py"] + loader_args, [], [])
+        }
+    else:
+        extracts = {
+            'opportunities': ("📊 Opportunity data from BigQuery",
+                              [python, "data_loaders/bigquery_manual_loader.py", "--no-archive"] + loader_args, [], []),
+            'tasks': ("📱 Task/communication data from BigQuery",
+                      [python, "data_loaders/bigquery_task_loader.py"] + loader_args, [], [])
+        }
+    
+    return {
+        **extracts,
+        'control_baselines': ("🎯 Control group baselines from BigQuery",
+                              [python, "data_loaders/control_group_loader.py"] + loader_args, [], []),
+        'template': ("📋 Template-based analysis",
+                     [python, "scripts/template_analysis.py", "--no-archive"] + template_args,
+                     list(extracts), ['control_baselines']),
+        'enhanced': ("🔍 Enhanced QA analysis with real task content",
+                     [python, "scripts/enhanced_qa_analysis.py", "--no-archive"],
+                     list(extracts) + ['template'], [])
+    }
+
+def run_stage(command):
+    """Run one stage's subprocess, returns (result, start, end) in perf_counter seconds"""
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    return result, start, time.perf_counter()
+
+def run_stage_graph(stages):
+    """Start each stage once its inputs have succeeded and its optional inputs have finished,
+    returns (timings, wall clock)
+    
+    Stages are subprocesses, so the threads here only wait on them. A failed stage skips
+    everything that needs it; stages that only read it optionally run anyway with a warning,
+    and stages that do not depend on it still run to completion.
+    """
+    run_start = time.perf_counter()
+    timings = {}
+    pending = dict(stages)
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        while pending or running:
+            for name, (label, command, inputs, optional_inputs) in list(pending.items()):
+                if any(timings.get(dependency, {}).get('status') in ('failed', 'skipped') for dependency in inputs):
+                    del pending[name]
+                    timings[name] = {'label': label, 'status': 'skipped'}
+                    print(f"⏭️  Skipping {label} (an input failed)")
+                elif (all(timings.get(dependency, {}).get('status') == 'ok' for dependency in inputs)
+                      and all(dependency in timings for dependency in optional_inputs)):
+                    del pending[name]
+                    for dependency in optional_inputs:
+                        if timings[dependency]['status'] != 'ok':
+                            print(f"⚠️  {timings[dependency]['label']} did not complete, {label} runs without it")
+                    print(f"▶️  {label}...")
+                    running[executor.submit(run_stage, command)] = name
+            
+            if not running:
+                # Only stages waiting on unknown inputs are left
+                for name, (label, _, _, _) in pending.items():
+                    timings[name] = {'label': label, 'status': 'skipped'}
+                    print(f"⏭️  Skipping {label} (missing inputs)")
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                label = stages[name][0]
+                result, start, end = future.result()
+                status = 'ok' if result.returncode == 0 else 'failed'
+                timings[name] = {'label': label, 'status': status, 'start': start - run_start, 'end': end - run_start}
+                
+                if status == 'ok':
+                    print(f"✅ {label} done ({end - start:.1f}s)")
+                else:
+                    print(f"❌ {label} failed:")
+                    print(result.stderr)
+    
+    return {name: timings[name] for name in stages}, time.perf_counter() - run_start
+
+def print_stage_timings(timings, wall_clock):
+    """Per-stage timing summary: when each stage ran, relative to the start of the run"""
+    print("\n⏱️  Stage timings:")
+    stage_total = 0.0
+    for name, timing in timings.items():
+        if timing['status'] == 'skipped':
+            print(f"   ⏭️  {name:<20} skipped")
+            continue
+        duration = timing['end'] - timing['start']
+        stage_total += duration
+        icon = "✅" if timing['status'] == 'ok' else "❌"
+        print(f"   {icon} {name:<20} {timing['start']:7.1f}s → {timing['end']:7.1f}s  ({duration:.1f}s)")
+    print(f"   Wall clock: {wall_clock:.1f}s for {stage_total:.1f}s of stage time")
+
+def run_complete_analysis(template_args=None):
     """Run the complete Lyft QA analysis workflow"""
     
     print("🚀 Starting Lyft QA Analysis Workflow")
@@ -19,55 +131,33 @@ def run_complete_analysis():
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
-    # Step 1: Fetch data from BigQuery
-    print("📊 Step 1: Fetching opportunity data from BigQuery...")
-    result = subprocess.run([sys.executable, "data_loaders/bigquery_manual_loader.py"], 
-                          capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"❌ BigQuery opportunity data loading failed:")
-        print(result.stderr)
-        return False
-    
-    print("✅ BigQuery opportunity data loaded successfully")
+    # --incremental also makes the loaders fetch only rows changed since their last run;
+    # --no-cache is for the loaders only, --combined for this runner
+    loader_args = [arg for arg in ["--incremental", "--no-cache"] if arg in (template_args or [])]
+    combined = "--combined" in (template_args or [])
+    template_args = [arg for arg in (template_args or []) if arg not in ("--no-cache", "--combined")]
     
-    # Step 1b: Fetch task data from BigQuery
-    print("\n📱 Step 1b: Fetching task/communication data from BigQuery...")
-    result = subprocess.run([sys.executable, "data_loaders/bigquery_task_loader.py"], 
-                          capture_output=True, text=True)
+    # Archive the previous run once, so the analysis stages keep each other's reports
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities'))
+    from archive_manager import ArchiveManager
+    ArchiveManager().prepare_for_new_analysis()
     
-    if result.returncode != 0:
-        print(f"❌ BigQuery task data loading failed:")
-        print(result.stderr)
-        return False
-    
-    print("✅ BigQuery task data loaded successfully")
-    
-    # Step 2: Run template-based analysis
-    print("\n📋 Step 2: Running template-based analysis...")
-    result = subprocess.run([sys.executable, "scripts/template_analysis.py"], 
-                          capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"❌ Template analysis failed:")
-        print(result.stderr)
-        return False
-    
-    print("✅ Template analysis completed successfully")
-    
-    # Step 3: Run enhanced QA analysis with real task content
-    print("\n🔍 Step 3: Running enhanced QA analysis with real task content...")
-    result = subprocess.run([sys.executable, "scripts/enhanced_qa_analysis.py"], 
-                          capture_output=True, text=True)
+    # Fetch from BigQuery and analyze, each stage starting once its inputs are ready
+    print("\n📊 Running workflow stages (independent fetches run concurrently)...")
+    stages = full_workflow_stages(loader_args, template_args, combined)
+    timings, wall_clock = run_stage_graph(stages)
+    print_stage_timings(timings, wall_clock)
     
-    if result.returncode != 0:
-        print(f"❌ Enhanced QA analysis failed:")
-        print(result.stderr)
+    # Stages only ever read optionally (control baselines) leave the report on 0% baselines, not missing
+    optional = {dependency for *_, optional_inputs in stages.values() for dependency in optional_inputs}
+    optional -= {dependency for _, _, inputs, _ in stages.values() for dependency in inputs}
+    if any(timing['status'] != 'ok' for name, timing in timings.items() if name not in optional):
         return False
+    for name in optional:
+        if timings[name]['status'] != 'ok':
+            print(f"\n⚠️  {timings[name]['label']} failed; template analysis used the existing or 0% control baselines")
     
-    print("✅ Enhanced QA analysis completed successfully")
-    
-    # Step 4: Show results
+    # Show results
     print("\n📁 Complete Analysis Finished! Results available in:")
     print("   📊 results/analysis_summary.md - Executive summary")
     print("   📈 results/segmented_analysis_report.md - Detailed segment breakdown")
@@ -78,22 +168,31 @@ def run_complete_analysis():
     
     return True
 
-def run_bigquery_only():
+def run_bigquery_only(loader_args=None):
     """Run only BigQuery data fetching"""
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
     print("📊 Fetching opportunity data from BigQuery...")
-    result = subprocess.run([sys.executable, "data_loaders/bigquery_manual_loader.py"])
+    result = subprocess.run([sys.executable, "data_loaders/bigquery_manual_loader.py"] + (loader_args or []))
     return result.returncode == 0
 
-def run_tasks_only():
+def run_tasks_only(loader_args=None):
     """Run only BigQuery task data fetching"""
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
     print("📱 Fetching task data from BigQuery...")
-    result = subprocess.run([sys.executable, "data_loaders/bigquery_task_loader.py"])
+    result = subprocess.run([sys.executable, "data_loaders/bigquery_task_loader.py"] + (loader_args or []))
+    return result.returncode == 0
+
+def run_baselines_only(loader_args=None):
+    """Run only control group baseline fetching"""
+    script_dir = Path(__file__).parent
+    os.chdir(script_dir)
+    
+    print("🎯 Fetching control group baselines from BigQuery...")
+    result = subprocess.run([sys.executable, "data_loaders/control_group_loader.py"] + (loader_args or []))
     return result.returncode == 0
 
 def run_segmented_only():
@@ -105,13 +204,13 @@ def run_segmented_only():
     result = subprocess.run([sys.executable, "scripts/segmented_analysis.py"])
     return result.returncode == 0
 
-def run_template_only():
+def run_template_only(template_args=None):
     """Run only template-based analysis (requires existing data)"""
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
     print("📋 Running template-based analysis...")
-    result = subprocess.run([sys.executable, "scripts/template_analysis.py"])
+    result = subprocess.run([sys.executable, "scripts/template_analysis.py"] + (template_args or []))
     return result.returncode == 0
 
 def run_enhanced_only():
@@ -139,28 +238,37 @@ def main():
         command = sys.argv[1].lower()
         
         if command == "bigquery":
-            success = run_bigquery_only()
+            success = run_bigquery_only(sys.argv[2:])
         elif command == "tasks":
-            success = run_tasks_only()
+            success = run_tasks_only(sys.argv[2:])
+        elif command == "baselines":
+            success = run_baselines_only(sys.argv[2:])
         elif command == "segmented":
             success = run_segmented_only()
         elif command == "template":
-            success = run_template_only()
+            success = run_template_only(sys.argv[2:])
         elif command == "enhanced":
             success = run_enhanced_only()
         elif command == "test":
             success = test_bigquery_connection()
         elif command == "full":
-            success = run_complete_analysis()
+            success = run_complete_analysis(sys.argv[2:])
         else:
-            print("Usage: python run_analysis.py [bigquery|tasks|segmented|template|enhanced|test|full]")
+            print("Usage: python run_analysis.py [bigquery|tasks|baselines|segmented|template|enhanced|test|full] [--workers N] [--full-roster] [--incremental] [--no-cache] [--combined]")
             print("  bigquery  - Fetch opportunity data from BigQuery only")
             print("  tasks     - Fetch task/communication data from BigQuery only")
+            print("  baselines - Fetch control group baselines from BigQuery only")
             print("  segmented - Run segmented analysis only")
             print("  template  - Run template-based analysis (follows exact format)")
             print("  enhanced  - Run enhanced QA analysis with real task content")
             print("  test      - Test BigQuery connection")
-            print("  full      - Run complete analysis (default)")
+            print("  full      - Run complete analysis (default): fetches run concurrently, then the analyses")
+            print("  --workers N - Render template rep sections on N processes (template, full)")
+            print("  --full-roster - Write a template section for every qualifying rep to results/rep_sections/ (template, full)")
+            print("  --incremental - Reuse cached template sections for reps whose data is unchanged (template, full)")
+            print("                  and fetch only rows changed since the last run (bigquery, tasks, baselines, full)")
+            print("  --no-cache  - Query BigQuery even when a fresh cached result exists (bigquery, tasks, baselines, full)")
+            print("  --combined  - Fetch opportunities and tasks from one scan of the opportunity base (full)")
             return
     else:
         # Default: run complete analysis
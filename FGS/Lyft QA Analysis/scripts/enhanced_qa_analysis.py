@@ -7,43 +7,58 @@ Analyzes actual call summaries and SMS messages from top vs low performers
 import pandas as pd
 import numpy as np
 from collections import defaultdict, Counter
-import re
 from datetime import datetime
+import lyft_paths  # noqa: F401
+from text_features import build_pattern_matrix
+
+# Columns read by the tier, content, timing and engagement analyses (the cube loads its own)
+ENHANCED_RAW_COLUMNS = [
+    'opportunity_uuid', 'owner_username', 'owner_name', 'experiment', 'full_conversion',
+    'what_are_your_goals_or_motivations_to_start_driving_for_lyft', 'what_else_do_you_need_to_submit',
+    'estimated_bgc_date', 'additional_notes'
+]
+ENHANCED_TASK_COLUMNS = [
+    'opportunity_uuid', 'owner_username', 'experiment', 'task_start_timestamp', 'task_type',
+    'task_stage', 'direction', 'include_in_conext_analysis', 'task_summary'
+]
 
 def load_all_data():
-    """Load and merge all data sources"""
+    """Load and merge all data sources (returns usable tasks plus the full task log)"""
     print("📊 Loading all data sources...")
     
-    # Load performance data
-    raw_data = pd.read_csv("data/bigquery_raw_data.csv")
+    from columnar_store import RAW_DATA_SCHEMA, TASK_DATA_SCHEMA, load_table
+    
+    # Load performance data (typed columnar copy, only the columns this analysis reads)
+    raw_data = load_table("data/bigquery_raw_data.csv", RAW_DATA_SCHEMA, columns=ENHANCED_RAW_COLUMNS)
     
     # Load real task content
-    tasks_data = pd.read_csv("data/tasks_data_bigquery.csv")
+    tasks_data = load_table("data/tasks_data_bigquery.csv", TASK_DATA_SCHEMA, columns=ENHANCED_TASK_COLUMNS)
     
     print(f"   📈 Raw opportunity data: {len(raw_data):,} records")
     print(f"   📱 Task data: {len(tasks_data):,} records")
     
-    # Convert boolean conversion column
-    raw_data['full_conversion'] = raw_data['full_conversion'].astype(bool)
-    
     # Filter to usable tasks only
     usable_tasks = tasks_data[tasks_data['include_in_conext_analysis'] == True]
     print(f"   ✅ Usable tasks for analysis: {len(usable_tasks):,} records")
     
-    return raw_data, usable_tasks
+    return raw_data, usable_tasks, tasks_data
 
-def identify_performance_tiers(raw_data):
-    """Identify top and bottom performing reps"""
+def identify_performance_tiers(raw_data, cube=None):
+    """Identify top and bottom performing reps (rep totals rolled up from the conversion cube)"""
     print("\n🎯 Identifying performance tiers...")
     
-    # Calculate rep-level performance
-    rep_performance = raw_data.groupby('owner_username').agg({
-        'full_conversion': ['count', 'sum', 'mean'],
-        'owner_name': 'first'
-    }).round(4)
+    if cube is None:
+        from conversion_cube import ConversionCube
+        cube = ConversionCube.from_raw(raw_data)
     
-    # Flatten column names
-    rep_performance.columns = ['total_opps', 'conversions', 'conversion_rate', 'owner_name']
+    # Calculate rep-level performance
+    rep_totals = cube.rollup(['owner_username'])
+    rep_performance = pd.DataFrame({
+        'total_opps': rep_totals['opportunities'],
+        'conversions': rep_totals['conversions'],
+        'conversion_rate': rep_totals['conversion_rate'].round(4),
+        'owner_name': rep_totals['owner_name']
+    })
     
     # Filter for meaningful sample sizes (minimum 20 opportunities)
     rep_performance = rep_performance[rep_performance['total_opps'] >= 20]
@@ -69,8 +84,12 @@ def identify_performance_tiers(raw_data):
     
     return top_performers, bottom_performers, rep_performance
 
-def analyze_communication_patterns(tasks_data, top_performers, bottom_performers):
-    """Analyze real communication patterns from task content"""
+def analyze_communication_patterns(tasks_data, top_performers, bottom_performers, engagement=None, timing_tasks=None):
+    """Analyze real communication patterns from task content
+    
+    timing_tasks is the unfiltered task log used for response timing (every touch counts toward
+    speed-to-lead, not only tasks usable for content analysis); defaults to tasks_data.
+    """
     print("\n🔍 Analyzing communication patterns...")
     
     # Filter tasks for our performance groups
@@ -92,7 +111,16 @@ def analyze_communication_patterns(tasks_data, top_performers, bottom_performers
     patterns['sms_content'] = analyze_sms_content(top_tasks, bottom_tasks)
     
     # 4. Response Time Analysis
-    patterns['response_timing'] = analyze_response_timing(top_tasks, bottom_tasks)
+    if timing_tasks is None:
+        timing_tasks = tasks_data
+    patterns['response_timing'] = analyze_response_timing(
+        timing_tasks[timing_tasks['owner_username'].isin(top_performers)],
+        timing_tasks[timing_tasks['owner_username'].isin(bottom_performers)]
+    )
+    
+    # 5. Engagement Quality (scored once, read from the shared engagement table)
+    if engagement is not None:
+        patterns['engagement_quality'] = analyze_engagement_quality(engagement, top_performers, bottom_performers)
     
     return patterns
 
@@ -100,8 +128,9 @@ def analyze_task_type_distribution(top_tasks, bottom_tasks):
     """Compare task type usage between groups"""
     print("     📈 Analyzing task type distribution...")
     
-    top_dist = top_tasks['task_type'].value_counts(normalize=True)
-    bottom_dist = bottom_tasks['task_type'].value_counts(normalize=True)
+    # Categorical task_type counts list unused types as 0; keep only types the group used
+    top_dist = top_tasks['task_type'].value_counts(normalize=True).loc[lambda dist: dist > 0]
+    bottom_dist = bottom_tasks['task_type'].value_counts(normalize=True).loc[lambda dist: dist > 0]
     
     analysis = {
         'top_distribution': top_dist.to_dict(),
@@ -150,9 +179,14 @@ def analyze_call_content(top_tasks, bottom_tasks):
         'positive': ['great', 'excellent', 'perfect', 'awesome', 'fantastic', 'amazing']
     }
     
-    for pattern_name, keywords in patterns.items():
-        top_usage = calculate_keyword_usage(top_calls, keywords)
-        bottom_usage = calculate_keyword_usage(bottom_calls, keywords)
+    # Evaluate every pattern group over both tiers in one pass, then split the matrix by tier
+    pattern_hits = build_pattern_matrix(pd.concat([top_calls, bottom_calls], ignore_index=True), patterns)
+    top_usage_rates = pattern_hits.iloc[:len(top_calls)].mean()
+    bottom_usage_rates = pattern_hits.iloc[len(top_calls):].mean()
+    
+    for pattern_name in patterns:
+        top_usage = top_usage_rates[pattern_name]
+        bottom_usage = bottom_usage_rates[pattern_name]
         
         if abs(top_usage - bottom_usage) > 0.1:  # 10% difference threshold
             direction = "more" if top_usage > bottom_usage else "less"
@@ -216,19 +250,166 @@ def analyze_sms_content(top_tasks, bottom_tasks):
     
     return analysis
 
+# Timing metrics: (insight wording, minimum median gap in minutes worth reporting)
+TIMING_METRICS = {
+    'response_latency': ('respond to inbound messages', 15),
+    'time_to_first_contact': ('reach new leads', 60),
+    'touch_cadence': ('follow up between outbound touches', 240)
+}
+
+TIMING_PERCENTILES = [0.5, 0.75, 0.9]
+
+def build_task_timeline(tasks):
+    """Sort tasks once per opportunity and derive every timing gap (minutes) with grouped shifts/diffs
+    
+    Returns (task_gaps, opportunity_gaps): response_latency per inbound message that opens an
+    unanswered run (time to the next outbound touch, NaN if none follows), touch_cadence per
+    outbound touch (time since the previous outbound touch), and time_to_first_contact per
+    opportunity (first task to first post_contact task).
+    """
+    
+    timeline = tasks[['opportunity_uuid', 'task_start_timestamp', 'direction', 'task_stage']].copy()
+    timeline['task_start_timestamp'] = pd.to_datetime(timeline['task_start_timestamp'], errors='coerce')
+    timeline = timeline.dropna(subset=['opportunity_uuid', 'task_start_timestamp'])
+    timeline = timeline.sort_values(['opportunity_uuid', 'task_start_timestamp'], kind='stable')
+    
+    opportunity = timeline['opportunity_uuid']
+    timestamp = timeline['task_start_timestamp']
+    inbound = timeline['direction'].eq('Inbound')
+    outbound = timeline['direction'].eq('Outbound')
+    
+    # Inbound -> next outbound touch, measured from the first message of each unanswered inbound run
+    opens_run = inbound & ~inbound.groupby(opportunity, sort=False).shift(fill_value=False).astype(bool)
+    next_outbound = timestamp.where(outbound).groupby(opportunity, sort=False).bfill()
+    response_latency = (next_outbound - timestamp).where(opens_run)
+    
+    # Gap since the previous outbound touch on the same opportunity
+    touch_cadence = timestamp[outbound].groupby(opportunity[outbound], sort=False).diff().reindex(timeline.index)
+    
+    # First attempt -> first post_contact task, one value per opportunity
+    by_opportunity = pd.DataFrame({
+        'first_task': timestamp,
+        'first_contact': timestamp.where(timeline['task_stage'].eq('post_contact'))
+    }).groupby(opportunity, sort=False).min()
+    
+    task_gaps = pd.DataFrame({
+        'response_latency': response_latency.dt.total_seconds() / 60,
+        'touch_cadence': touch_cadence.dt.total_seconds() / 60,
+        'opens_run': opens_run,
+        'unanswered': opens_run & next_outbound.isna()
+    })
+    opportunity_gaps = pd.DataFrame({
+        'time_to_first_contact': (by_opportunity['first_contact'] - by_opportunity['first_task']).dt.total_seconds() / 60
+    })
+    
+    return task_gaps, opportunity_gaps
+
+def summarize_timing(minutes):
+    """Latency distribution summary (count, mean and percentiles in minutes)"""
+    
+    minutes = minutes.dropna()
+    summary = {'count': int(len(minutes)), 'mean': minutes.mean() if len(minutes) else None}
+    for percentile in TIMING_PERCENTILES:
+        summary[f"p{int(percentile * 100)}"] = minutes.quantile(percentile) if len(minutes) else None
+    return summary
+
+def format_minutes(minutes):
+    """Render a gap in minutes as minutes, hours or days"""
+    
+    if minutes < 120:
+        return f"{minutes:.0f}m"
+    if minutes < 2880:
+        return f"{minutes / 60:.1f}h"
+    return f"{minutes / 1440:.1f}d"
+
 def analyze_response_timing(top_tasks, bottom_tasks):
-    """Analyze response timing patterns"""
+    """Analyze response timing patterns: inbound response latency, time to first contact and touch cadence"""
     print("     ⏰ Analyzing response timing patterns...")
     
-    # This would require timestamp analysis - placeholder for now
-    return {
-        'insights': ['Response timing analysis requires additional timestamp processing']
+    required = {'opportunity_uuid', 'task_start_timestamp', 'direction', 'task_stage'}
+    if not required.issubset(top_tasks.columns) or len(top_tasks) == 0 or len(bottom_tasks) == 0:
+        return {'insights': ['Insufficient timestamp data for response timing analysis']}
+    
+    # One sorted timeline for both tiers, split afterwards
+    tasks = pd.concat([top_tasks.assign(tier='top'), bottom_tasks.assign(tier='bottom')], ignore_index=True)
+    task_gaps, opportunity_gaps = build_task_timeline(tasks)
+    task_tier = tasks['tier'].reindex(task_gaps.index)
+    opportunity_tier = tasks.drop_duplicates('opportunity_uuid').set_index('opportunity_uuid')['tier'].reindex(opportunity_gaps.index)
+    
+    analysis = {'insights': []}
+    for metric in TIMING_METRICS:
+        gaps, tier = (opportunity_gaps, opportunity_tier) if metric in opportunity_gaps.columns else (task_gaps, task_tier)
+        analysis[metric] = {group: summarize_timing(gaps.loc[tier == group, metric]) for group in ['top', 'bottom']}
+    
+    # Share of inbound runs that never got an outbound reply
+    analysis['unanswered_rate'] = {
+        group: task_gaps.loc[task_gaps['opens_run'] & (task_tier == group), 'unanswered'].mean()
+        for group in ['top', 'bottom']
     }
+    
+    # Compare medians between tiers
+    for metric, (label, threshold) in TIMING_METRICS.items():
+        top_median = analysis[metric]['top']['p50']
+        bottom_median = analysis[metric]['bottom']['p50']
+        if top_median is None or bottom_median is None:
+            continue
+        if abs(top_median - bottom_median) > threshold:
+            if top_median < bottom_median:
+                analysis['insights'].append(
+                    f"Top performers {label} faster (median {format_minutes(top_median)} vs {format_minutes(bottom_median)})"
+                )
+            else:
+                analysis['insights'].append(
+                    f"Top performers take longer to {label} (median {format_minutes(top_median)} vs {format_minutes(bottom_median)})"
+                )
+    
+    return analysis
+
+def analyze_engagement_quality(engagement, top_performers, bottom_performers):
+    """Compare engagement scores, notes integration and playbook adherence between groups"""
+    print("     🤝 Analyzing engagement quality...")
+    
+    top_scores = engagement[engagement['owner_username'].isin(top_performers)]
+    bottom_scores = engagement[engagement['owner_username'].isin(bottom_performers)]
+    
+    if len(top_scores) == 0 or len(bottom_scores) == 0:
+        return {'insights': ['Insufficient engagement data for analysis']}
+    
+    analysis = {
+        'top_scored_count': len(top_scores),
+        'bottom_scored_count': len(bottom_scores),
+        'top_avg_score': top_scores['engagement_score'].mean(),
+        'bottom_avg_score': bottom_scores['engagement_score'].mean(),
+        'insights': []
+    }
+    
+    if abs(analysis['top_avg_score'] - analysis['bottom_avg_score']) > 5:  # 5 point difference
+        direction = "higher" if analysis['top_avg_score'] > analysis['bottom_avg_score'] else "lower"
+        analysis['insights'].append(
+            f"Top performers score {direction} on engagement ({analysis['top_avg_score']:.0f} vs {analysis['bottom_avg_score']:.0f} avg)"
+        )
+    
+    # Level codes above 0 mean the task referenced notes / handled an objection per the playbook
+    signals = {
+        'prospect notes in outreach': 'notes_integration',
+        'playbook objection handling': 'playbook_adherence'
+    }
+    
+    for signal_name, column in signals.items():
+        top_rate = (top_scores[column] > 0).mean()
+        bottom_rate = (bottom_scores[column] > 0).mean()
+        
+        if abs(top_rate - bottom_rate) > 0.1:  # 10% difference threshold
+            direction = "more" if top_rate > bottom_rate else "less"
+            analysis['insights'].append(
+                f"Top performers use {direction} {signal_name} ({top_rate:.1%} vs {bottom_rate:.1%})"
+            )
+    
+    return analysis
 
 def calculate_keyword_usage(text_series, keywords):
     """Calculate the percentage of texts containing any of the keywords"""
-    pattern = '|'.join(re.escape(word.lower()) for word in keywords)
-    matches = text_series.str.lower().str.contains(pattern, na=False)
+    matches = build_pattern_matrix(text_series, {'keywords': keywords})['keywords']
     return matches.mean()
 
 def generate_enhanced_report(patterns, top_performers, bottom_performers, rep_performance):
@@ -302,6 +483,49 @@ def generate_enhanced_report(patterns, top_performers, bottom_performers, rep_pe
                     report_lines.append(f"{i}. \"{preview}\"")
                 report_lines.append("")
     
+    # Response Timing Analysis
+    if 'response_timing' in patterns:
+        timing_analysis = patterns['response_timing']
+        if 'response_latency' in timing_analysis:
+            report_lines.append("## Response Timing Differences")
+            report_lines.append("")
+            report_lines.append(f"**Data Volume:** {timing_analysis['response_latency']['top']['count']} top performer vs {timing_analysis['response_latency']['bottom']['count']} bottom performer inbound responses")
+            report_lines.append("")
+            
+            report_lines.append("### Latency Distributions (median / p75 / p90):")
+            for metric in TIMING_METRICS:
+                tiers = []
+                for group in ['top', 'bottom']:
+                    summary = timing_analysis[metric][group]
+                    if summary['count']:
+                        tiers.append(f"{group} {' / '.join(format_minutes(summary[f'p{int(p * 100)}']) for p in TIMING_PERCENTILES)} (n={summary['count']})")
+                    else:
+                        tiers.append(f"{group} n/a")
+                report_lines.append(f"- **{metric.replace('_', ' ').title()}:** {' vs '.join(tiers)}")
+            unanswered = timing_analysis['unanswered_rate']
+            report_lines.append(f"- **Unanswered Inbound:** top {unanswered['top']:.1%} vs bottom {unanswered['bottom']:.1%}")
+            report_lines.append("")
+            
+            if timing_analysis['insights']:
+                report_lines.append("### Key Patterns Identified:")
+                for insight in timing_analysis['insights']:
+                    report_lines.append(f"- {insight}")
+                report_lines.append("")
+    
+    # Engagement Quality Analysis
+    if 'engagement_quality' in patterns:
+        engagement_analysis = patterns['engagement_quality']
+        if engagement_analysis['insights']:
+            report_lines.append("## Engagement Quality Differences")
+            report_lines.append("")
+            report_lines.append(f"**Data Volume:** {engagement_analysis.get('top_scored_count', 0)} top performer vs {engagement_analysis.get('bottom_scored_count', 0)} bottom performer scored tasks")
+            report_lines.append("")
+            
+            report_lines.append("### Key Patterns Identified:")
+            for insight in engagement_analysis['insights']:
+                report_lines.append(f"- {insight}")
+            report_lines.append("")
+    
     # Coaching Recommendations
     report_lines.append("## Coaching Recommendations")
     report_lines.append("")
@@ -328,6 +552,10 @@ def generate_enhanced_report(patterns, top_performers, bottom_performers, rep_pe
                 recommendation = recommendation.replace("Top performers send shorter", "Keep messages concise, use shorter")
                 recommendation = recommendation.replace("Top performers ask fewer", "Focus questions, ask fewer")
                 report_lines.append(f"{i}. {recommendation}")
+            elif "faster" in insight.lower():
+                # Speed-to-lead gaps become response time targets
+                recommendation = insight.replace("Top performers", "Train all reps to")
+                report_lines.append(f"{i}. {recommendation}")
         report_lines.append("")
     else:
         report_lines.append("No significant patterns identified in current data. Consider expanding analysis period or data sources.")
@@ -351,24 +579,35 @@ def generate_enhanced_report(patterns, top_performers, bottom_performers, rep_pe
 def main():
     """Main enhanced QA analysis workflow"""
     
+    import argparse
+    parser = argparse.ArgumentParser(description='Enhanced QA analysis with real task content')
+    parser.add_argument('--no-archive', action='store_true', help='Keep existing results in place (run_analysis.py archives them once per run)')
+    args = parser.parse_args()
+    
     # Archive existing results
-    import sys
-    sys.path.append('../utilities')
-    from archive_manager import ArchiveManager
-    archive_manager = ArchiveManager()
-    archive_manager.prepare_for_new_analysis()
+    if not args.no_archive:
+        from archive_manager import ArchiveManager
+        archive_manager = ArchiveManager()
+        archive_manager.prepare_for_new_analysis()
     
     print("🔍 Starting enhanced QA analysis with real task content...")
     
     try:
         # Load all data
-        raw_data, tasks_data = load_all_data()
+        raw_data, tasks_data, all_tasks = load_all_data()
+        
+        # Identify performance tiers from the shared conversion cube
+        import os
+        from conversion_cube import load_conversion_cube
+        cube = load_conversion_cube("data/bigquery_raw_data.csv", os.path.join("data", "cache"), raw_data)
+        top_performers, bottom_performers, rep_performance = identify_performance_tiers(raw_data, cube)
         
-        # Identify performance tiers
-        top_performers, bottom_performers, rep_performance = identify_performance_tiers(raw_data)
+        # Load shared engagement scores (rescored only if the rules or task data changed)
+        from engagement_table import get_engagement_table, ENGAGEMENT_TABLE_FILE
+        engagement = get_engagement_table(tasks_data, raw_data, os.path.join("data", "cache", ENGAGEMENT_TABLE_FILE))
         
         # Analyze communication patterns
-        patterns = analyze_communication_patterns(tasks_data, top_performers, bottom_performers)
+        patterns = analyze_communication_patterns(tasks_data, top_performers, bottom_performers, engagement, all_tasks)
         
         # Generate report
         report = generate_enhanced_report(patterns, top_performers, bottom_performers, rep_performance)
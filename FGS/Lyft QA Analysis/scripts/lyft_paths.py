@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Lyft Paths - Puts the project's utilities/ folder and the shared FGS modules (shared/) on sys.path
+Scripts in this folder import it before any utilities or shared module: import lyft_paths  # noqa: F401
+"""
+
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILITIES_DIR = os.path.join(PROJECT_DIR, 'utilities')
+# BigQuery client and query result cache shared with the SMS and DD analyses
+SHARED_DIR = os.path.join(os.path.dirname(PROJECT_DIR), 'shared')
+
+for path in (UTILITIES_DIR, SHARED_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
@@ -10,6 +10,7 @@ This script analyzes performance data to:
 """
 
 import pandas as pd
+import numpy as np
 import json
 import argparse
 from datetime import datetime
@@ -18,6 +19,11 @@ import logging
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 import re
+from concurrent.futures import ThreadPoolExecutor
+import lyft_paths  # noqa: F401
+from text_features import build_keyword_matrix
+from sheet_cache import SheetCache
+from columnar_store import parse_bool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,6 +38,8 @@ class PerformanceMetrics:
     total_conversions: int
     avg_call_duration: Optional[float] = None
     avg_response_time: Optional[float] = None
+    conversion_rate_ci: Optional[Tuple[float, float]] = None  # 95% bootstrap interval
+    tier_probability: Optional[float] = None  # Share of resamples keeping the rep in its tier
 
 @dataclass
 class TrendAnalysis:
@@ -42,10 +50,44 @@ class TrendAnalysis:
     confidence_score: float
     sample_size: int
 
+def bootstrap_conversion_rates(opportunities: np.ndarray, conversions: np.ndarray, n_resamples: int = 2000,
+                               top_count: int = 1, low_count: int = 1, seed: Optional[int] = 42) -> Dict[str, np.ndarray]:
+    """Bootstrap every rep's conversion rate and tier membership in one batch
+    
+    Resampling a rep's n opportunities with replacement only changes how many of them converted,
+    which is a Binomial(n, conversions / n) draw, so all reps x resamples are drawn as one matrix.
+    Each resample is ranked to recount the top_count / low_count tiers. Reps without
+    opportunities get NaN intervals and never enter a tier.
+    """
+    opportunities = np.asarray(opportunities, dtype=np.int64)
+    conversions = np.asarray(conversions, dtype=np.int64)
+    has_data = opportunities > 0
+    observed = np.divide(conversions, opportunities, out=np.zeros(len(opportunities)), where=has_data)
+    
+    rng = np.random.default_rng(seed)
+    resampled = rng.binomial(opportunities[:, None], observed[:, None], size=(len(opportunities), n_resamples))
+    rates = resampled / np.where(has_data, opportunities, 1)[:, None]
+    
+    # Rank reps within each resample (random tie-breaks); reps without data rank last for both tiers
+    tie_break = rng.random(rates.shape)
+    rank_desc = np.lexsort((tie_break, -np.where(has_data[:, None], rates, -np.inf)), axis=0).argsort(axis=0)
+    rank_asc = np.lexsort((tie_break, np.where(has_data[:, None], rates, np.inf)), axis=0).argsort(axis=0)
+    
+    ci_low, ci_high = np.percentile(rates, [2.5, 97.5], axis=1)
+    return {
+        'ci_low': np.where(has_data, ci_low, np.nan),
+        'ci_high': np.where(has_data, ci_high, np.nan),
+        'top_probability': np.where(has_data, (rank_desc < top_count).mean(axis=1), 0.0),
+        'low_probability': np.where(has_data, (rank_asc < low_count).mean(axis=1), 0.0)
+    }
+
 class LyftQAGenerator:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", bootstrap_resamples: int = 2000,
+                 sheet_cache: Optional[SheetCache] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.bootstrap_resamples = bootstrap_resamples
+        self.sheet_cache = sheet_cache or SheetCache()
         
         # Data storage
         self.commission_data = None
@@ -53,6 +95,9 @@ class LyftQAGenerator:
         self.tasks_data = None
         self.top_performers = []
         self.low_performers = []
+        self.top_count = 0
+        self.low_count = 0
+        self.bootstrap = None
         
         # Results
         self.trends = []
@@ -78,18 +123,35 @@ class LyftQAGenerator:
         # Return CSV export URL
         return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
     
+    def _read_source(self, file_path: str) -> pd.DataFrame:
+        """Read a CSV from a local path, Google Sheets URL or HTTP URL (remote sources go through the sheet cache)"""
+        if self._is_google_sheets_url(file_path):
+            logger.info(f"Converting Google Sheets URL to CSV format")
+            file_path = self._convert_google_sheets_url(file_path)
+        if file_path.startswith(('http://', 'https://')):
+            file_path = self.sheet_cache.fetch(file_path)
+        return pd.read_csv(file_path)
+    
+    def load_sources(self, commission_path: str, conversion_path: str, tasks_path: str):
+        """Load the commission, conversion and tasks inputs concurrently
+        
+        Each loader sets its own attribute, so the three downloads can overlap safely.
+        """
+        loads = [
+            (self.load_commission_dashboard, commission_path),
+            (self.load_conversion_data, conversion_path),
+            (self.load_tasks_data, tasks_path)
+        ]
+        with ThreadPoolExecutor(max_workers=len(loads)) as executor:
+            futures = [executor.submit(load, path) for load, path in loads]
+            return tuple(future.result() for future in futures)
+    
     def load_commission_dashboard(self, file_path: str) -> pd.DataFrame:
         """Load commission dashboard CSV with top performer data"""
         logger.info(f"Loading commission dashboard from {file_path}")
         
         try:
-            # Handle Google Sheets URLs
-            if self._is_google_sheets_url(file_path):
-                csv_url = self._convert_google_sheets_url(file_path)
-                logger.info(f"Converting Google Sheets URL to CSV format")
-                df = pd.read_csv(csv_url)
-            else:
-                df = pd.read_csv(file_path)
+            df = self._read_source(file_path)
             logger.info(f"Loaded {len(df)} records from commission dashboard")
             
             # Expected columns (adjust based on actual CSV structure)
@@ -112,13 +174,7 @@ class LyftQAGenerator:
         logger.info(f"Loading conversion data from {file_path}")
         
         try:
-            # Handle Google Sheets URLs
-            if self._is_google_sheets_url(file_path):
-                csv_url = self._convert_google_sheets_url(file_path)
-                logger.info(f"Converting Google Sheets URL to CSV format")
-                df = pd.read_csv(csv_url)
-            else:
-                df = pd.read_csv(file_path)
+            df = self._read_source(file_path)
             logger.info(f"Loaded {len(df)} conversion records")
             
             # Expected columns
@@ -140,13 +196,7 @@ class LyftQAGenerator:
         logger.info(f"Loading tasks data from {file_path}")
         
         try:
-            # Handle Google Sheets URLs
-            if self._is_google_sheets_url(file_path):
-                csv_url = self._convert_google_sheets_url(file_path)
-                logger.info(f"Converting Google Sheets URL to CSV format")
-                df = pd.read_csv(csv_url)
-            else:
-                df = pd.read_csv(file_path)
+            df = self._read_source(file_path)
             logger.info(f"Loaded {len(df)} task records")
             
             # Expected columns
@@ -186,6 +236,8 @@ class LyftQAGenerator:
             top_performers.append(metrics)
         
         self.top_performers = top_performers
+        self.top_count = top_count
+        self.bootstrap = None
         logger.info(f"Identified {len(top_performers)} top performers")
         return top_performers
     
@@ -212,9 +264,78 @@ class LyftQAGenerator:
             low_performers.append(metrics)
         
         self.low_performers = low_performers
+        self.low_count = low_count
+        self.bootstrap = None
         logger.info(f"Identified {len(low_performers)} low performers")
         return low_performers
     
+    def _rep_outcome_counts(self) -> pd.DataFrame:
+        """Opportunities and conversions per rep, from conversion_data outcomes or the commission totals"""
+        if self.conversion_data is not None and {'rep_id', 'converted'} <= set(self.conversion_data.columns):
+            # CSV/Sheets exports can carry 'True'/'False' text, which astype(bool) would treat as all True
+            outcomes = pd.DataFrame({
+                'rep_id': self.conversion_data['rep_id'],
+                'converted': parse_bool(self.conversion_data['converted']).astype(int).values
+            })
+            counts = outcomes.groupby('rep_id')['converted'].agg(['size', 'sum'])
+            counts.columns = ['opportunities', 'conversions']
+        elif self.commission_data is not None and {'total_opportunities', 'total_conversions'} <= set(self.commission_data.columns):
+            counts = self.commission_data.set_index('rep_id')[['total_opportunities', 'total_conversions']]
+            counts.columns = ['opportunities', 'conversions']
+        else:
+            return pd.DataFrame(columns=['opportunities', 'conversions'])
+        
+        # Bootstrap the same reps the tiers were ranked from
+        if self.commission_data is not None:
+            counts = counts.reindex(self.commission_data['rep_id'].drop_duplicates())
+        return counts.fillna(0).astype(int)
+    
+    def bootstrap_performance(self, n_resamples: Optional[int] = None, seed: Optional[int] = 42) -> pd.DataFrame:
+        """Bootstrap conversion rate intervals and tier membership for every rep
+        
+        Fills conversion_rate_ci and tier_probability on the identified performers and
+        returns one row per rep with ci_low, ci_high, top_probability and low_probability.
+        """
+        counts = self._rep_outcome_counts()
+        n_resamples = n_resamples or self.bootstrap_resamples
+        logger.info(f"Bootstrapping {len(counts)} reps x {n_resamples} resamples...")
+        
+        results = bootstrap_conversion_rates(
+            counts['opportunities'].values, counts['conversions'].values, n_resamples,
+            top_count=self.top_count, low_count=self.low_count, seed=seed
+        )
+        bootstrap = pd.DataFrame(results, index=counts.index)
+        
+        for performers, probability in [(self.top_performers, 'top_probability'), (self.low_performers, 'low_probability')]:
+            for metrics in performers:
+                if metrics.rep_id in bootstrap.index and counts.at[metrics.rep_id, 'opportunities'] > 0:
+                    row = bootstrap.loc[metrics.rep_id]
+                    metrics.conversion_rate_ci = (float(row['ci_low']), float(row['ci_high']))
+                    metrics.tier_probability = float(row[probability])
+        
+        self.bootstrap = bootstrap
+        return bootstrap
+    
+    def _trend_confidence(self, channel_data: pd.DataFrame, top_rep_ids: List[str], low_rep_ids: List[str]) -> float:
+        """Confidence that a channel's top vs low comparison holds up under resampling
+        
+        Averages each tier's bootstrap membership probability, weighting reps by their
+        task count in the channel so the reps driving the trend count the most.
+        """
+        if self.bootstrap is None or self.bootstrap.empty:
+            logger.warning("No rep outcome counts to bootstrap; trend confidence set to 0")
+            return 0.0
+        
+        task_counts = channel_data['rep_id'].value_counts()
+        tier_confidence = []
+        for rep_ids, probability in [(top_rep_ids, 'top_probability'), (low_rep_ids, 'low_probability')]:
+            weights = task_counts.reindex(rep_ids).fillna(0)
+            probabilities = self.bootstrap[probability].reindex(rep_ids).fillna(0)
+            if weights.sum() > 0:
+                tier_confidence.append(float(np.average(probabilities, weights=weights)))
+        
+        return round(float(np.mean(tier_confidence)), 3) if tier_confidence else 0.0
+    
     def analyze_communication_patterns(self) -> List[TrendAnalysis]:
         """Analyze communication patterns between top and low performers"""
         logger.info("Analyzing communication patterns...")
@@ -226,6 +347,8 @@ class LyftQAGenerator:
             raise ValueError("Tasks and conversion data required")
         
         trends = []
+        if self.bootstrap is None:
+            self.bootstrap_performance()
         
         # Get rep IDs
         top_rep_ids = [p.rep_id for p in self.top_performers]
@@ -239,18 +362,19 @@ class LyftQAGenerator:
             how='inner'
         )
         
-        # Analyze call patterns
+        # Analyze call patterns (keyword matrix built once, split by tier)
         call_data = merged_data[merged_data['task_type'] == 'call']
         if not call_data.empty:
-            top_call_trends = self._analyze_call_patterns(call_data, top_rep_ids)
-            low_call_trends = self._analyze_call_patterns(call_data, low_rep_ids)
+            call_keyword_hits = build_keyword_matrix(call_data['content'], self._call_keywords())
+            top_call_trends = self._analyze_call_patterns(call_data, top_rep_ids, call_keyword_hits)
+            low_call_trends = self._analyze_call_patterns(call_data, low_rep_ids, call_keyword_hits)
             
             if top_call_trends and low_call_trends:
                 trend = TrendAnalysis(
                     pattern_type='call_patterns',
                     top_performer_trend=top_call_trends,
                     low_performer_trend=low_call_trends,
-                    confidence_score=0.8,  # TODO: Calculate actual confidence
+                    confidence_score=self._trend_confidence(call_data, top_rep_ids, low_rep_ids),
                     sample_size=len(call_data)
                 )
                 trends.append(trend)
@@ -266,7 +390,7 @@ class LyftQAGenerator:
                     pattern_type='sms_patterns',
                     top_performer_trend=top_sms_trends,
                     low_performer_trend=low_sms_trends,
-                    confidence_score=0.75,
+                    confidence_score=self._trend_confidence(sms_data, top_rep_ids, low_rep_ids),
                     sample_size=len(sms_data)
                 )
                 trends.append(trend)
@@ -275,27 +399,42 @@ class LyftQAGenerator:
         logger.info(f"Identified {len(trends)} trend patterns")
         return trends
     
-    def _analyze_call_patterns(self, call_data: pd.DataFrame, rep_ids: List[str]) -> str:
-        """Analyze call-specific patterns for given reps"""
-        rep_calls = call_data[call_data['rep_id'].isin(rep_ids)]
+    # Common call patterns to look for
+    CALL_PATTERNS = {
+        'urgency_words': ['today', 'now', 'immediately', 'asap', 'urgent'],
+        'benefit_words': ['save', 'earn', 'benefit', 'money', 'income'],
+        'personal_words': ['you', 'your', 'specifically', 'personally'],
+        'action_words': ['start', 'begin', 'try', 'test', 'schedule']
+    }
+    
+    def _call_keywords(self) -> List[str]:
+        """Every keyword across CALL_PATTERNS"""
+        return [word for keywords in self.CALL_PATTERNS.values() for word in keywords]
+    
+    def _analyze_call_patterns(self, call_data: pd.DataFrame, rep_ids: List[str],
+                               keyword_hits: Optional[pd.DataFrame] = None) -> str:
+        """Analyze call-specific patterns for given reps
+        
+        keyword_hits is a build_keyword_matrix of call_data content; without it the reps'
+        calls are scanned directly.
+        """
+        rep_mask = call_data['rep_id'].isin(rep_ids)
+        rep_calls = call_data[rep_mask]
         
         if rep_calls.empty:
             return "Insufficient call data"
         
-        # Analyze content patterns (basic keyword analysis)
-        all_content = ' '.join(rep_calls['content'].dropna().astype(str))
-        
-        # Common patterns to look for
-        patterns = {
-            'urgency_words': ['today', 'now', 'immediately', 'asap', 'urgent'],
-            'benefit_words': ['save', 'earn', 'benefit', 'money', 'income'],
-            'personal_words': ['you', 'your', 'specifically', 'personally'],
-            'action_words': ['start', 'begin', 'try', 'test', 'schedule']
-        }
+        # Analyze content patterns (basic keyword analysis): which keywords appear in any rep call
+        content = rep_calls['content'].dropna().astype(str)
+        if keyword_hits is None:
+            keyword_hits = build_keyword_matrix(content, self._call_keywords())
+        else:
+            keyword_hits = keyword_hits[rep_mask.values & call_data['content'].notna().values]
+        keywords_used = keyword_hits.any()
         
         results = []
-        for pattern_name, keywords in patterns.items():
-            count = sum(word.lower() in all_content.lower() for word in keywords)
+        for pattern_name, keywords in self.CALL_PATTERNS.items():
+            count = sum(bool(keywords_used[word.lower()]) for word in keywords)
             if count > 0:
                 results.append(f"{pattern_name}: {count} instances")
         
@@ -453,18 +592,17 @@ def main():
     parser.add_argument('--output-dir', default='output', help='Output directory for reports')
     parser.add_argument('--top-percentile', type=float, default=0.2, help='Top performer percentile (default: 0.2)')
     parser.add_argument('--low-percentile', type=float, default=0.3, help='Low performer percentile (default: 0.3)')
+    parser.add_argument('--bootstrap-resamples', type=int, default=2000, help='Bootstrap resamples for confidence scores (default: 2000)')
     
     args = parser.parse_args()
     
     # Archive existing results before starting new analysis
-    import sys
-    sys.path.append('../utilities')
     from archive_manager import ArchiveManager
     archive_manager = ArchiveManager()
     archive_manager.prepare_for_new_analysis()
     
     # Initialize generator
-    generator = LyftQAGenerator(args.output_dir)
+    generator = LyftQAGenerator(args.output_dir, args.bootstrap_resamples)
     
     try:
         # Handle BigQuery vs CSV loading
@@ -507,10 +645,8 @@ def main():
             if not all([args.commission_csv, args.conversion_csv, args.tasks_csv]):
                 raise ValueError("--commission-csv, --conversion-csv, and --tasks-csv are required when not using BigQuery")
             
-            # Load CSV data
-            generator.load_commission_dashboard(args.commission_csv)
-            generator.load_conversion_data(args.conversion_csv)
-            generator.load_tasks_data(args.tasks_csv)
+            # Load CSV data (Google Sheets downloads run concurrently and are revalidated against the local cache)
+            generator.load_sources(args.commission_csv, args.conversion_csv, args.tasks_csv)
         
         # Analyze performance
         generator.identify_top_performers(args.top_percentile)
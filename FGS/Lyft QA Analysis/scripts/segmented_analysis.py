@@ -6,63 +6,81 @@ First Contact Method + Project + Language
 
 import pandas as pd
 from collections import defaultdict
+import lyft_paths  # noqa: F401
 
-def analyze_top_performers_by_segment():
+def load_engagement_scores():
+    """Load the shared engagement table, rescoring it if the rules or the task data changed since it was saved"""
+    
+    import os
+    from columnar_store import RAW_DATA_SCHEMA, TASK_DATA_SCHEMA, load_table
+    from engagement_table import get_engagement_table, ENGAGEMENT_TABLE_FILE, ENGAGEMENT_TASK_COLUMNS
+    
+    raw_file, tasks_file = "../data/bigquery_raw_data.csv", "../data/tasks_data_bigquery.csv"
+    if not (os.path.exists(raw_file) and os.path.exists(tasks_file)):
+        print("⚠️  No task data found, segments will omit engagement scores")
+        return None
+    
+    # Same usable tasks template/enhanced analysis score, so their saved table is reused while it is current
+    raw_data = load_table(raw_file, RAW_DATA_SCHEMA)
+    tasks_data = load_table(tasks_file, TASK_DATA_SCHEMA, columns=ENGAGEMENT_TASK_COLUMNS + ['include_in_conext_analysis'])
+    usable_tasks = tasks_data[tasks_data['include_in_conext_analysis'] == True]
+    
+    engagement = get_engagement_table(usable_tasks, raw_data, f"../data/cache/{ENGAGEMENT_TABLE_FILE}")
+    return engagement[['owner_username', 'experiment', 'engagement_score']]
+
+def load_segment_cube():
+    """Load the shared conversion cube (rebuilt only when the raw BigQuery export changed)"""
+    
+    from conversion_cube import load_conversion_cube
+    
+    return load_conversion_cube("../data/bigquery_raw_data.csv", "../data/cache")
+
+def analyze_top_performers_by_segment(engagement=None, cube=None):
     """Find top performer for each First Contact Method + Project + Language combination"""
     
-    # Load the raw BigQuery data
-    raw_data = pd.read_csv("../data/bigquery_raw_data.csv")
+    # Roll segments up from the conversion cube instead of filtering the raw BigQuery rows
+    if cube is None:
+        cube = load_segment_cube()
     
     print("🔍 Analyzing top performers by segment...")
-    print(f"Total opportunities: {len(raw_data):,}")
-    
-    # Convert boolean conversion column
-    raw_data['full_conversion'] = raw_data['full_conversion'].astype(bool)
+    print(f"Total opportunities: {cube.total_opportunities:,}")
     
     # Group by segment combinations
-    segments = {}
+    segment_keys = ['first_contact_method', 'experiment', 'language']
     
     # Get all unique combinations
-    combinations = raw_data.groupby(['first_contact_method', 'experiment', 'language']).size()
+    combinations = cube.rollup(segment_keys)
+    
+    # Rep totals within every segment, in order of first appearance in the segment
+    segment_reps = cube.rollup(segment_keys + ['owner_username']).sort_values('first_row', kind='stable')
+    reps_by_segment = {key: group.droplevel(segment_keys) for key, group in segment_reps.groupby(level=segment_keys, sort=False, observed=True)}
     
     print(f"\n📊 Found {len(combinations)} unique segments:")
     
     segment_results = []
     
-    for (contact_method, experiment, language), count in combinations.items():
+    for (contact_method, experiment, language), segment in combinations.iterrows():
+        count = segment['opportunities']
         if count < 10:  # Skip segments with too few opportunities
             continue
             
         print(f"\n🎯 Analyzing: {contact_method} + {experiment} + {language}")
         print(f"   Total opportunities in segment: {count}")
         
-        # Filter data for this segment
-        segment_data = raw_data[
-            (raw_data['first_contact_method'] == contact_method) &
-            (raw_data['experiment'] == experiment) &
-            (raw_data['language'] == language)
-        ]
-        
         # Calculate performance by rep within this segment
         rep_performance = []
         
-        for owner_username in segment_data['owner_username'].unique():
-            if pd.isna(owner_username):
+        for owner_username, rep_totals in reps_by_segment.get((contact_method, experiment, language), segment_reps.iloc[:0]).iterrows():
+            if rep_totals['opportunities'] < 5:  # Need minimum 5 opportunities to be meaningful
                 continue
-                
-            rep_segment_data = segment_data[segment_data['owner_username'] == owner_username]
             
-            if len(rep_segment_data) < 5:  # Need minimum 5 opportunities to be meaningful
-                continue
-            
-            rep_name = rep_segment_data['owner_name'].iloc[0]
-            total_opps = len(rep_segment_data)
-            conversions = rep_segment_data['full_conversion'].sum()
+            total_opps = rep_totals['opportunities']
+            conversions = rep_totals['conversions']
             conversion_rate = conversions / total_opps
             
             rep_performance.append({
                 'owner_username': owner_username,
-                'owner_name': rep_name,
+                'owner_name': rep_totals['owner_name'],
                 'total_opportunities': total_opps,
                 'conversions': conversions,
                 'conversion_rate': conversion_rate
@@ -77,8 +95,8 @@ def analyze_top_performers_by_segment():
         top_performer = rep_performance[0]
         
         # Calculate segment averages
-        segment_total_opps = len(segment_data)
-        segment_conversions = segment_data['full_conversion'].sum()
+        segment_total_opps = segment['opportunities']
+        segment_conversions = segment['conversions']
         segment_avg_conversion = segment_conversions / segment_total_opps
         
         segment_result = {
@@ -97,6 +115,14 @@ def analyze_top_performers_by_segment():
             'total_reps_in_segment': len(rep_performance)
         }
         
+        # Top performer's average task engagement in this experiment, from the shared table
+        if engagement is not None:
+            top_scores = engagement[
+                (engagement['owner_username'] == top_performer['owner_username']) &
+                (engagement['experiment'] == experiment)
+            ]['engagement_score']
+            segment_result['top_performer_avg_engagement'] = top_scores.mean() if len(top_scores) else None
+        
         segment_results.append(segment_result)
         
         print(f"   🏆 Top performer: {top_performer['owner_name']} ({top_performer['owner_username']})")
@@ -143,6 +169,8 @@ def generate_segmented_report(segment_results):
         report_lines.append(f"- **Segment Average:** {segment['segment_avg_conversion_rate']:.2%}")
         report_lines.append(f"- **Advantage:** +{segment['performance_advantage']:.2%}")
         report_lines.append(f"- **Total Reps in Segment:** {segment['total_reps_in_segment']}")
+        if segment.get('top_performer_avg_engagement') is not None:
+            report_lines.append(f"- **Avg Engagement Score:** {segment['top_performer_avg_engagement']:.0f}/100")
         report_lines.append("")
     
     # All segments breakdown
@@ -223,8 +251,6 @@ def main():
     """Main segmented analysis workflow"""
     
     # Archive existing results before starting new analysis
-    import sys
-    sys.path.append('../utilities')
     from archive_manager import ArchiveManager
     archive_manager = ArchiveManager()
     archive_manager.prepare_for_new_analysis()
@@ -232,7 +258,7 @@ def main():
     print("🎯 Starting segmented analysis...")
     
     # Analyze segments
-    segment_results = analyze_top_performers_by_segment()
+    segment_results = analyze_top_performers_by_segment(load_engagement_scores())
     
     # Generate report
     report = generate_segmented_report(segment_results)
@@ -9,6 +9,19 @@ import numpy as np
 from datetime import datetime
 from collections import defaultdict
 import re
+import heapq
+import lyft_paths  # noqa: F401
+from engagement_table import (
+    ENGAGEMENT_STRENGTHS, ENGAGEMENT_WEAKNESSES, ENGAGEMENT_RECOMMENDATIONS, ENGAGEMENT_LEVELS, EXIT_ASSESSMENTS,
+    ENGAGEMENT_TABLE_FILE, text_column, contains_any, build_notes_features, match_notes_keywords,
+    join_tasks_to_opportunities, score_engagement_batch, get_engagement_table
+)
+
+# Task columns the template reads (timestamps, stage and direction are only used by the enhanced timing analysis)
+TEMPLATE_TASK_COLUMNS = [
+    'opportunity_uuid', 'owner_username', 'language', 'experiment', 'first_contact_method',
+    'task_type', 'include_in_conext_analysis', 'task_summary'
+]
 
 def load_and_merge_data():
     """Load and merge all data sources for template analysis"""
@@ -21,11 +34,13 @@ def load_and_merge_data():
     project_dir = os.path.dirname(script_dir)
     data_dir = os.path.join(project_dir, 'data')
     
-    # Load performance data
-    raw_data = pd.read_csv(os.path.join(data_dir, "bigquery_raw_data.csv"))
+    from columnar_store import RAW_DATA_SCHEMA, TASK_DATA_SCHEMA, load_table
+    
+    # Load performance data (typed columnar copy: real booleans, parsed dates, categorical dimensions)
+    raw_data = load_table(os.path.join(data_dir, "bigquery_raw_data.csv"), RAW_DATA_SCHEMA)
     
-    # Load real task content
-    tasks_data = pd.read_csv(os.path.join(data_dir, "tasks_data_bigquery.csv"))
+    # Load real task content (only the columns the template reads)
+    tasks_data = load_table(os.path.join(data_dir, "tasks_data_bigquery.csv"), TASK_DATA_SCHEMA, columns=TEMPLATE_TASK_COLUMNS)
     
     # Load control baselines
     try:
@@ -38,15 +53,11 @@ def load_and_merge_data():
     print(f"   📈 Raw opportunity data: {len(raw_data):,} records")
     print(f"   📱 Task data: {len(tasks_data):,} records")
     
-    # Convert boolean conversion column
-    raw_data['full_conversion'] = raw_data['full_conversion'].astype(bool)
-    
     # Filter to usable tasks only
     usable_tasks = tasks_data[tasks_data['include_in_conext_analysis'] == True]
     print(f"   ✅ Usable tasks for analysis: {len(usable_tasks):,} records")
     
     # Get date range
-    raw_data['first_contact_date'] = pd.to_datetime(raw_data['first_contact_date'])
     date_range = f"{raw_data['first_contact_date'].min().strftime('%Y-%m-%d')} to {raw_data['first_contact_date'].max().strftime('%Y-%m-%d')}"
     
     # Count calls and SMS
@@ -62,72 +73,143 @@ def load_and_merge_data():
     
     return raw_data, usable_tasks, control_baselines, metadata
 
-def get_control_baseline(experiment, language, control_baselines):
-    """Get control baseline conversion rate for a specific experiment (ignoring language)"""
+def build_opportunity_index(raw_data):
+    """Index opportunities by opportunity_uuid for O(1) per-task lookups (rows kept in raw_data order)"""
+    
+    opp_index = {}
+    for opp in raw_data.to_dict('records'):
+        opportunity_uuid = opp['opportunity_uuid']
+        if pd.isna(opportunity_uuid):
+            continue
+        opp_index.setdefault(opportunity_uuid, []).append(opp)
+    
+    return opp_index
+
+def lookup_opportunity(opp_index, opportunity_uuid, owner_username=None, experiment=None):
+    """Return the first opportunity row for a task, optionally restricted to an owner and experiment"""
+    
+    for opp in opp_index.get(opportunity_uuid, ()):
+        if owner_username is not None and opp['owner_username'] != owner_username:
+            continue
+        if experiment is not None and opp['experiment'] != experiment:
+            continue
+        return opp
+    
+    return None
+
+def build_control_baseline_index(control_baselines):
+    """Index control baselines by (xp_month, experiment, language) once, with experiment-only fallback"""
+    
+    from control_baselines import ControlBaselineIndex
+    
+    return ControlBaselineIndex(control_baselines)
+
+def build_conversion_cube(raw_data):
+    """Aggregate raw opportunities into the shared experiment x language x method x rep x day cube"""
+    
+    from conversion_cube import ConversionCube
     
-    if control_baselines.empty:
+    return ConversionCube.from_raw(raw_data)
+
+def get_control_baseline(experiment, language, control_baselines, xp_month=None):
+    """Get control baseline conversion rate for a specific experiment (and month, if given), ignoring language"""
+    
+    baseline_index = control_baselines if hasattr(control_baselines, 'lookup') else build_control_baseline_index(control_baselines)
+    if baseline_index.empty:
         return 0.0
     
-    # Find matching baseline by experiment only (ignore language)
-    match = control_baselines[control_baselines['experiment'] == experiment]
+    # Template baselines are per experiment, like the cohort join in analyze_by_cohort
+    baseline = baseline_index.lookup(experiment, language=None, xp_month=xp_month)
     
-    if not match.empty:
-        return match.iloc[0]['control_conversion_rate']
+    if baseline is not None:
+        return baseline
     else:
         print(f"⚠️  No control baseline found for {experiment}, using 0%")
         return 0.0
 
-def analyze_by_cohort(raw_data, tasks_data, control_baselines):
-    """Analyze performance by each cohort (experiment + contact method + language)"""
+def analyze_by_cohort(raw_data, tasks_data, control_baselines, cube=None):
+    """Analyze performance by each cohort (experiment + contact method + language)
+    
+    Counts are rolled up from the conversion cube (built from raw_data when not passed in).
+    """
     print("🎯 Analyzing performance by cohort...")
     
+    if cube is None:
+        cube = build_conversion_cube(raw_data)
+    
     # Group by cohort
     cohort_data = {}
-    
-    # Get all unique combinations
-    combinations = raw_data.groupby(['experiment', 'first_contact_method', 'language']).size()
-    
-    for (experiment, contact_method, language), count in combinations.items():
-        if count < 10:  # Skip small cohorts
-            continue
-            
+    cohort_keys = ['experiment', 'first_contact_method', 'language']
+    
+    # Get all unique combinations, skipping small cohorts
+    combinations = cube.rollup(cohort_keys)['opportunities']
+    combinations = combinations[combinations >= 10]
+    
+    # Calculate rep performance for every cohort from the cube's rep-level roll-up
+    rep_totals = cube.rollup(cohort_keys + ['owner_username'])
+    all_rep_performance = pd.DataFrame({
+        'owned_leads': rep_totals['opportunities'],
+        'converted_leads': rep_totals['conversions'],
+        'conversion_rate': rep_totals['conversion_rate'].round(4),
+        'owner_name': rep_totals['owner_name']
+    })
+    
+    # Keep reps in cohorts large enough to analyze
+    cohort_index = all_rep_performance.index.droplevel('owner_username')
+    all_rep_performance = all_rep_performance[cohort_index.isin(combinations.index)]
+    
+    # Exclude system accounts
+    excluded_accounts = ['hevoapi@getsales.team', 'awsintegrationapi', 'techadmin']
+    usernames = all_rep_performance.index.get_level_values('owner_username')
+    all_rep_performance = all_rep_performance[~usernames.str.lower().isin([acc.lower() for acc in excluded_accounts])]
+    
+    # Store original performance for individual recommendations
+    all_original_performance = all_rep_performance.copy()
+    
+    # Filter for meaningful sample sizes (minimum 25 opportunities in cohort)
+    all_rep_performance = all_rep_performance[all_rep_performance['owned_leads'] >= 25].copy()
+    
+    # Calculate percentage of leads in this cohort
+    cohort_index = all_rep_performance.index.droplevel('owner_username')
+    all_rep_performance['pct_of_cohort'] = all_rep_performance['owned_leads'] / combinations.reindex(cohort_index).values
+    
+    # Calculate lift vs control baseline (ignore language parameter). Every opportunity is joined to the
+    # baseline of its first-contact month, so cohorts spanning several months (e.g. quarterly runs)
+    # compare each rep against the lead-weighted baseline of the months they actually worked
+    baseline_index = build_control_baseline_index(control_baselines)
+    if baseline_index.empty:
+        all_rep_performance['control_baseline'] = 0.0
+    else:
+        cells = cube.cells.dropna(subset=cohort_keys + ['owner_username'])
+        date_col = 'contact_day' if 'contact_day' in cells.columns else None
+        cell_baselines = baseline_index.join(cells, date_col=date_col)
+        for experiment in cells.loc[cell_baselines.isna(), 'experiment'].unique():
+            if experiment in all_rep_performance.index.get_level_values('experiment'):
+                print(f"⚠️  No control baseline found for {experiment}, using 0%")
+        
+        cell_baselines = cell_baselines.fillna(0.0)
+        rep_baselines = pd.DataFrame({
+            'weighted': cell_baselines * cells['opportunities'],
+            'opportunities': cells['opportunities'],
+            'min': cell_baselines,
+            'max': cell_baselines
+        }).groupby([cells[key] for key in cohort_keys + ['owner_username']], observed=True).agg({'weighted': 'sum', 'opportunities': 'sum', 'min': 'min', 'max': 'max'})
+        rep_baselines = rep_baselines.reindex(all_rep_performance.index)
+        # Single-month reps keep the exact monthly rate rather than a re-averaged float
+        lead_weighted = rep_baselines['weighted'] / rep_baselines['opportunities']
+        all_rep_performance['control_baseline'] = rep_baselines['min'].where(rep_baselines['min'] == rep_baselines['max'], lead_weighted).values
+    all_rep_performance['lift'] = all_rep_performance['conversion_rate'] - all_rep_performance['control_baseline']
+    
+    # Split the aggregate back into per-cohort frames indexed by owner_username
+    rep_groups = {key: group.droplevel(cohort_keys) for key, group in all_rep_performance.groupby(level=cohort_keys, sort=False, observed=True)}
+    original_groups = {key: group.droplevel(cohort_keys) for key, group in all_original_performance.groupby(level=cohort_keys, sort=False, observed=True)}
+    empty_performance = all_rep_performance.iloc[:0].droplevel(cohort_keys)
+    
+    for (experiment, contact_method, language), total_cohort_leads in combinations.items():
         cohort_key = f"{experiment}|{contact_method}|{language}"
         
-        # Filter data for this cohort
-        cohort_opps = raw_data[
-            (raw_data['experiment'] == experiment) &
-            (raw_data['first_contact_method'] == contact_method) &
-            (raw_data['language'] == language)
-        ]
-        
-        # Calculate rep performance within this cohort
-        rep_performance = cohort_opps.groupby('owner_username').agg({
-            'full_conversion': ['count', 'sum', 'mean'],
-            'owner_name': 'first'
-        }).round(4)
-        
-        # Flatten column names
-        rep_performance.columns = ['owned_leads', 'converted_leads', 'conversion_rate', 'owner_name']
-        
-        # Store original performance for individual recommendations
-        original_rep_performance = rep_performance.copy()
-        
-        # Filter for meaningful sample sizes (minimum 25 opportunities in cohort)
-        rep_performance = rep_performance[rep_performance['owned_leads'] >= 25]
-        
-        # Exclude system accounts
-        excluded_accounts = ['hevoapi@getsales.team', 'awsintegrationapi', 'techadmin']
-        rep_performance = rep_performance[~rep_performance.index.str.lower().isin([acc.lower() for acc in excluded_accounts])]
-        original_rep_performance = original_rep_performance[~original_rep_performance.index.str.lower().isin([acc.lower() for acc in excluded_accounts])]
-        
-        # Calculate percentage of leads in this cohort
-        total_cohort_leads = len(cohort_opps)
-        rep_performance['pct_of_cohort'] = rep_performance['owned_leads'] / total_cohort_leads
-        
-        # Calculate lift vs control baseline (ignore language parameter)
-        control_baseline = get_control_baseline(experiment, language, control_baselines)
-        rep_performance['control_baseline'] = control_baseline
-        rep_performance['lift'] = rep_performance['conversion_rate'] - control_baseline
+        rep_performance = rep_groups.get((experiment, contact_method, language), empty_performance)
+        original_rep_performance = original_groups.get((experiment, contact_method, language), empty_performance[all_original_performance.columns])
         
         # Sort by lift (most important metric), then conversion rate
         rep_performance = rep_performance.sort_values(['lift', 'conversion_rate'], ascending=False)
@@ -143,7 +225,7 @@ def analyze_by_cohort(raw_data, tasks_data, control_baselines):
     
     return cohort_data
 
-def deep_engagement_analysis(task_row, opp_row, notes_content):
+def deep_engagement_analysis(task_row, opp_row, notes_content, render_assessment=True):
     """Comprehensive line-by-line analysis of how well the rep engaged this specific lead"""
     
     task_content = str(task_row['task_summary']).lower()
@@ -346,18 +428,77 @@ def deep_engagement_analysis(task_row, opp_row, notes_content):
         if base_score > 75:
             base_score = 75  # Ceiling for failed conversions
     
-    # Generate detailed assessment
+    # Generate detailed assessment (callers selecting examples render it later for survivors only)
+    if render_assessment:
+        analysis['detailed_assessment'] = render_detailed_assessment(analysis)
+    analysis['engagement_score'] = max(0, min(100, base_score))
+    
+    return analysis
+
+def render_detailed_assessment(analysis):
+    """Build the strengths / weaknesses / result sentence for an engagement analysis"""
+    
     assessment_parts = []
     if analysis['strengths']:
         assessment_parts.append(f"Strengths: {'; '.join(analysis['strengths'])}")
     if analysis['weaknesses']:
         assessment_parts.append(f"Weaknesses: {'; '.join(analysis['weaknesses'])}")
     
-    outcome = "successful conversion" if converted else "no conversion"
+    outcome = "successful conversion" if analysis['converted'] else "no conversion"
     assessment_parts.append(f"Result: {outcome}")
     
-    analysis['detailed_assessment'] = ". ".join(assessment_parts)
-    analysis['engagement_score'] = max(0, min(100, base_score))
+    return ". ".join(assessment_parts)
+
+def unpack_flags(bits, flag_texts):
+    """Expand a bit field array into a (rows, flags) boolean matrix"""
+    
+    bits = np.asarray(bits, dtype=np.uint16)
+    return ((bits[:, None] >> np.arange(len(flag_texts), dtype=np.uint16)) & 1).astype(bool)
+
+def flag_texts_from_bits(bits, flag_texts):
+    """Render one row's bit field back into its list of flag sentences"""
+    
+    return [text for bit, (_, text) in enumerate(flag_texts) if int(bits) >> bit & 1]
+
+def most_common_flag(bits, flag_texts, order=None):
+    """Most frequent flag over rows via bincount, as (text, count), or None when no row has a flag
+    
+    Ties go to the flag seen first scanning rows by `order` (default: as given), then flags in list
+    order - the same winner as max() over a dict of counts filled in that order.
+    """
+    
+    matrix = unpack_flags(bits, flag_texts)
+    rows, columns = np.nonzero(matrix)
+    if len(columns) == 0:
+        return None
+    
+    if order is None:
+        order = np.arange(len(matrix))
+    counts = np.bincount(columns, minlength=len(flag_texts))
+    first_seen = np.where(matrix, np.asarray(order)[:, None], np.iinfo(np.int64).max).min(axis=0)
+    tied = np.flatnonzero(counts == counts.max())
+    winner = tied[np.argmin(first_seen[tied])]
+    return flag_texts[winner][1], int(counts[winner])
+
+def engagement_analysis_from_batch(row):
+    """Render one compact score_engagement_batch row into the deep_engagement_analysis result dict"""
+    
+    analysis = {
+        'opportunity_uuid': row['opportunity_uuid'],
+        'converted': row['converted'],
+        'task_type': row['task_type'],
+        'engagement_score': int(row['engagement_score']),
+        'strengths': flag_texts_from_bits(row['strength_bits'], ENGAGEMENT_STRENGTHS),
+        'weaknesses': flag_texts_from_bits(row['weakness_bits'], ENGAGEMENT_WEAKNESSES),
+        'notes_integration': ENGAGEMENT_LEVELS['notes_integration'][row['notes_integration']],
+        'playbook_adherence': ENGAGEMENT_LEVELS['playbook_adherence'][row['playbook_adherence']],
+        'personalization_level': ENGAGEMENT_LEVELS['personalization_level'][row['personalization_level']],
+        'detailed_assessment': EXIT_ASSESSMENTS[row['exit_assessment']],
+        'improvement_recommendations': flag_texts_from_bits(row['recommendation_bits'], ENGAGEMENT_RECOMMENDATIONS)
+    }
+    
+    if not analysis['detailed_assessment']:
+        analysis['detailed_assessment'] = render_detailed_assessment(analysis)
     
     return analysis
 
@@ -410,9 +551,12 @@ def analyze_communication_quality(content, task_type, converted):
             else:
                 return "Call approach did not lead to conversion"
 
-def analyze_notes_utilization(rep_tasks, raw_data):
+def analyze_notes_utilization(rep_tasks, raw_data, opp_index=None):
     """Analyze how well reps use individual notes fields in outreach AND how comprehensively they take notes"""
     
+    if opp_index is None:
+        opp_index = build_opportunity_index(raw_data)
+    
     notes_analysis = {
         'total_opportunities': 0,
         'comprehensive_notes_count': 0,
@@ -433,11 +577,10 @@ def analyze_notes_utilization(rep_tasks, raw_data):
     
     for _, task in rep_tasks.iterrows():
         # Find corresponding opportunity with notes
-        matching_opps = raw_data[raw_data['opportunity_uuid'] == task['opportunity_uuid']]
-        if matching_opps.empty:
+        opp = lookup_opportunity(opp_index, task['opportunity_uuid'])
+        if opp is None:
             continue
             
-        opp = matching_opps.iloc[0]
         task_content = str(task['task_summary']).lower()
         
         notes_analysis['total_opportunities'] += 1
@@ -515,96 +658,182 @@ def analyze_notes_utilization(rep_tasks, raw_data):
     
     return notes_analysis
 
-def analyze_outreach_patterns(rep_tasks, raw_data):
-    """Analyze specific outreach patterns for coaching feedback using Lyft playbook principles"""
-    
-    patterns = {
-        'grammar_issues': 0,
-        'personalization_weak': 0,
-        'follow_up_gaps': 0,
-        'urgency_missing': 0,
-        'timing_poor': 0,
-        'template_overuse': 0,
-        'relationship_weak': 0,
-        'value_prop_unclear': 0,
-        'objection_handling_weak': 0,
-        'pivot_missing': 0,
-        'root_cause_ignored': 0,
-        'technical_inaccuracy': 0,
-        'notes_underutilized': 0
-    }
+def score_notes_usage_batch(tasks_data, raw_data, notes_layer=None):
+    """Per-task notes quality and utilization flags for every task at once, matching analyze_notes_utilization
+    
+    Tasks are matched to the first opportunity row for their uuid; unmatched tasks are dropped.
+    Returns a frame indexed like tasks_data with owner_username and one boolean column per counter.
+    """
+    
+    if notes_layer is None:
+        notes_layer = build_notes_features(raw_data)
+    
+    uuids = raw_data['opportunity_uuid'].reset_index(drop=True)
+    first_rows = pd.Series(uuids.index, index=uuids.values)
+    first_rows = first_rows[first_rows.index.notna() & ~first_rows.index.duplicated(keep='first')]
+    
+    opp_rows = tasks_data['opportunity_uuid'].map(first_rows)
+    tasks = tasks_data[opp_rows.notna()]
+    opp_rows = opp_rows[opp_rows.notna()].astype(int).values
+    
+    content = text_column(tasks, 'task_summary').str.lower()
+    captured = notes_layer['captured'].iloc[opp_rows].set_axis(tasks.index)
+    referenced = match_notes_keywords(opp_rows, content.values, notes_layer).set_axis(tasks.index)
+    has_notes = captured['captured_count'] > 0
+    
+    usage = pd.DataFrame({
+        'owner_username': tasks['owner_username'],
+        'total_opportunities': True,
+        'comprehensive_notes_count': captured['captured_count'] >= 2,
+        'goals_captured': captured['goals'],
+        'submission_needs_captured': captured['submission_needs'],
+        'bgc_timeline_captured': captured['bgc_timeline'],
+        'additional_captured': captured['additional'],
+        'empty_notes_count': ~has_notes,
+        'total_with_notes': has_notes,
+        'goals_referenced': referenced['goals'],
+        'submission_referenced': referenced['submission_needs'],
+        'bgc_info_used': captured['bgc_timeline'] & (contains_any(content, ['bgc', 'background', 'check', 'completion', 'submit', 'documents', 'paperwork']) | referenced['bgc_timeline']),
+        'additional_notes_referenced': referenced['additional']
+    })
+    
+    notes_referenced = usage['goals_referenced'] | usage['submission_referenced'] | usage['bgc_info_used'] | usage['additional_notes_referenced']
+    personal_indicators = ['mentioned', 'discussed', 'talked about', 'you said', 'you told', 'your goal', 'your situation']
+    usage['notes_utilized_count'] = notes_referenced
+    usage['personalized_outreach'] = has_notes & (notes_referenced | contains_any(content, personal_indicators))
+    
+    return usage
+
+def summarize_notes_usage(usage):
+    """Collapse score_notes_usage_batch rows into the analyze_notes_utilization counters"""
+    
+    counters = [
+        'total_opportunities', 'comprehensive_notes_count', 'goals_captured', 'submission_needs_captured',
+        'bgc_timeline_captured', 'additional_captured', 'empty_notes_count', 'total_with_notes',
+        'notes_utilized_count', 'goals_referenced', 'submission_referenced', 'bgc_info_used',
+        'additional_notes_referenced', 'personalized_outreach'
+    ]
+    return {counter: int(usage[counter].sum()) for counter in counters}
+
+# Outreach pattern counters reported by analyze_outreach_patterns, in report order
+OUTREACH_PATTERNS = [
+    'grammar_issues', 'personalization_weak', 'follow_up_gaps', 'urgency_missing', 'timing_poor',
+    'template_overuse', 'relationship_weak', 'value_prop_unclear', 'objection_handling_weak',
+    'pivot_missing', 'root_cause_ignored', 'technical_inaccuracy', 'notes_underutilized'
+]
+
+OUTREACH_GOOD_PRACTICES = [
+    'personalized_approach', 'timely_follow_up', 'clear_value_prop', 'appropriate_urgency',
+    'relationship_building', 'objection_handling', 'effective_pivot', 'root_cause_addressing',
+    'playbook_adherence', 'excellent_notes_usage'
+]
+
+# (pattern, feedback) checked against 20% of analyzed interactions, in feedback priority order
+COACHING_ISSUES = [
+    ('relationship_weak', "improve prospect recognition and relationship building"),
+    ('template_overuse', "reduce template dependency, increase personalization"),
+    ('follow_up_gaps', "strengthen follow-up timing and consistency"),
+    ('urgency_missing', "address technical friction more proactively"),
+    ('approach_aggressive', "refine approach to reduce prospect resistance"),
+    ('objection_handling_weak', "improve objection handling using 3-step method (identify root → address → pivot)"),
+    ('pivot_missing', "add discovery questions to uncover prospect goals and motivations"),
+    ('technical_inaccuracy', "provide clearer technical guidance following playbook standards"),
+    ('root_cause_ignored', "address underlying prospect concerns before providing solutions"),
+    ('notes_underutilized', "better utilize prospect notes and previous conversation history for personalization")
+]
+
+# (good practice, strength) checked against 15% of analyzed interactions
+COACHING_STRENGTHS = [
+    ('clear_value_prop', "strong value proposition delivery"),
+    ('relationship_building', "effective rapport building"),
+    ('appropriate_urgency', "good urgency and motivation creation"),
+    ('objection_handling', "excellent objection handling skills"),
+    ('effective_pivot', "skillful conversation pivoting with discovery questions"),
+    ('playbook_adherence', "strong adherence to technical playbook standards"),
+    ('root_cause_addressing', "addresses underlying prospect concerns effectively"),
+    ('excellent_notes_usage', "excellent use of prospect notes for personalized outreach")
+]
+
+def outreach_pattern_flags(tasks_data, raw_data):
+    """Flag every task's outreach patterns using Lyft playbook principles (one boolean column per pattern)
+    
+    Conversion status comes from the task's first opportunity row; tasks without one are analyzed
+    but never flagged. Notes patterns depend on notes utilization and are added per rep.
+    """
+    
+    content = text_column(tasks_data, 'task_summary').str.lower()
+    length = content.str.len()
+    
+    # Find conversion status
+    first_opps = raw_data.dropna(subset=['opportunity_uuid']).drop_duplicates('opportunity_uuid')
+    opp_converted = tasks_data['opportunity_uuid'].map(first_opps.set_index('opportunity_uuid')['full_conversion'])
+    has_opp = tasks_data['opportunity_uuid'].isin(first_opps['opportunity_uuid'])
+    converted = has_opp & opp_converted.astype(bool)
+    unconverted = has_opp & ~converted
+    
+    flags = pd.DataFrame(index=tasks_data.index)
+    flags['total_analyzed'] = pd.Series(True, index=tasks_data.index)
+    
+    # Relationship and Recognition Issues
+    flags['relationship_weak'] = unconverted & contains_any(content, ['who is this', 'who this', '?', '??'])
+    flags['approach_aggressive'] = unconverted & contains_any(content, ['stop', 'not interested'])
+    flags['template_overuse'] = unconverted & (length > 100) & contains_any(content, ['reply']) & contains_any(content, ['stop'])
+    
+    # Playbook-Specific Issues
+    flags['objection_handling_weak'] = unconverted & contains_any(content, ['nervous', 'scared', 'unsafe', 'worried'])  # Safety concerns not addressed
+    flags['pivot_missing'] = unconverted & contains_any(content, ['money', 'pay', 'earn', 'much']) & ~contains_any(content, ['goals'])  # Financial questions without discovery
+    flags['technical_inaccuracy'] = unconverted & contains_any(content, ['confused', 'how', 'what']) & ~contains_any(content, ['can', 'able', 'click', 'go'])  # Questions without clear technical answers
+    
+    # Technical and Process Issues
+    flags['urgency_missing'] = unconverted & contains_any(content, ['technical', 'error', 'delete'])
+    flags['follow_up_gaps'] = unconverted & contains_any(content, ['call']) & (length < 30)
+    
+    # Good practices based on playbook principles
+    flags['clear_value_prop'] = converted & contains_any(content, ['thank', 'help', 'support', 'guide'])
+    flags['appropriate_urgency'] = converted & contains_any(content, ['ready', 'start', 'excited', 'great'])
+    flags['relationship_building'] = converted & contains_any(content, ['yes', 'ok', 'awesome', 'perfect'])
+    
+    # Playbook-Aligned Good Practices
+    flags['effective_pivot'] = converted & contains_any(content, ['goals with lyft', 'planning', 'schedule', 'availability'])  # Good discovery questions
+    flags['playbook_adherence'] = converted & contains_any(content, ['click', 'go online', 'app', 'step']) & contains_any(content, ['can', 'able', 'ready'])  # Clear technical guidance
+    flags['root_cause_addressing'] = converted & contains_any(content, ['understand', 'concern', 'worry']) & (length > 50)  # Addressing underlying concerns
+    flags['objection_handling'] = converted & contains_any(content, ['safety feature', 'rating system', 'emergency', 'support'])  # Proper objection handling
+    
+    return flags
+
+def build_outreach_pattern_matrix(tasks_data, raw_data):
+    """Count outreach patterns for every rep at once: a rep x pattern matrix indexed by owner_username
     
-    good_practices = {
-        'personalized_approach': 0,
-        'timely_follow_up': 0,
-        'clear_value_prop': 0,
-        'appropriate_urgency': 0,
-        'relationship_building': 0,
-        'objection_handling': 0,
-        'effective_pivot': 0,
-        'root_cause_addressing': 0,
-        'playbook_adherence': 0,
-        'excellent_notes_usage': 0
-    }
+    Columns are total_analyzed plus every OUTREACH_PATTERNS / OUTREACH_GOOD_PRACTICES counter
+    (and approach_aggressive); notes counters stay 0 until analyze_outreach_patterns applies notes usage.
+    """
     
-    total_analyzed = 0
+    flags = outreach_pattern_flags(tasks_data, raw_data)
+    matrix = flags.groupby(tasks_data['owner_username'], sort=False, observed=True).sum().astype(int)
+    columns = ['total_analyzed'] + OUTREACH_PATTERNS + ['approach_aggressive'] + OUTREACH_GOOD_PRACTICES
+    return matrix.reindex(columns=columns, fill_value=0)
+
+def analyze_outreach_patterns(rep_tasks, raw_data, opp_index=None, notes_analysis=None, pattern_counts=None):
+    """Analyze specific outreach patterns for coaching feedback using Lyft playbook principles
     
-    for _, task in rep_tasks.iterrows():
-        content = str(task['task_summary']).lower()
-        total_analyzed += 1
-        
-        # Find conversion status
-        matching_opps = raw_data[raw_data['opportunity_uuid'] == task['opportunity_uuid']]
-        if matching_opps.empty:
-            continue
-            
-        converted = matching_opps.iloc[0]['full_conversion']
-        
-        # Analyze for specific issues and playbook adherence
-        if not converted:
-            # Relationship and Recognition Issues
-            if any(phrase in content for phrase in ['who is this', 'who this', '?', '??']):
-                patterns['relationship_weak'] += 1
-            if 'stop' in content or 'not interested' in content:
-                patterns['approach_aggressive'] = patterns.get('approach_aggressive', 0) + 1
-            if len(content) > 100 and 'reply' in content and 'stop' in content:
-                patterns['template_overuse'] += 1
-            
-            # Playbook-Specific Issues
-            if any(word in content for word in ['nervous', 'scared', 'unsafe', 'worried']):
-                patterns['objection_handling_weak'] += 1  # Safety concerns not addressed
-            if any(word in content for word in ['money', 'pay', 'earn', 'much']) and 'goals' not in content:
-                patterns['pivot_missing'] += 1  # Financial questions without discovery
-            if any(word in content for word in ['confused', 'how', 'what']) and not any(word in content for word in ['can', 'able', 'click', 'go']):
-                patterns['technical_inaccuracy'] += 1  # Questions without clear technical answers
-            
-            # Technical and Process Issues
-            if 'technical' in content or 'error' in content or 'delete' in content:
-                patterns['urgency_missing'] += 1
-            if 'call' in content and len(content) < 30:
-                patterns['follow_up_gaps'] += 1
-                
-        else:
-            # Good practices based on playbook principles
-            if any(word in content for word in ['thank', 'help', 'support', 'guide']):
-                good_practices['clear_value_prop'] += 1
-            if any(word in content for word in ['ready', 'start', 'excited', 'great']):
-                good_practices['appropriate_urgency'] += 1
-            if any(word in content for word in ['yes', 'ok', 'awesome', 'perfect']):
-                good_practices['relationship_building'] += 1
-                
-            # Playbook-Aligned Good Practices
-            if any(phrase in content for phrase in ['goals with lyft', 'planning', 'schedule', 'availability']):
-                good_practices['effective_pivot'] += 1  # Good discovery questions
-            if any(word in content for word in ['click', 'go online', 'app', 'step']) and any(word in content for word in ['can', 'able', 'ready']):
-                good_practices['playbook_adherence'] += 1  # Clear technical guidance
-            if any(phrase in content for phrase in ['understand', 'concern', 'worry']) and len(content) > 50:
-                good_practices['root_cause_addressing'] += 1  # Addressing underlying concerns
-            if any(phrase in content for phrase in ['safety feature', 'rating system', 'emergency', 'support']):
-                good_practices['objection_handling'] += 1  # Proper objection handling
+    pattern_counts is the rep's row of build_outreach_pattern_matrix; without it the rep's
+    tasks are counted directly.
+    """
+    
+    if pattern_counts is None:
+        pattern_counts = outreach_pattern_flags(rep_tasks, raw_data).sum()
+    
+    patterns = {pattern: int(pattern_counts.get(pattern, 0)) for pattern in OUTREACH_PATTERNS}
+    if pattern_counts.get('approach_aggressive', 0):
+        patterns['approach_aggressive'] = int(pattern_counts['approach_aggressive'])
+    good_practices = {practice: int(pattern_counts.get(practice, 0)) for practice in OUTREACH_GOOD_PRACTICES}
+    total_analyzed = int(pattern_counts.get('total_analyzed', 0))
     
     # Analyze notes utilization
-    notes_analysis = analyze_notes_utilization(rep_tasks, raw_data)
+    if notes_analysis is None:
+        if opp_index is None:
+            opp_index = build_opportunity_index(raw_data)
+        notes_analysis = analyze_notes_utilization(rep_tasks, raw_data, opp_index)
     
     # Add notes patterns based on utilization rate
     if notes_analysis['total_with_notes'] > 0:
@@ -616,76 +845,80 @@ def analyze_outreach_patterns(rep_tasks, raw_data):
     
     return patterns, good_practices, total_analyzed, notes_analysis
 
+def generate_coaching_feedback_matrix(pattern_matrix, lifts):
+    """Generate coaching feedback and strengths for every rep of a pattern count matrix
+    
+    lifts holds each rep's best-cohort lift, aligned to the matrix index. Returns
+    {username: (feedback, strengths)}, top 3 of each.
+    """
+    
+    total_analyzed = pattern_matrix['total_analyzed']
+    lifts = pd.Series(lifts, index=pattern_matrix.index, dtype=float)
+    
+    # Identify top issues (>20% of interactions) and good practices (>15%)
+    threshold = np.maximum(2, total_analyzed * 0.2)
+    good_threshold = np.maximum(1, total_analyzed * 0.15)
+    issue_hits = pattern_matrix.reindex(columns=[pattern for pattern, _ in COACHING_ISSUES], fill_value=0).ge(threshold, axis=0)
+    strength_hits = pattern_matrix.reindex(columns=[practice for practice, _ in COACHING_STRENGTHS], fill_value=0).ge(good_threshold, axis=0)
+    
+    # Performance-based feedback
+    lift_feedback = np.select([lifts < 0, lifts < 0.03], ["fundamentally rethink outreach strategy", "fine-tune messaging and timing"], '')
+    
+    issue_texts = [text for _, text in COACHING_ISSUES]
+    strength_texts = [text for _, text in COACHING_STRENGTHS]
+    
+    coaching = {}
+    for username, issues, strengths, performance, total in zip(pattern_matrix.index, issue_hits.to_numpy(), strength_hits.to_numpy(), lift_feedback, total_analyzed):
+        if total == 0:
+            coaching[username] = "insufficient interaction data for detailed analysis"
+            continue
+        feedback = [text for text, hit in zip(issue_texts, issues) if hit]
+        if performance:
+            feedback.append(performance)
+        coaching[username] = (feedback[:3], [text for text, hit in zip(strength_texts, strengths) if hit][:3])
+    
+    return coaching
+
 def generate_coaching_feedback(patterns, good_practices, total_analyzed, avg_lift, notes_analysis=None):
     """Generate specific coaching feedback based on patterns"""
     
-    feedback = []
-    
-    # Calculate percentages
-    if total_analyzed == 0:
-        return "insufficient interaction data for detailed analysis"
-    
-    # Identify top issues (>20% of interactions)
-    threshold = max(2, total_analyzed * 0.2)
-    
-    # Relationship and Basic Communication
-    if patterns.get('relationship_weak', 0) >= threshold:
-        feedback.append("improve prospect recognition and relationship building")
-    if patterns.get('template_overuse', 0) >= threshold:
-        feedback.append("reduce template dependency, increase personalization")
-    if patterns.get('follow_up_gaps', 0) >= threshold:
-        feedback.append("strengthen follow-up timing and consistency")
-    if patterns.get('urgency_missing', 0) >= threshold:
-        feedback.append("address technical friction more proactively")
-    if patterns.get('approach_aggressive', 0) >= threshold:
-        feedback.append("refine approach to reduce prospect resistance")
-    
-    # Playbook-Specific Coaching
-    if patterns.get('objection_handling_weak', 0) >= threshold:
-        feedback.append("improve objection handling using 3-step method (identify root → address → pivot)")
-    if patterns.get('pivot_missing', 0) >= threshold:
-        feedback.append("add discovery questions to uncover prospect goals and motivations")
-    if patterns.get('technical_inaccuracy', 0) >= threshold:
-        feedback.append("provide clearer technical guidance following playbook standards")
-    if patterns.get('root_cause_ignored', 0) >= threshold:
-        feedback.append("address underlying prospect concerns before providing solutions")
-    if patterns.get('notes_underutilized', 0) >= threshold:
-        feedback.append("better utilize prospect notes and previous conversation history for personalization")
+    counts = pd.DataFrame([{**patterns, **good_practices, 'total_analyzed': total_analyzed}])
+    return generate_coaching_feedback_matrix(counts, [avg_lift])[0]
+
+def best_cohort_lift(rep_cohorts):
+    """A rep's lift in their best cohort (cohorts are not averaged, they are different scenarios)"""
     
-    # Performance-based feedback
-    if avg_lift < 0:
-        feedback.append("fundamentally rethink outreach strategy")
-    elif avg_lift < 0.03:
-        feedback.append("fine-tune messaging and timing")
-    
-    # Positive reinforcement for good practices
-    strengths = []
-    good_threshold = max(1, total_analyzed * 0.15)
-    
-    # Basic Communication Strengths
-    if good_practices.get('clear_value_prop', 0) >= good_threshold:
-        strengths.append("strong value proposition delivery")
-    if good_practices.get('relationship_building', 0) >= good_threshold:
-        strengths.append("effective rapport building")
-    if good_practices.get('appropriate_urgency', 0) >= good_threshold:
-        strengths.append("good urgency and motivation creation")
-    
-    # Playbook-Aligned Strengths
-    if good_practices.get('objection_handling', 0) >= good_threshold:
-        strengths.append("excellent objection handling skills")
-    if good_practices.get('effective_pivot', 0) >= good_threshold:
-        strengths.append("skillful conversation pivoting with discovery questions")
-    if good_practices.get('playbook_adherence', 0) >= good_threshold:
-        strengths.append("strong adherence to technical playbook standards")
-    if good_practices.get('root_cause_addressing', 0) >= good_threshold:
-        strengths.append("addresses underlying prospect concerns effectively")
-    if good_practices.get('excellent_notes_usage', 0) >= good_threshold:
-        strengths.append("excellent use of prospect notes for personalized outreach")
-    
-    return feedback[:3], strengths[:3]  # Top 3 of each
+    best_lift = float('-inf')
+    for _, rep_row in rep_cohorts:
+        if rep_row['lift'] > best_lift:
+            best_lift = rep_row['lift']
+    return best_lift
 
-def generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data):
-    """Generate critical outreach style summary for a rep - BEST COHORT PERFORMANCE"""
+def build_coaching_feedback(pattern_matrix, rep_notes_usage, no_notes_usage, best_lifts):
+    """Coaching feedback and strengths for every rep in best_lifts from one generate_coaching_feedback_matrix call
+    
+    Each rep's notes counters are applied to its pattern counts as analyze_outreach_patterns
+    applies them. Returns {username: (feedback, strengths)} like generate_coaching_feedback_matrix.
+    """
+    
+    usernames = list(best_lifts)
+    matrix = pattern_matrix.reindex(usernames, fill_value=0)
+    notes = pd.DataFrame([summarize_notes_usage(rep_notes_usage.get(username, no_notes_usage)) for username in usernames], index=matrix.index)
+    
+    # Under 30% notes utilization weights the missed opportunities, over 70% counts as a strength
+    with_notes = notes['total_with_notes']
+    utilization = notes['notes_utilized_count'] / with_notes.where(with_notes > 0)
+    matrix['notes_underutilized'] = (with_notes * 0.7).astype(int).where(utilization < 0.3, matrix['notes_underutilized'])
+    matrix['excellent_notes_usage'] = notes['notes_utilized_count'].where(utilization > 0.7, matrix['excellent_notes_usage'])
+    
+    return generate_coaching_feedback_matrix(matrix, [best_lifts[username] for username in usernames])
+
+def generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data, opp_index=None, rep_features=None, coaching=None):
+    """Generate critical outreach style summary for a rep - BEST COHORT PERFORMANCE
+    
+    coaching is the rep's (feedback, strengths) entry of build_coaching_feedback; without it the
+    rep's pattern counts are turned into feedback on their own.
+    """
     
     rep_cohorts = rep_data_lookup[username]
     
@@ -702,15 +935,23 @@ def generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data):
             best_cohort_info = f"{cohort['contact_method']}-{cohort['language']}"
         total_volume += rep_row['owned_leads']
     
-    # Get task examples for analysis
-    rep_tasks = tasks_data[
-        (tasks_data['owner_username'] == username) & 
-        (tasks_data['include_in_conext_analysis'] == True)
-    ]
-    
-    # Analyze specific patterns
-    patterns, good_practices, total_analyzed, notes_analysis = analyze_outreach_patterns(rep_tasks, raw_data)
-    coaching_feedback, strengths = generate_coaching_feedback(patterns, good_practices, total_analyzed, best_lift, notes_analysis)
+    if rep_features is not None:
+        # Read precomputed patterns from the rep feature table
+        features = rep_features[username]
+        patterns, good_practices = features['patterns'], features['good_practices']
+        total_analyzed, notes_analysis = features['total_analyzed'], features['notes_analysis']
+    else:
+        # Get task examples for analysis
+        rep_tasks = tasks_data[
+            (tasks_data['owner_username'] == username) & 
+            (tasks_data['include_in_conext_analysis'] == True)
+        ]
+        
+        # Analyze specific patterns
+        patterns, good_practices, total_analyzed, notes_analysis = analyze_outreach_patterns(rep_tasks, raw_data, opp_index)
+    if coaching is None:
+        coaching = generate_coaching_feedback(patterns, good_practices, total_analyzed, best_lift, notes_analysis)
+    coaching_feedback, strengths = coaching
     
     # Generate critical summary based on BEST cohort performance
     summary_parts = []
@@ -748,8 +989,32 @@ def generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data):
     
     return base_summary + "." + strength_text + "." + weakness_text
 
-def get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experiment):
-    """Get comprehensive engagement analysis for a rep in an experiment"""
+def get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experiment, opp_index=None, engagement=None, limit=None):
+    """Get comprehensive engagement analysis for a rep in an experiment
+    
+    Pass `engagement` (score_engagement_batch output) to read precomputed scores instead of scoring row by row;
+    with `limit`, only that many leading examples per outcome are rendered into result dicts.
+    """
+    
+    if engagement is not None:
+        rep_scores = engagement[
+            (engagement['owner_username'] == owner_username) &
+            (engagement['experiment'] == experiment) &
+            (engagement['include_in_conext_analysis'] == True)
+        ]
+        if limit is not None:
+            scored = zip(rep_scores['engagement_score'].tolist(), rep_scores['converted'].astype(bool).tolist(), range(len(rep_scores)))
+            good_positions, bad_positions = select_engagement_examples(scored, limit)
+            good_rows, bad_rows = rep_scores.iloc[good_positions], rep_scores.iloc[bad_positions]
+        else:
+            good_rows, bad_rows = split_engagement_rows(rep_scores)
+        return (
+            [engagement_analysis_from_batch(row) for row in good_rows.to_dict('records')],
+            [engagement_analysis_from_batch(row) for row in bad_rows.to_dict('records')]
+        )
+    
+    if opp_index is None:
+        opp_index = build_opportunity_index(raw_data)
     
     # Filter tasks data directly for this rep and experiment
     rep_tasks = tasks_data[
@@ -761,29 +1026,87 @@ def get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experi
     if rep_tasks.empty:
         return [], []
     
-    # Get opportunities from raw data
-    rep_opps = raw_data[
-        (raw_data['owner_username'] == owner_username) &
-        (raw_data['experiment'] == experiment)
-    ]
+    def analyses():
+        # Deep analysis of each task-opportunity-notes combination
+        for _, task in rep_tasks.iterrows():  # Analyze ALL interactions for comprehensive insights
+            # Find the corresponding opportunity owned by this rep in this experiment
+            opp = lookup_opportunity(opp_index, task['opportunity_uuid'], owner_username, experiment)
+            
+            if opp is not None:
+                notes_content = opp.get('full_notes', '') if 'full_notes' in opp else ''
+                
+                # Perform comprehensive engagement analysis
+                yield deep_engagement_analysis(task, opp, notes_content, render_assessment=limit is None)
     
-    if rep_opps.empty:
+    if limit is None:
+        return split_engagement_examples(list(analyses()))
+    
+    # Keep only the examples that will be shown, then render their assessment text
+    scored = ((analysis['engagement_score'], analysis['converted'], analysis) for analysis in analyses())
+    good_analyses, bad_analyses = select_engagement_examples(scored, limit)
+    for analysis in good_analyses + bad_analyses:
+        if not analysis['detailed_assessment']:
+            analysis['detailed_assessment'] = render_detailed_assessment(analysis)
+    
+    return good_analyses, bad_analyses
+
+def select_engagement_examples(scored, limit):
+    """Stream (engagement_score, converted, example) triples through two bounded heaps
+    
+    Keeps the `limit` best converted and `limit` worst unconverted examples, returned in the same
+    order split_engagement_examples would give (ties keep arrival order).
+    """
+    
+    if limit <= 0:
         return [], []
     
-    comprehensive_analyses = []
+    # Heap roots are the weakest kept example: lowest score / latest arrival for converted,
+    # highest score / latest arrival for unconverted
+    best, worst = [], []
+    for seq, (score, converted, example) in enumerate(scored):
+        heap, entry = (best, (score, -seq, example)) if converted else (worst, (-score, -seq, example))
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    
+    good_examples = [example for _, _, example in sorted(best, key=lambda entry: entry[:2], reverse=True)]
+    bad_examples = [example for _, _, example in sorted(worst, key=lambda entry: entry[:2], reverse=True)]
+    return good_examples, bad_examples
+
+def split_engagement_rows(scores):
+    """Frame version of split_engagement_examples over compact score rows (same stable order)"""
     
-    # Deep analysis of each task-opportunity-notes combination
-    for _, task in rep_tasks.iterrows():  # Analyze ALL interactions for comprehensive insights
-        # Find the corresponding opportunity
-        matching_opp = rep_opps[rep_opps['opportunity_uuid'] == task['opportunity_uuid']]
-        
-        if not matching_opp.empty:
-            opp = matching_opp.iloc[0]
-            notes_content = opp.get('full_notes', '') if 'full_notes' in opp else ''
-            
-            # Perform comprehensive engagement analysis
-            analysis = deep_engagement_analysis(task, opp, notes_content)
-            comprehensive_analyses.append(analysis)
+    converted = scores['converted'].astype(bool)
+    good_rows = scores[converted].sort_values('engagement_score', ascending=False, kind='stable')
+    bad_rows = scores[~converted].sort_values('engagement_score', ascending=True, kind='stable')
+    return good_rows, bad_rows
+
+def summarize_engagement(scores):
+    """Engagement metrics for a set of compact score rows without rendering or sorting them"""
+    
+    order = engagement_example_rank(scores)
+    
+    return {
+        'analyzed': len(scores),
+        'avg_engagement': int(scores['engagement_score'].astype(int).sum()) / len(scores) if len(scores) else 0,
+        'notes_integration_count': int((scores['notes_integration'] > 0).sum()),
+        'playbook_adherence_count': int((scores['playbook_adherence'] > 0).sum()),
+        'top_strength': most_common_flag(scores['strength_bits'], ENGAGEMENT_STRENGTHS, order),
+        'top_weakness': most_common_flag(scores['weakness_bits'], ENGAGEMENT_WEAKNESSES, order)
+    }
+
+def engagement_example_rank(scores):
+    """Sort key per row matching split_engagement_rows order (converted best-first, then unconverted worst-first)"""
+    
+    count = len(scores)
+    converted = scores['converted'].astype(bool).to_numpy()
+    engagement_score = scores['engagement_score'].to_numpy(dtype=np.int64)
+    ranked_score = np.where(converted, 100 - engagement_score, engagement_score)
+    return (np.where(converted, 0, 1) * 101 + ranked_score) * count + np.arange(count)
+
+def split_engagement_examples(comprehensive_analyses):
+    """Split analyses into converted (best first) and unconverted (worst first) examples"""
     
     # Separate by outcome and sort by engagement score
     good_examples = [ex for ex in comprehensive_analyses if ex['converted']]
@@ -795,10 +1118,10 @@ def get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experi
     
     return good_examples, bad_examples
 
-def get_task_examples(tasks_data, raw_data, owner_username, experiment):
+def get_task_examples(tasks_data, raw_data, owner_username, experiment, opp_index=None):
     """Get specific opportunity examples with contextual analysis for a rep in an experiment (legacy compatibility)"""
     
-    good_analyses, bad_analyses = get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experiment)
+    good_analyses, bad_analyses = get_comprehensive_task_analysis(tasks_data, raw_data, owner_username, experiment, opp_index, limit=3)
     
     # Convert to legacy format for compatibility
     good_examples = []
@@ -822,7 +1145,97 @@ def get_task_examples(tasks_data, raw_data, owner_username, experiment):
     
     return good_examples, bad_examples
 
-def rate_outreach_style(rep_performance, tasks_data, raw_data, owner_username):
+# Task summaries that are placeholders rather than real outreach content
+DEFAULT_CONTENT_PATTERN = 'ignore for analysis|No Contact|Call to Short'
+
+def partition_rep_tasks(tasks_data, raw_data, usernames, engagement=None, notes_usage=None, best_lifts=None):
+    """Group tasks and engagement rows by rep once so per-rep features never re-scan tasks_data
+    
+    With best_lifts ({username: best cohort lift}) and notes_usage, every rep's coaching feedback
+    is also generated in one pass over the rep x pattern matrix.
+    """
+    
+    # Volume and good-content rate for every rep in one grouped pass
+    good_content = ~tasks_data['task_summary'].str.contains(DEFAULT_CONTENT_PATTERN, case=False, na=False)
+    content_stats = good_content.groupby(tasks_data['owner_username'], observed=True).agg(['size', 'mean'])
+    
+    # Partition usable tasks and engagement rows by rep
+    usable_tasks = tasks_data[tasks_data['include_in_conext_analysis'] == True]
+    wanted = set(usernames)
+    rep_tasks = {
+        username: tasks for username, tasks in usable_tasks.groupby('owner_username', sort=False, observed=True)
+        if username in wanted
+    }
+    pattern_matrix = build_outreach_pattern_matrix(usable_tasks[usable_tasks['owner_username'].isin(wanted)], raw_data)
+    rep_notes_usage = None
+    if notes_usage is not None:
+        notes_usage = notes_usage[notes_usage.index.isin(usable_tasks.index)]
+        rep_notes_usage = {
+            username: rows for username, rows in notes_usage.groupby('owner_username', sort=False, observed=True)
+            if username in wanted
+        }
+    experiment_engagement = defaultdict(dict)
+    if engagement is not None:
+        for (username, experiment), rows in engagement.groupby(['owner_username', 'experiment'], sort=False, observed=True):
+            if username in wanted:
+                experiment_engagement[username][experiment] = rows
+    coaching = None
+    if best_lifts is not None and rep_notes_usage is not None:
+        coaching = build_coaching_feedback(pattern_matrix, rep_notes_usage, notes_usage.iloc[:0], best_lifts)
+    
+    return {
+        'content_stats': content_stats,
+        'rep_tasks': rep_tasks,
+        'no_tasks': usable_tasks.iloc[:0],
+        'pattern_matrix': pattern_matrix,
+        'notes_usage': rep_notes_usage,
+        'no_notes_usage': notes_usage.iloc[:0] if notes_usage is not None else None,
+        'experiment_engagement': experiment_engagement,
+        'coaching': coaching
+    }
+
+def build_rep_feature_row(username, rep_partitions, raw_data, opp_index):
+    """Compute one rep's features from its precomputed task partition"""
+    
+    rep_tasks = rep_partitions['rep_tasks'].get(username, rep_partitions['no_tasks'])
+    notes_analysis = None
+    if rep_partitions['notes_usage'] is not None:
+        notes_analysis = summarize_notes_usage(rep_partitions['notes_usage'].get(username, rep_partitions['no_notes_usage']))
+    pattern_matrix = rep_partitions['pattern_matrix']
+    pattern_counts = pattern_matrix.loc[username] if username in pattern_matrix.index else pd.Series(dtype=int)
+    patterns, good_practices, total_analyzed, notes_analysis = analyze_outreach_patterns(rep_tasks, raw_data, opp_index, notes_analysis, pattern_counts)
+    
+    content_stats = rep_partitions['content_stats']
+    has_tasks = username in content_stats.index
+    
+    return {
+        'task_volume': int(content_stats.loc[username, 'size']) if has_tasks else 0,
+        'good_content_rate': content_stats.loc[username, 'mean'] if has_tasks else None,
+        'patterns': patterns,
+        'good_practices': good_practices,
+        'total_analyzed': total_analyzed,
+        'notes_analysis': notes_analysis,
+        'experiment_engagement': rep_partitions['experiment_engagement'].get(username, {})
+    }
+
+def build_rep_features(tasks_data, raw_data, usernames, opp_index=None, engagement=None, notes_usage=None):
+    """Precompute per-rep task features once so the report builder never re-scans tasks_data
+    
+    Returns {username: features} with task volume, good-content rate, outreach pattern and notes
+    counts, and the rep's engagement rows partitioned by experiment.
+    """
+    
+    if opp_index is None:
+        opp_index = build_opportunity_index(raw_data)
+    if notes_usage is None:
+        notes_usage = score_notes_usage_batch(tasks_data, raw_data)
+    
+    usernames = list(usernames)
+    rep_partitions = partition_rep_tasks(tasks_data, raw_data, usernames, engagement, notes_usage)
+    
+    return {username: build_rep_feature_row(username, rep_partitions, raw_data, opp_index) for username in usernames}
+
+def rate_outreach_style(rep_performance, tasks_data, raw_data, owner_username, rep_features=None):
     """Rate outreach style from 1-100 based on performance and communication patterns"""
     
     try:
@@ -838,12 +1251,17 @@ def rate_outreach_style(rep_performance, tasks_data, raw_data, owner_username):
         volume_score = min(20, float(rep_data['owned_leads']) / 50 * 20)  # 50+ leads = 20 points
         
         # Communication quality bonus (0-20 points)
-        rep_tasks = tasks_data[tasks_data['owner_username'] == owner_username]
+        if rep_features is not None:
+            good_content_rate = rep_features[owner_username]['good_content_rate']
+        else:
+            rep_tasks = tasks_data[tasks_data['owner_username'] == owner_username]
+            good_content_rate = None
+            if not rep_tasks.empty:
+                # Bonus for good content (not default messages)
+                good_content_rate = (~rep_tasks['task_summary'].str.contains(DEFAULT_CONTENT_PATTERN, case=False, na=False)).mean()
         
         comm_score = 0
-        if not rep_tasks.empty:
-            # Bonus for good content (not default messages)
-            good_content_rate = (~rep_tasks['task_summary'].str.contains('ignore for analysis|No Contact|Call to Short', case=False, na=False)).mean()
+        if good_content_rate is not None:
             comm_score = good_content_rate * 20
         
         total_score = base_score + volume_score + comm_score
@@ -871,8 +1289,307 @@ def get_cohort_performer(exp_cohorts, cohort_key, performer_type='top'):
             return None, "No sufficient data"
         return rep_performance.iloc[-1], None
 
-def generate_template_report(cohort_data, tasks_data, raw_data, metadata):
-    """Generate report following the exact template format"""
+def render_rep_section(username, total_volume, context):
+    """Render the Individual Recommendations section for one rep as a list of report lines"""
+    
+    cohort_data = context['cohort_data']
+    tasks_data = context['tasks_data']
+    raw_data = context['raw_data']
+    rep_data_lookup = context['rep_data_lookup']
+    best_performer = context['best_performer']
+    experiments = context['experiments']
+    opp_index = context['opp_index']
+    engagement = context['engagement']
+    
+    # Compute this rep's features from the shared per-rep partitions
+    rep_features = {username: build_rep_feature_row(username, context['rep_partitions'], raw_data, opp_index)}
+    
+    section_lines = []
+    
+    rep_cohorts = rep_data_lookup[username]
+    rep_name = rep_cohorts[0][1]['owner_name']
+    
+    # Calculate overall rating - use first cohort performance as representative
+    first_cohort_performance = rep_cohorts[0][0]['rep_performance']
+    rating = rate_outreach_style(first_cohort_performance, tasks_data, raw_data, username, rep_features)
+    
+    # Apply realistic rating cap - even best performers have room for improvement
+    if username == best_performer:
+        rating = min(95, rating)  # Best performer caps at 95
+    else:
+        rating = min(92, rating)  # Others cap at 92
+    
+    # Generate outreach summary
+    coaching = context['rep_partitions']['coaching']
+    outreach_summary = generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data, opp_index, rep_features,
+                                                 coaching[username] if coaching is not None else None)
+    
+    section_lines.append(f"### {rep_name}")
+    section_lines.append(f"**Outreach Rating:** {rating}/100 | **Total Volume:** {total_volume} leads")
+    section_lines.append("")
+    section_lines.append(f"**Outreach Style Summary:** {outreach_summary}")
+    section_lines.append("")
+    
+    # Add notes analysis - both taking quality and utilization
+    notes_analysis = rep_features[username]['notes_analysis']
+    if notes_analysis['total_opportunities'] > 0:
+        # Notes taking quality
+        comprehensive_rate = notes_analysis['comprehensive_notes_count'] / notes_analysis['total_opportunities']
+        empty_rate = notes_analysis['empty_notes_count'] / notes_analysis['total_opportunities']
+        
+        # Notes utilization
+        utilization_rate = 0
+        if notes_analysis['total_with_notes'] > 0:
+            utilization_rate = notes_analysis['notes_utilized_count'] / notes_analysis['total_with_notes']
+        
+        section_lines.append(f"**Notes Quality:** {comprehensive_rate:.1%} comprehensive ({notes_analysis['comprehensive_notes_count']}/{notes_analysis['total_opportunities']} opportunities), {empty_rate:.1%} empty notes")
+        section_lines.append(f"  - Goals captured: {notes_analysis['goals_captured']}, Submissions: {notes_analysis['submission_needs_captured']}, BGC: {notes_analysis['bgc_timeline_captured']}, Additional: {notes_analysis['additional_captured']}")
+        section_lines.append(f"**Notes Utilization:** {utilization_rate:.1%} usage rate - Goals: {notes_analysis['goals_referenced']}, Submissions: {notes_analysis['submission_referenced']}, BGC: {notes_analysis['bgc_info_used']}, Additional: {notes_analysis['additional_notes_referenced']}")
+        section_lines.append("")
+    
+    # Generate comprehensive engagement analysis for each experiment
+    for i, experiment in enumerate(experiments, 1):
+        section_lines.append("")
+        section_lines.append(f"**{i}. Comprehensive Analysis for {experiment}**")
+        
+        # Check if rep meets minimum requirements for this experiment's cohorts
+        experiment_cohorts = [cohort for cohort, rep_row in rep_cohorts if cohort['experiment'] == experiment]
+        insufficient_cohorts = []
+        
+        for cohort in experiment_cohorts:
+            # Check if this rep has enough leads in each cohort
+            cohort_key = f"{cohort['experiment']}|{cohort['contact_method']}|{cohort['language']}"
+            if cohort_key in cohort_data:
+                original_perf = cohort_data[cohort_key]['original_rep_performance']
+                if username in original_perf.index:
+                    rep_leads = original_perf.loc[username]['owned_leads']
+                    if rep_leads < 25:
+                        insufficient_cohorts.append(f"{cohort['contact_method']}-{cohort['language']} ({rep_leads} leads, need 25+)")
+        
+        if insufficient_cohorts:
+            section_lines.append(f"   *Note: Insufficient data in {', '.join(insufficient_cohorts)} for meaningful analysis*")
+            section_lines.append("")
+        
+        # Get comprehensive analysis for this experiment from the rep's precomputed partition;
+        # only the printed examples are rendered to text
+        experiment_scores = rep_features[username]['experiment_engagement'].get(experiment, engagement.iloc[:0])
+        experiment_scores = experiment_scores[experiment_scores['include_in_conext_analysis'] == True]
+        good_analyses, bad_analyses = get_comprehensive_task_analysis(tasks_data, raw_data, username, experiment, opp_index, experiment_scores, limit=1)
+        
+        if good_analyses or bad_analyses:
+            # Calculate engagement metrics for this experiment
+            metrics = summarize_engagement(experiment_scores)
+            analyzed = metrics['analyzed']
+            
+            section_lines.append(f"   **Engagement Metrics:** Avg Score {metrics['avg_engagement']:.0f}/100, Notes Integration {metrics['notes_integration_count']}/{analyzed}, Playbook Adherence {metrics['playbook_adherence_count']}/{analyzed}")
+            section_lines.append("")
+            
+            # Best engagement example
+            if good_analyses:
+                best_example = good_analyses[0]  # Highest scoring good example
+                section_lines.append(f"   **Best Example:** {best_example['opportunity_uuid']} (Score: {best_example['engagement_score']}/100)")
+                section_lines.append(f"   - {best_example['detailed_assessment']}")
+            else:
+                section_lines.append("   **Best Example:** No successful conversions found")
+            section_lines.append("")
+            
+            # Worst engagement example for learning
+            if bad_analyses:
+                worst_example = bad_analyses[0]  # Lowest scoring bad example
+                improvement_recs = '; '.join(worst_example['improvement_recommendations']) if worst_example['improvement_recommendations'] else 'Continue current approach'
+                section_lines.append(f"   **Learning Opportunity:** {worst_example['opportunity_uuid']} (Score: {worst_example['engagement_score']}/100)")
+                section_lines.append(f"   - {worst_example['detailed_assessment']}")
+                section_lines.append(f"   - **Recommendations:** {improvement_recs}")
+            else:
+                section_lines.append("   **Learning Opportunity:** No unsuccessful examples found")
+            section_lines.append("")
+            
+            # Key patterns and insights
+            top_strength = metrics['top_strength']
+            top_weakness = metrics['top_weakness']
+            
+            if top_strength:
+                section_lines.append(f"   **Consistent Strength:** {top_strength[0]} ({top_strength[1]} interactions)")
+            
+            if top_weakness:
+                section_lines.append(f"   **Primary Focus Area:** {top_weakness[0]} ({top_weakness[1]} interactions)")
+        else:
+            section_lines.append("   *No analyzable interactions found for this experiment*")
+    
+    section_lines.append("")
+    
+    return section_lines
+
+# Shared report state for section workers, installed once per process by the pool initializer
+_SECTION_CONTEXT = None
+
+def _init_section_worker(context):
+    """Pool initializer - keep the shared report state in the worker process"""
+    global _SECTION_CONTEXT
+    _SECTION_CONTEXT = context
+
+def _render_rep_section_task(rep):
+    """Pool task - render one (username, total_volume) section from the worker's shared state"""
+    username, total_volume = rep
+    return render_rep_section(username, total_volume, _SECTION_CONTEXT)
+
+def iter_rep_sections(reps, context, workers=1):
+    """Yield rep sections in the given order as each finishes, fanning out to a process pool when workers > 1"""
+    
+    if workers <= 1 or len(reps) <= 1:
+        for username, total_volume in reps:
+            yield render_rep_section(username, total_volume, context)
+        return
+    
+    import multiprocessing
+    
+    # Fork shares the frames with workers without pickling; other start methods pickle them once per worker
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    mp_context = multiprocessing.get_context(start_method)
+    
+    with mp_context.Pool(min(workers, len(reps)), initializer=_init_section_worker, initargs=(context,)) as pool:
+        # imap yields sections in input order, so the report keeps its volume ordering
+        yield from pool.imap(_render_rep_section_task, reps, chunksize=1)
+
+def render_rep_sections(reps, context, workers=1):
+    """Render rep sections in the given order, fanning them out to a process pool when workers > 1"""
+    
+    return list(iter_rep_sections(reps, context, workers))
+
+def write_rep_shards(reps, sections, shard_dir, rep_data_lookup):
+    """Stream one markdown file per rep into shard_dir as sections arrive, then write index.md
+    
+    `sections` yields section lines in `reps` order (see iter_rep_sections). Returns the index file
+    path. Shards are named by volume rank so directory order matches the index.
+    """
+    
+    import os
+    os.makedirs(shard_dir, exist_ok=True)
+    
+    index_lines = [
+        "# Individual Recommendations - Full Roster",
+        f"*{len(reps)} reps meeting the 25-lead cohort minimum, by total volume*",
+        "",
+        "| # | Rep | Username | Total Volume | Section |",
+        "|---|-----|----------|--------------|---------|"
+    ]
+    
+    for rank, ((username, total_volume), section_lines) in enumerate(zip(reps, sections), 1):
+        shard_name = f"{rank:03d}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', str(username))}.md"
+        with open(os.path.join(shard_dir, shard_name), "w") as f:
+            f.write("\n".join(section_lines))
+        
+        rep_name = rep_data_lookup[username][0][1]['owner_name']
+        index_lines.append(f"| {rank} | {rep_name} | {username} | {total_volume} | [{shard_name}]({shard_name}) |")
+        
+        if rank % 25 == 0:
+            print(f"   ✍️  Wrote {rank}/{len(reps)} rep sections")
+    
+    index_path = os.path.join(shard_dir, "index.md")
+    with open(index_path, "w") as f:
+        f.write("\n".join(index_lines) + "\n")
+    
+    return index_path
+
+def _merge_cached_sections(reps, rendered, cached_sections, cache_keys):
+    """Yield sections in reps order, taking cache hits from cached_sections and misses from `rendered`"""
+    
+    for username, _ in reps:
+        cached = cached_sections.get(username)
+        if cached is None or cached['key'] != cache_keys[username]:
+            cached = {'key': cache_keys[username], 'lines': next(rendered)}
+            cached_sections[username] = cached
+        yield cached['lines']
+
+def compute_ruleset_hash():
+    """Hash of this script's source - any change to scoring rules or thresholds invalidates cached sections"""
+    
+    import hashlib
+    import os
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def fingerprint_reps(tasks_data, raw_data, usernames):
+    """Fingerprint each rep's tasks and every opportunity row its tasks or leads touch
+    
+    Row hashes are mixed with the row's position within its rep (tasks) or uuid (opportunities),
+    since example tie-breaks and first-opportunity lookups depend on that order.
+    """
+    
+    import hashlib
+    
+    task_hashes = pd.util.hash_pandas_object(
+        tasks_data.assign(_position=tasks_data.groupby('owner_username', observed=True).cumcount()), index=False
+    )
+    task_totals = task_hashes.groupby(tasks_data['owner_username'], observed=True).agg(['sum', 'size'])
+    
+    opp_hashes = pd.util.hash_pandas_object(
+        raw_data.assign(_position=raw_data.groupby('opportunity_uuid').cumcount()), index=False
+    )
+    uuid_hashes = opp_hashes.groupby(raw_data['opportunity_uuid']).sum()
+    
+    # Opportunities behind a rep's tasks (any owner) plus the rep's own leads
+    rep_uuids = pd.concat([
+        tasks_data[['owner_username', 'opportunity_uuid']],
+        raw_data[['owner_username', 'opportunity_uuid']]
+    ]).dropna().drop_duplicates()
+    rep_uuids = rep_uuids.assign(opp_hash=rep_uuids['opportunity_uuid'].map(uuid_hashes))
+    opp_totals = rep_uuids.groupby('owner_username', observed=True)['opp_hash'].agg(['sum', 'size'])
+    
+    fingerprints = {}
+    for username in usernames:
+        parts = [
+            task_totals.loc[username].tolist() if username in task_totals.index else [0, 0],
+            opp_totals.loc[username].tolist() if username in opp_totals.index else [0, 0]
+        ]
+        fingerprints[username] = hashlib.sha256(repr(parts).encode()).hexdigest()
+    
+    return fingerprints
+
+def section_cache_keys(reps, rep_data_lookup, best_performer, experiments, fingerprints, ruleset_hash):
+    """Cache key per rep: ruleset, data fingerprint and everything cohort-level the section prints"""
+    
+    import hashlib
+    
+    keys = {}
+    for username, total_volume in reps:
+        cohort_rows = [
+            (cohort['experiment'], cohort['contact_method'], cohort['language'], sorted(rep_row.to_dict().items()))
+            for cohort, rep_row in rep_data_lookup[username]
+        ]
+        parts = [ruleset_hash, fingerprints[username], total_volume, username == best_performer, experiments, cohort_rows]
+        keys[username] = hashlib.sha256(repr(parts).encode()).hexdigest()
+    
+    return keys
+
+def load_section_cache(cache_path):
+    """Load cached rep sections ({'ruleset': hash, 'sections': {username: {'key', 'lines'}}})"""
+    
+    import json
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'ruleset': None, 'sections': {}}
+
+def save_section_cache(cache_path, section_cache):
+    """Persist rep sections for the next incremental run"""
+    
+    import json
+    import os
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump(section_cache, f)
+
+def generate_template_report(cohort_data, tasks_data, raw_data, metadata, workers=1, shard_dir=None, section_cache=None, engagement=None):
+    """Generate report following the exact template format
+    
+    With shard_dir, every rep meeting the cohort minimum gets a section, streamed to one file per
+    rep under shard_dir (see write_rep_shards) instead of the top 10 inline. With section_cache
+    (see load_section_cache), reps whose cache key is unchanged reuse their cached section and
+    only the rest are scored and rendered; the cache is updated in place. Pass `engagement` (e.g. from
+    get_engagement_table) to reuse already scored tasks.
+    """
     print("📝 Generating template-based report...")
     
     report_lines = []
@@ -1114,7 +1831,8 @@ def generate_template_report(cohort_data, tasks_data, raw_data, metadata):
     
     # Individual Recommendations section
     report_lines.append("## Individual Recommendations")
-    report_lines.append("*Top 10 reps by volume with detailed coaching insights*")
+    if shard_dir is None:
+        report_lines.append("*Top 10 reps by volume with detailed coaching insights*")
     report_lines.append("")
     
     # Get all unique reps from cohort data
@@ -1134,147 +1852,102 @@ def generate_template_report(cohort_data, tasks_data, raw_data, metadata):
         total_volume = sum([rep_row['owned_leads'] for cohort, rep_row in rep_data_lookup[username]])
         rep_volumes[username] = total_volume
     
-    top_volume_reps = sorted(rep_volumes.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    for username, total_volume in top_volume_reps:
-        rep_cohorts = rep_data_lookup[username]
-        rep_name = rep_cohorts[0][1]['owner_name']
-        
-        # Calculate overall rating - use first cohort performance as representative
-        first_cohort_performance = rep_cohorts[0][0]['rep_performance']
-        rating = rate_outreach_style(first_cohort_performance, tasks_data, raw_data, username)
-        
-        # Apply realistic rating cap - even best performers have room for improvement
-        if username == best_performer:
-            rating = min(95, rating)  # Best performer caps at 95
-        else:
-            rating = min(92, rating)  # Others cap at 92
-        
-        # Generate outreach summary
-        outreach_summary = generate_outreach_summary(username, rep_data_lookup, tasks_data, raw_data)
-        
-        report_lines.append(f"### {rep_name}")
-        report_lines.append(f"**Outreach Rating:** {rating}/100 | **Total Volume:** {total_volume} leads")
-        report_lines.append("")
-        report_lines.append(f"**Outreach Style Summary:** {outreach_summary}")
-        report_lines.append("")
-        
-        # Add notes analysis - both taking quality and utilization
-        rep_tasks_for_notes = tasks_data[
-            (tasks_data['owner_username'] == username) & 
-            (tasks_data['include_in_conext_analysis'] == True)
+    top_volume_reps = sorted(rep_volumes.items(), key=lambda x: x[1], reverse=True)
+    if shard_dir is None:
+        top_volume_reps = top_volume_reps[:10]
+    
+    # Reuse cached sections for reps whose data, cohort rows and rules are unchanged
+    sections_to_render = top_volume_reps
+    if section_cache is not None:
+        ruleset_hash = compute_ruleset_hash()
+        if section_cache.get('ruleset') != ruleset_hash:
+            section_cache.clear()
+            section_cache.update({'ruleset': ruleset_hash, 'sections': {}})
+        
+        usernames = [username for username, _ in top_volume_reps]
+        fingerprints = fingerprint_reps(tasks_data, raw_data, usernames)
+        cache_keys = section_cache_keys(top_volume_reps, rep_data_lookup, best_performer, experiments, fingerprints, ruleset_hash)
+        cached_sections = section_cache['sections']
+        
+        # Reps who left the roster would otherwise stay in the cache file for good
+        for username in set(cached_sections) - set(usernames):
+            del cached_sections[username]
+        
+        sections_to_render = [
+            (username, total_volume) for username, total_volume in top_volume_reps
+            if cached_sections.get(username, {}).get('key') != cache_keys[username]
         ]
-        if not rep_tasks_for_notes.empty:
-            notes_analysis = analyze_notes_utilization(rep_tasks_for_notes, raw_data)
-            if notes_analysis['total_opportunities'] > 0:
-                # Notes taking quality
-                comprehensive_rate = notes_analysis['comprehensive_notes_count'] / notes_analysis['total_opportunities']
-                empty_rate = notes_analysis['empty_notes_count'] / notes_analysis['total_opportunities']
-                
-                # Notes utilization
-                utilization_rate = 0
-                if notes_analysis['total_with_notes'] > 0:
-                    utilization_rate = notes_analysis['notes_utilized_count'] / notes_analysis['total_with_notes']
-                
-                report_lines.append(f"**Notes Quality:** {comprehensive_rate:.1%} comprehensive ({notes_analysis['comprehensive_notes_count']}/{notes_analysis['total_opportunities']} opportunities), {empty_rate:.1%} empty notes")
-                report_lines.append(f"  - Goals captured: {notes_analysis['goals_captured']}, Submissions: {notes_analysis['submission_needs_captured']}, BGC: {notes_analysis['bgc_timeline_captured']}, Additional: {notes_analysis['additional_captured']}")
-                report_lines.append(f"**Notes Utilization:** {utilization_rate:.1%} usage rate - Goals: {notes_analysis['goals_referenced']}, Submissions: {notes_analysis['submission_referenced']}, BGC: {notes_analysis['bgc_info_used']}, Additional: {notes_analysis['additional_notes_referenced']}")
-                report_lines.append("")
-        
-        # Generate comprehensive engagement analysis for each experiment
-        for i, experiment in enumerate(experiments, 1):
-            report_lines.append("")
-            report_lines.append(f"**{i}. Comprehensive Analysis for {experiment}**")
-            
-            # Check if rep meets minimum requirements for this experiment's cohorts
-            experiment_cohorts = [cohort for cohort, rep_row in rep_cohorts if cohort['experiment'] == experiment]
-            insufficient_cohorts = []
-            
-            for cohort in experiment_cohorts:
-                # Check if this rep has enough leads in each cohort
-                cohort_key = f"{cohort['experiment']}|{cohort['contact_method']}|{cohort['language']}"
-                if cohort_key in cohort_data:
-                    original_perf = cohort_data[cohort_key]['original_rep_performance']
-                    if username in original_perf.index:
-                        rep_leads = original_perf.loc[username]['owned_leads']
-                        if rep_leads < 25:
-                            insufficient_cohorts.append(f"{cohort['contact_method']}-{cohort['language']} ({rep_leads} leads, need 25+)")
-            
-            if insufficient_cohorts:
-                report_lines.append(f"   *Note: Insufficient data in {', '.join(insufficient_cohorts)} for meaningful analysis*")
-                report_lines.append("")
-            
-            # Get comprehensive analysis for this experiment
-            good_analyses, bad_analyses = get_comprehensive_task_analysis(tasks_data, raw_data, username, experiment)
-            
-            if good_analyses or bad_analyses:
-                # Calculate engagement metrics for this experiment
-                all_analyses = good_analyses + bad_analyses
-                avg_engagement = sum(a['engagement_score'] for a in all_analyses) / len(all_analyses) if all_analyses else 0
-                
-                notes_integration_count = sum(1 for a in all_analyses if a['notes_integration'] != 'none')
-                playbook_adherence_count = sum(1 for a in all_analyses if a['playbook_adherence'] in ['good', 'excellent'])
-                
-                report_lines.append(f"   **Engagement Metrics:** Avg Score {avg_engagement:.0f}/100, Notes Integration {notes_integration_count}/{len(all_analyses)}, Playbook Adherence {playbook_adherence_count}/{len(all_analyses)}")
-                report_lines.append("")
-                
-                # Best engagement example
-                if good_analyses:
-                    best_example = good_analyses[0]  # Highest scoring good example
-                    report_lines.append(f"   **Best Example:** {best_example['opportunity_uuid']} (Score: {best_example['engagement_score']}/100)")
-                    report_lines.append(f"   - {best_example['detailed_assessment']}")
-                else:
-                    report_lines.append("   **Best Example:** No successful conversions found")
-                report_lines.append("")
-                
-                # Worst engagement example for learning
-                if bad_analyses:
-                    worst_example = bad_analyses[0]  # Lowest scoring bad example
-                    improvement_recs = '; '.join(worst_example['improvement_recommendations']) if worst_example['improvement_recommendations'] else 'Continue current approach'
-                    report_lines.append(f"   **Learning Opportunity:** {worst_example['opportunity_uuid']} (Score: {worst_example['engagement_score']}/100)")
-                    report_lines.append(f"   - {worst_example['detailed_assessment']}")
-                    report_lines.append(f"   - **Recommendations:** {improvement_recs}")
-                else:
-                    report_lines.append("   **Learning Opportunity:** No unsuccessful examples found")
-                report_lines.append("")
-                
-                # Key patterns and insights
-                common_strengths = {}
-                common_weaknesses = {}
-                
-                for analysis in all_analyses:
-                    for strength in analysis['strengths']:
-                        common_strengths[strength] = common_strengths.get(strength, 0) + 1
-                    for weakness in analysis['weaknesses']:
-                        common_weaknesses[weakness] = common_weaknesses.get(weakness, 0) + 1
-                
-                if common_strengths:
-                    top_strength = max(common_strengths.items(), key=lambda x: x[1])
-                    report_lines.append(f"   **Consistent Strength:** {top_strength[0]} ({top_strength[1]} interactions)")
-                
-                if common_weaknesses:
-                    top_weakness = max(common_weaknesses.items(), key=lambda x: x[1])
-                    report_lines.append(f"   **Primary Focus Area:** {top_weakness[0]} ({top_weakness[1]} interactions)")
-            else:
-                report_lines.append("   *No analyzable interactions found for this experiment*")
-        
+        print(f"   ♻️  Reusing {len(top_volume_reps) - len(sections_to_render)}/{len(top_volume_reps)} cached rep sections")
+    
+    # Only tasks of reps being rendered need scoring
+    render_usernames = [username for username, _ in sections_to_render]
+    if section_cache is not None:
+        tasks_data = tasks_data[tasks_data['owner_username'].isin(render_usernames)]
+    
+    # Nothing to score when every section comes from the cache
+    context = None
+    if sections_to_render:
+        # Index opportunities once so every per-task lookup below is O(1)
+        opp_index = build_opportunity_index(raw_data)
+        
+        # Normalize opportunity notes once, then score every task in batch; rep sections read from these tables
+        notes_layer = build_notes_features(raw_data)
+        if engagement is None:
+            engagement = score_engagement_batch(join_tasks_to_opportunities(tasks_data, raw_data), notes_layer)
+        else:
+            engagement = engagement[engagement.index.isin(tasks_data.index)]
+        notes_usage = score_notes_usage_batch(tasks_data, raw_data, notes_layer)
+        
+        # Render each rep's section (optionally in parallel) from the shared per-rep partitions
+        context = {
+            'cohort_data': cohort_data,
+            'tasks_data': tasks_data,
+            'raw_data': raw_data,
+            'rep_data_lookup': rep_data_lookup,
+            'best_performer': best_performer,
+            'experiments': experiments,
+            'opp_index': opp_index,
+            'engagement': engagement,
+            'rep_partitions': partition_rep_tasks(tasks_data, raw_data, render_usernames, engagement, notes_usage,
+                                                  {username: best_cohort_lift(rep_data_lookup[username]) for username in render_usernames})
+        }
+    
+    sections = iter_rep_sections(sections_to_render, context, workers)
+    
+    if section_cache is not None:
+        sections = _merge_cached_sections(top_volume_reps, sections, section_cache['sections'], cache_keys)
+    
+    if shard_dir is not None:
+        import os
+        index_path = write_rep_shards(top_volume_reps, sections, shard_dir, rep_data_lookup)
+        report_lines.append(f"*All {len(top_volume_reps)} reps meeting the 25-lead cohort minimum - one file per rep, see {os.path.basename(shard_dir)}/{os.path.basename(index_path)}*")
         report_lines.append("")
+        return "\n".join(report_lines)
+    
+    for section_lines in sections:
+        report_lines.extend(section_lines)
     
     return "\n".join(report_lines)
 
 def main():
     """Main template analysis workflow"""
     
+    import argparse
+    parser = argparse.ArgumentParser(description='Template-based Lyft QA analysis')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for rendering rep sections (default: 1)')
+    parser.add_argument('--full-roster', action='store_true', help='Write a section for every qualifying rep to results/rep_sections/ instead of the top 10')
+    parser.add_argument('--incremental', action='store_true', help='Reuse cached rep sections for reps whose data and rules are unchanged')
+    parser.add_argument('--no-archive', action='store_true', help='Keep existing results in place (run_analysis.py archives them once per run)')
+    args = parser.parse_args()
+    
     # Archive existing results
-    import sys
-    import os
-    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities'))
-    try:
-        from archive_manager import ArchiveManager
-        archive_manager = ArchiveManager()
-        archive_manager.prepare_for_new_analysis()
-    except ImportError:
-        print("⚠️  Archive manager not available, continuing without archiving...")
+    if not args.no_archive:
+        try:
+            from archive_manager import ArchiveManager
+            archive_manager = ArchiveManager()
+            archive_manager.prepare_for_new_analysis()
+        except ImportError:
+            print("⚠️  Archive manager not available, continuing without archiving...")
     
     print("📋 Starting template-based analysis...")
     
@@ -1282,23 +1955,39 @@ def main():
         # Load all data
         raw_data, tasks_data, control_baselines, metadata = load_and_merge_data()
         
-        # Analyze by cohort
-        cohort_data = analyze_by_cohort(raw_data, tasks_data, control_baselines)
-        
-        # Generate template report
-        report = generate_template_report(cohort_data, tasks_data, raw_data, metadata)
-        
-        # Save results
+        # Results locations
         import os
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_dir = os.path.dirname(script_dir)
+        
+        # Conversion counts come from the shared cube, rebuilt only when the raw export changes
+        from conversion_cube import load_conversion_cube
+        cube = load_conversion_cube(os.path.join(project_dir, 'data', 'bigquery_raw_data.csv'), os.path.join(project_dir, 'data', 'cache'), raw_data)
+        
+        # Analyze by cohort
+        cohort_data = analyze_by_cohort(raw_data, tasks_data, control_baselines, cube)
+        
         results_dir = os.path.join(project_dir, 'results')
+        shard_dir = os.path.join(results_dir, 'rep_sections') if args.full_roster else None
+        cache_path = os.path.join(project_dir, 'data', 'cache', 'template_sections.json')
+        section_cache = load_section_cache(cache_path) if args.incremental else None
+        
+        # Score tasks once into the shared engagement table (reused while rules and data are unchanged)
+        engagement = get_engagement_table(tasks_data, raw_data, os.path.join(project_dir, 'data', 'cache', ENGAGEMENT_TABLE_FILE))
+        
+        # Generate template report
+        report = generate_template_report(cohort_data, tasks_data, raw_data, metadata, args.workers, shard_dir, section_cache, engagement)
+        
+        if section_cache is not None:
+            save_section_cache(cache_path, section_cache)
         
         with open(os.path.join(results_dir, "analysis_summary.md"), "w") as f:
             f.write(report)
         
         print(f"\n✅ Template analysis complete!")
         print(f"📁 Report saved: results/analysis_summary.md")
+        if shard_dir is not None:
+            print(f"📁 Rep sections saved: results/rep_sections/ (index.md)")
         print(f"📊 Analyzed {len(cohort_data)} cohorts")
         print(f"🎯 Following exact template format with individual recommendations")
         
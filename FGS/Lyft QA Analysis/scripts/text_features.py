@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Text Features - Shared document x keyword / pattern matrices for task content analysis
+Lowercases each document once and evaluates every keyword group in a single regex pass
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+def normalize_documents(texts):
+    """Lowercase every document once (missing documents become empty text)"""
+    return pd.Series(texts).astype(object).where(pd.notna(texts), '').map(str).str.lower()
+
+def build_keyword_matrix(texts, keywords):
+    """Return a document x keyword boolean matrix: does the keyword occur anywhere in each document
+    
+    All keywords are found with one lookahead regex per document. The longest keyword wins at each
+    position, so keywords contained in a matched keyword (e.g. 'you' in 'your') are marked too.
+    """
+    
+    documents = normalize_documents(texts)
+    keywords = list(dict.fromkeys(word.lower() for word in keywords if word))
+    hits = np.zeros((len(documents), len(keywords)), dtype=bool)
+    
+    if keywords and len(documents):
+        alternation = '|'.join(re.escape(word) for word in sorted(keywords, key=len, reverse=True))
+        found = documents.reset_index(drop=True).str.findall(f'(?=({alternation}))').explode().dropna()
+        
+        # Matched keyword -> every keyword it contains (itself included)
+        contains = np.array([[other in word for other in keywords] for word in keywords], dtype=bool)
+        positions = {word: i for i, word in enumerate(keywords)}
+        np.logical_or.at(hits, found.index.to_numpy(), contains[found.map(positions).to_numpy(dtype=int)])
+    
+    return pd.DataFrame(hits, index=documents.index, columns=keywords)
+
+def build_pattern_matrix(texts, patterns):
+    """Return a document x pattern boolean matrix for {pattern_name: [keywords]} groups
+    
+    A document matches a pattern when it contains any of the group's keywords (case-insensitive
+    substring match). Aggregate rows for any tier split, e.g. matrix[top_mask].mean().
+    """
+    
+    keyword_hits = build_keyword_matrix(texts, [word for keywords in patterns.values() for word in keywords])
+    
+    matrix = pd.DataFrame(index=keyword_hits.index)
+    for pattern_name, keywords in patterns.items():
+        columns = list(dict.fromkeys(word.lower() for word in keywords if word))
+        matrix[pattern_name] = keyword_hits[columns].any(axis=1) if columns else False
+    
+    return matrix
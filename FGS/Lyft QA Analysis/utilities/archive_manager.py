@@ -9,6 +9,9 @@ from datetime import datetime
 from pathlib import Path
 import glob
 
+# Report folders written into results/ that are archived along with the files (--full-roster)
+REPORT_SUBFOLDERS = {'rep_sections'}
+
 class ArchiveManager:
     def __init__(self, results_dir="results"):
         self.results_dir = Path(results_dir)
@@ -23,11 +26,13 @@ class ArchiveManager:
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Find all files in results directory (excluding archived folder)
+        # Find all files in results directory (excluding archived folder), plus the rep_sections/ report folder
         result_files = []
         for file_path in self.results_dir.iterdir():
             if file_path.is_file() and not file_path.name.startswith('.'):
                 result_files.append(file_path)
+            elif file_path.is_dir() and file_path.name in REPORT_SUBFOLDERS:
+                result_files.append(file_path)
         
         if not result_files:
             print("📁 No existing results to archive")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Columnar Store - Typed, column-by-column NumPy copies of the Lyft data exports
+Loaders write one next to each CSV; analysis stages load only the columns they use, already typed
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Declared column types: 'category' dimensions, real 'bool' flags, parsed 'datetime' values and
+# free 'text'. Text and category columns are read as strings, never re-inferred by read_csv.
+RAW_DATA_SCHEMA = {
+    'opportunity_uuid': 'text',
+    'language': 'category',
+    'experiment': 'category',
+    'first_contact_date': 'datetime',
+    'owner_username': 'category',
+    'owner_name': 'category',
+    'first_contact_method': 'category',
+    'full_conversion': 'bool',
+    'upfunnel_next_step_conversion': 'category',
+    'what_are_your_goals_or_motivations_to_start_driving_for_lyft': 'text',
+    'what_else_do_you_need_to_submit': 'text',
+    'estimated_bgc_date': 'text',
+    'additional_notes': 'text'
+}
+
+TASK_DATA_SCHEMA = {
+    'opportunity_uuid': 'text',
+    'owner_username': 'category',
+    'language': 'category',
+    'experiment': 'category',
+    'first_contact_method': 'category',
+    'task_start_timestamp': 'datetime',
+    'task_type': 'category',
+    'task_stage': 'category',
+    'direction': 'category',
+    'contact_flag': 'bool',
+    'include_in_conext_analysis': 'bool',
+    'task_summary': 'text',
+    'task_id': 'text'
+}
+
+def parse_bool(values):
+    """Real booleans from bool, 0/1 or 'True'/'False' text columns (missing -> False)
+    
+    astype(bool) alone turns the text 'False' (and NaN) into True.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype(bool)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).astype(bool)
+    return values.astype(object).map(str).str.strip().str.lower().isin(['true', '1', '1.0', 'yes'])
+
+def read_typed_csv(csv_path, schema, columns=None):
+    """Read a CSV straight into its declared types (optionally only the given columns)"""
+    frame = pd.read_csv(
+        csv_path,
+        usecols=(lambda column: column in columns) if columns is not None else None,
+        dtype={column: 'str' for column in schema}
+    )
+    for column in frame.columns:
+        column_type = schema.get(column, 'text')
+        if column_type == 'category':
+            frame[column] = frame[column].astype('category')
+        elif column_type == 'bool':
+            frame[column] = parse_bool(frame[column]).values
+        elif column_type == 'datetime':
+            # ISO8601 so whole-second and fractional timestamps in one export both parse
+            frame[column] = pd.to_datetime(frame[column], errors='coerce', format='ISO8601')
+    return frame
+
+def store_path(csv_path):
+    """Columnar copy of csv_path (data/x.csv -> data/x.npz)"""
+    return f"{os.path.splitext(csv_path)[0]}.npz"
+
+def csv_signature(csv_path):
+    """Size and modification time of a CSV, enough to tell whether it was rewritten"""
+    stat = os.stat(csv_path)
+    return json.dumps({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+
+def _encode_text(values):
+    """Dictionary-encode a text or categorical column: int32 codes (-1 missing) plus UTF-8 categories
+    
+    Categories are stored as one byte buffer with offsets, so long call summaries do not
+    blow up into fixed-width unicode arrays and nothing needs pickling.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, categories = values.cat.codes.to_numpy(), list(values.cat.categories)
+    else:
+        codes, categories = pd.factorize(values)
+    encoded = [str(category).encode('utf-8') for category in categories]
+    offsets = np.cumsum([0] + [len(text) for text in encoded], dtype=np.int64)
+    return codes.astype(np.int32), np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+def _decode_categories(buffer, offsets):
+    """Category strings back from a UTF-8 buffer and offsets"""
+    data = buffer.tobytes()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+def write_columnar_store(csv_path, schema):
+    """Write the typed columnar copy of csv_path next to it, returns the typed frame
+    
+    Each column is its own array in an uncompressed .npz, so readers load only what they ask for.
+    The archive is written to a temporary file and moved into place in one step.
+    """
+    frame = read_typed_csv(csv_path, schema)
+    
+    arrays = {
+        '__source': np.array(csv_signature(csv_path)),
+        '__columns': np.array(list(frame.columns), dtype=str),
+        '__types': np.array([schema.get(column, 'text') for column in frame.columns], dtype=str)
+    }
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            timezone = getattr(values.dt, 'tz', None)
+            arrays[f'{column}__tz'] = np.array(str(timezone) if timezone is not None else '')
+            arrays[column] = (values.dt.tz_convert(None) if timezone is not None else values).to_numpy()
+        elif values.dtype.kind in 'biuf':
+            arrays[column] = values.to_numpy()
+        else:
+            arrays[f'{column}__codes'], arrays[f'{column}__text'], arrays[f'{column}__offsets'] = _encode_text(values)
+    
+    path = store_path(csv_path)
+    with open(f"{path}.tmp", 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(f"{path}.tmp", path)
+    
+    print(f"🗄️  Columnar store written: {path} ({len(frame):,} rows x {len(frame.columns)} columns)")
+    return frame
+
+def read_columnar_store(csv_path, columns=None):
+    """Read csv_path's columnar copy (only the given columns), or None if it is missing or stale"""
+    path = store_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    
+    with np.load(path, allow_pickle=False) as archive:
+        if str(archive['__source']) != csv_signature(csv_path):
+            return None
+        
+        data = {}
+        for column, column_type in zip(archive['__columns'].tolist(), archive['__types'].tolist()):
+            if columns is not None and column not in columns:
+                continue
+            if column_type == 'datetime':
+                values = pd.Series(archive[column])
+                timezone = str(archive[f'{column}__tz'])
+                data[column] = values.dt.tz_localize('UTC').dt.tz_convert(timezone) if timezone else values
+            elif column in archive.files:
+                data[column] = archive[column]
+            else:
+                codes = archive[f'{column}__codes']
+                categories = _decode_categories(archive[f'{column}__text'], archive[f'{column}__offsets'])
+                if column_type == 'category':
+                    data[column] = pd.Categorical.from_codes(codes, categories)
+                else:
+                    # Code -1 (missing) picks the trailing NaN
+                    data[column] = pd.Series(np.array(categories + [np.nan], dtype=object)[codes], dtype='str')
+        return pd.DataFrame(data)
+
+def load_table(csv_path, schema, columns=None):
+    """Load csv_path's typed columns, preferring its columnar copy
+    
+    columns projects the load to the listed columns (kept in file order). A missing or stale
+    copy (the CSV was rewritten) is rebuilt from the CSV for this and later stages.
+    """
+    frame = read_columnar_store(csv_path, columns)
+    if frame is None:
+        frame = write_columnar_store(csv_path, schema)
+        if columns is not None:
+            frame = frame[[column for column in frame.columns if column in columns]]
+    return frame
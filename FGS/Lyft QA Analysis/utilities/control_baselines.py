@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Control Baselines - Indexed control group conversion rates by month, experiment and language
+"""
+
+import pandas as pd
+
+def to_xp_month(values):
+    """Normalize dates or 'YYYY-MM-DD' strings to 'YYYY-MM' month keys (missing dates stay NaN)"""
+    return pd.to_datetime(pd.Series(values), errors='coerce').dt.strftime('%Y-%m')
+
+class ControlBaselineIndex:
+    def __init__(self, control_baselines=None):
+        """Index control_baselines.csv rows by (xp_month, experiment, language)
+
+        Each lookup level keeps the first matching row, the same row the old
+        DataFrame filters returned with iloc[0].
+        """
+        self.exact = {}
+        self.by_month = {}
+        self.by_language = {}
+        self.by_experiment = {}
+
+        if control_baselines is None or control_baselines.empty:
+            return
+
+        if 'xp_month' in control_baselines.columns:
+            months = to_xp_month(control_baselines['xp_month']).tolist()
+        else:
+            months = [None] * len(control_baselines)
+        if 'language' in control_baselines.columns:
+            languages = control_baselines['language'].tolist()
+        else:
+            languages = [None] * len(control_baselines)
+
+        for month, experiment, language, rate in zip(months, control_baselines['experiment'], languages, control_baselines['control_conversion_rate']):
+            self.exact.setdefault((month, experiment, language), rate)
+            self.by_month.setdefault((month, experiment), rate)
+            self.by_language.setdefault((experiment, language), rate)
+            self.by_experiment.setdefault(experiment, rate)
+
+    @classmethod
+    def from_csv(cls, path="data/control_baselines.csv"):
+        """Load the index from a control baselines CSV (empty index if the file is missing)"""
+        try:
+            return cls(pd.read_csv(path))
+        except FileNotFoundError:
+            print("⚠️  Control baselines not found, using default 0%")
+            return cls()
+
+    @property
+    def empty(self):
+        return not self.by_experiment
+
+    @property
+    def months(self):
+        """Sorted months covered by the index"""
+        return sorted({month for month, _ in self.by_month if isinstance(month, str)})
+
+    def lookup(self, experiment, language=None, xp_month=None):
+        """Baseline for one cohort: month+experiment+language, then month+experiment,
+        then experiment+language, then experiment only
+
+        Pass language=None to ignore language. Returns None when the experiment has
+        no control rows at all.
+        """
+        month = to_xp_month([xp_month]).iloc[0] if xp_month is not None else None
+        if month is not None and language is not None and (month, experiment, language) in self.exact:
+            return self.exact[(month, experiment, language)]
+        if month is not None and (month, experiment) in self.by_month:
+            return self.by_month[(month, experiment)]
+        if language is not None and (experiment, language) in self.by_language:
+            return self.by_language[(experiment, language)]
+        return self.by_experiment.get(experiment)
+
+    def join(self, frame, experiment_col='experiment', language_col=None, date_col=None):
+        """Baseline for every row of frame in one join (NaN where the experiment has no baseline)
+
+        date_col is any date column (e.g. first_contact_date) and is bucketed to
+        its month, so frames spanning several months get month-specific baselines.
+        """
+        keys = pd.DataFrame({
+            'xp_month': to_xp_month(frame[date_col]).values if date_col else None,
+            'experiment': frame[experiment_col].values,
+            'language': frame[language_col].values if language_col else None
+        })
+
+        # Resolve each distinct cohort key once, then broadcast back to the rows
+        resolved = keys.drop_duplicates().copy()
+        resolved['control_baseline'] = [
+            self.lookup(experiment, language if pd.notna(language) else None, month if pd.notna(month) else None)
+            for month, experiment, language in resolved[['xp_month', 'experiment', 'language']].itertuples(index=False)
+        ]
+        resolved['control_baseline'] = pd.to_numeric(resolved['control_baseline'], errors='coerce')
+
+        baselines = keys.merge(resolved, how='left', on=['xp_month', 'experiment', 'language'])['control_baseline']
+        baselines.index = frame.index
+        return baselines
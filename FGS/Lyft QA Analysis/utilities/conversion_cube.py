@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Conversion Cube - Opportunity and conversion counts at experiment x language x method x rep x day grain
+Built once per raw data refresh; every report answers its roll-ups by summing cube cells
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from columnar_store import RAW_DATA_SCHEMA, load_table
+
+# Finest grain of the cube (contact_day is first_contact_date truncated to the day)
+CUBE_DIMENSIONS = ['experiment', 'language', 'first_contact_method', 'owner_username', 'contact_day']
+CUBE_MEASURES = ['opportunities', 'conversions', 'upfunnel_total', 'upfunnel_conversions']
+CUBE_FILE = 'conversion_cube.csv'
+# Raw columns the cube is built from; bump CUBE_VERSION when from_raw changes how they are read
+CUBE_SOURCE_COLUMNS = CUBE_DIMENSIONS[:-1] + ['first_contact_date', 'full_conversion', 'upfunnel_next_step_conversion', 'owner_name']
+CUBE_VERSION = 2
+
+class ConversionCube:
+    def __init__(self, cells, dimensions):
+        """Wrap aggregated cells (one row per distinct dimension tuple, missing values kept as their own cells)"""
+        self.cells = cells
+        self.dimensions = dimensions
+
+    @classmethod
+    def from_raw(cls, raw_data):
+        """Aggregate opportunity rows to the finest grain available in raw_data
+
+        Besides the measures, each cell keeps first_row (position of its first opportunity) and the
+        first non-missing owner_name with its position, so roll-ups reproduce groupby 'first'
+        and first-appearance ordering over the raw rows.
+        """
+        dimensions = [dim for dim in CUBE_DIMENSIONS if dim in raw_data.columns]
+        frame = raw_data[dimensions].copy()
+        if 'first_contact_date' in raw_data.columns:
+            dimensions.append('contact_day')
+            frame['contact_day'] = pd.to_datetime(raw_data['first_contact_date'], errors='coerce').dt.strftime('%Y-%m-%d')
+
+        position = np.arange(len(raw_data))
+        frame['opportunities'] = 1
+        frame['conversions'] = raw_data['full_conversion'].astype(bool).astype(int)
+        if 'upfunnel_next_step_conversion' in raw_data.columns:
+            upfunnel = raw_data['upfunnel_next_step_conversion']
+            frame['upfunnel_total'] = (upfunnel != 'n/a').astype(int)
+            frame['upfunnel_conversions'] = (upfunnel == 'true').astype(int)
+        else:
+            frame['upfunnel_total'] = 0
+            frame['upfunnel_conversions'] = 0
+        frame['first_row'] = position
+        if 'owner_name' in raw_data.columns:
+            frame['owner_name'] = raw_data['owner_name'].values
+            frame['name_row'] = np.where(raw_data['owner_name'].notna(), position, np.nan)
+
+        aggregations = {measure: 'sum' for measure in CUBE_MEASURES}
+        aggregations['first_row'] = 'min'
+        if 'owner_name' in frame.columns:
+            aggregations.update({'owner_name': 'first', 'name_row': 'min'})
+
+        cells = frame.groupby(dimensions, dropna=False, sort=False, observed=True).agg(aggregations).reset_index()
+        return cls(cells, dimensions)
+
+    @property
+    def total_opportunities(self):
+        return int(self.cells['opportunities'].sum())
+
+    def rollup(self, dimensions):
+        """Sum cells up to the given dimensions, sorted like a groupby over the raw rows
+
+        Cells missing any of the dimensions are dropped (groupby's dropna). Returns the measures plus
+        conversion_rate, first_row and, when available, the first owner_name per group.
+        """
+        cells = self.cells.dropna(subset=dimensions)
+        grouped = cells.groupby(dimensions, observed=True)
+
+        totals = grouped[CUBE_MEASURES].sum()
+        totals['conversion_rate'] = totals['conversions'] / totals['opportunities']
+        totals['first_row'] = grouped['first_row'].min()
+        if 'owner_name' in cells.columns:
+            named = cells.dropna(subset=['owner_name']).sort_values('name_row', kind='stable')
+            totals['owner_name'] = named.groupby(dimensions, observed=True)['owner_name'].first().reindex(totals.index)
+
+        return totals
+
+    def save(self, path, source_fingerprint):
+        """Write the cells to CSV with a sidecar JSON recording the raw data they were built from"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.cells.to_csv(path, index=False)
+        with open(f"{os.path.splitext(path)[0]}.json", 'w') as f:
+            json.dump({'source': source_fingerprint, 'version': CUBE_VERSION, 'dimensions': self.dimensions}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved cube; returns (cube, source_fingerprint) or None if it is missing or from an older version"""
+        meta_path = f"{os.path.splitext(path)[0]}.json"
+        if not os.path.exists(path) or not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != CUBE_VERSION:
+            return None
+        # Only empty fields are missing values; dimension text like 'NA' stays as written
+        cells = pd.read_csv(path, keep_default_na=False, na_values=[''])
+        return cls(cells, meta['dimensions']), meta['source']
+
+def file_fingerprint(path):
+    """SHA-256 of a data file's bytes, identifying one data refresh"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_conversion_cube(raw_path, cache_dir, raw_data=None):
+    """Return the cube for raw_path, rebuilding and saving it only when the raw file changed
+
+    raw_data may be passed when the caller already loaded raw_path (with every CUBE_SOURCE_COLUMNS
+    column), to avoid re-reading it; otherwise only those columns are loaded from the typed copy.
+    """
+    cube_path = os.path.join(cache_dir, CUBE_FILE)
+    fingerprint = file_fingerprint(raw_path)
+
+    saved = ConversionCube.load(cube_path)
+    if saved is not None and saved[1] == fingerprint:
+        print(f"♻️  Loaded conversion cube ({len(saved[0].cells):,} cells)")
+        return saved[0]
+
+    if raw_data is None or not set(CUBE_SOURCE_COLUMNS) <= set(raw_data.columns):
+        raw_data = load_table(raw_path, RAW_DATA_SCHEMA, columns=CUBE_SOURCE_COLUMNS)
+    cube = ConversionCube.from_raw(raw_data)
+    cube.save(cube_path, fingerprint)
+    print(f"🧊 Built conversion cube: {len(raw_data):,} opportunities -> {len(cube.cells):,} cells")
+    return cube
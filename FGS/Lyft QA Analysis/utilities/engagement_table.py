@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Engagement Table - Batch engagement scoring of every task and the persisted table the reports share
+Scored once per ruleset and input data, saved as a pickle-free .npz under data/cache/
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+# Task columns the engagement table is scored from (stages loading other task columns share one table)
+ENGAGEMENT_TASK_COLUMNS = ['opportunity_uuid', 'owner_username', 'experiment', 'task_type', 'task_summary']
+
+# Batch engagement scoring - mirrors template_analysis.deep_engagement_analysis rule for rule, one column per signal
+NOTES_FIELDS = {
+    'goals': 'what_are_your_goals_or_motivations_to_start_driving_for_lyft',
+    'submission_needs': 'what_else_do_you_need_to_submit',
+    'bgc_timeline': 'estimated_bgc_date',
+    'additional': 'additional_notes'
+}
+
+# Per field: placeholder answer, min length to count as captured, min keyword length, stop words
+NOTES_KEYWORD_RULES = {
+    'goals': ('ignore question 1', 5, 3, ['goals', 'motivations', 'driving', 'lyft', 'want', 'need', 'money']),
+    'submission_needs': ('ignore question 2', 5, 3, ['submit', 'need', 'have']),
+    'bgc_timeline': ('ignore question 3', 5, 3, []),
+    'additional': ('ignore question 4', 10, 4, [])
+}
+
+ENGAGEMENT_STRENGTHS = [
+    ('positive_response', "Positive prospect response indicating engagement"),
+    ('offers_assistance', "Offers valuable assistance"),
+    ('prospect_ready', "Shows prospect motivation and readiness"),
+    ('call_assistance', "Provided meaningful assistance during call"),
+    ('proactive_follow_up', "Proactive follow-up approach"),
+    ('goals_referenced', "Referenced prospect's stated goals in outreach"),
+    ('submission_addressed', "Addressed prospect's submission needs"),
+    ('bgc_addressed', "Addressed BGC timeline concerns"),
+    ('context_used', "Used additional prospect context effectively"),
+    ('objection_pivoted', "Followed 3-step objection handling: identified, addressed, pivoted"),
+    ('objection_addressed', "Addressed prospect concern but missed pivot opportunity")
+]
+
+ENGAGEMENT_WEAKNESSES = [
+    ('not_recognized', "Prospect doesn't recognize rep - relationship building failure"),
+    ('minimal_response', "Minimal/negative response indicates communication breakdown"),
+    ('disengaged', "Prospect showing disengagement or resistance"),
+    ('notes_unused', "Failed to utilize available prospect information"),
+    ('notes_missing', "No meaningful prospect information available"),
+    ('objection_missed', "Failed to properly address prospect objection")
+]
+
+ENGAGEMENT_RECOMMENDATIONS = [
+    ('notes_unused', "Reference prospect's goals, timeline, or context in outreach"),
+    ('notes_missing', "Capture more comprehensive prospect notes"),
+    ('generic_outreach', "Increase personalization using prospect information")
+]
+
+# Compact engagement encoding - level and exit columns hold indexes into these labels,
+# *_bits columns hold bit i for entry i of the matching flag list
+ENGAGEMENT_LEVELS = {
+    'notes_integration': ['none', 'good', 'excellent'],
+    'playbook_adherence': ['poor', 'good', 'excellent'],
+    'personalization_level': ['generic', 'moderately_personalized', 'highly_personalized']
+}
+
+EXIT_ASSESSMENTS = [
+    '',
+    "No meaningful outreach content to analyze",
+    "Call too brief for meaningful analysis",
+    "Failed to reach prospect"
+]
+
+ENGAGEMENT_FLAG_SETS = {
+    'strength_bits': ENGAGEMENT_STRENGTHS,
+    'weakness_bits': ENGAGEMENT_WEAKNESSES,
+    'recommendation_bits': ENGAGEMENT_RECOMMENDATIONS
+}
+
+def pack_flags(flags, flag_texts):
+    """Pack boolean flag columns into one integer bit field per row (bit i = flag_texts[i])"""
+    
+    bits = np.zeros(len(flags), dtype=np.uint16)
+    for bit, (flag, _) in enumerate(flag_texts):
+        bits |= flags[flag].to_numpy(dtype=np.uint16) << np.uint16(bit)
+    return bits
+
+def text_column(frame, column):
+    """Return a column as Python str() text, matching str(row.get(column, '')) on a single row"""
+    
+    if column not in frame.columns:
+        return pd.Series('', index=frame.index, dtype=object)
+    return frame[column].astype(object).map(str)
+
+def contains_any(text, words):
+    """Vectorized any(word in text for word in words)"""
+    
+    return text.str.contains('|'.join(re.escape(word) for word in words), regex=True)
+
+def build_notes_features(opportunities):
+    """Normalize every opportunity's notes once: captured flags per field plus its reference keywords
+    
+    Returns {'captured': frame of per-field flags and captured_count aligned to opportunities,
+    'keywords': long frame of (opp_row, field, keyword)} where opp_row is the opportunity's
+    position. Keywords are only kept for captured fields, first three qualifying words each.
+    """
+    
+    opportunities = opportunities.reset_index(drop=True)
+    captured = pd.DataFrame(index=opportunities.index)
+    keywords = []
+    
+    for name, column in NOTES_FIELDS.items():
+        placeholder, min_captured, min_keyword, stop_words = NOTES_KEYWORD_RULES[name]
+        text = text_column(opportunities, column).str.strip()
+        captured[name] = (text != placeholder) & (text.str.len() > min_captured)
+        
+        words = text[captured[name]].str.lower().str.split().explode().dropna()
+        words = words[(words.str.len() > min_keyword) & ~words.isin(stop_words)]
+        words = words.groupby(level=0).head(3)
+        keywords.append(pd.DataFrame({'opp_row': words.index, 'field': name, 'keyword': words.values}))
+    
+    captured['captured_count'] = captured[list(NOTES_FIELDS)].sum(axis=1)
+    return {'captured': captured, 'keywords': pd.concat(keywords, ignore_index=True)}
+
+def build_notes_keyword_index(pairs, task_content):
+    """Inverted index keyword -> set of task positions whose content contains it
+    
+    Only (keyword, task) candidates from `pairs` are scanned, each once, however many fields
+    or opportunities share the keyword. Matching is substring containment like the per-task rules.
+    """
+    
+    candidates = pairs[['keyword', 'task']].drop_duplicates()
+    contains = np.array([keyword in task_content[task] for keyword, task in zip(candidates['keyword'].values, candidates['task'].values)], dtype=bool)
+    hits = candidates[contains]
+    return {keyword: set(tasks) for keyword, tasks in hits.groupby('keyword')['task']}
+
+def match_notes_keywords(opp_rows, task_content, notes_layer):
+    """Per task and notes field, whether the outreach content references any of that field's keywords
+    
+    opp_rows gives each task's opportunity position in the notes layer (NaN for no match).
+    Returns a boolean frame indexed by task position with one column per NOTES_FIELDS name.
+    """
+    
+    task_content = np.asarray(task_content, dtype=object)
+    tasks = pd.DataFrame({'task': np.arange(len(task_content)), 'opp_row': opp_rows}).dropna()
+    tasks['opp_row'] = tasks['opp_row'].astype(int)
+    pairs = tasks.merge(notes_layer['keywords'], on='opp_row')
+    
+    keyword_index = build_notes_keyword_index(pairs, task_content)
+    pairs['referenced'] = [task in keyword_index.get(keyword, ()) for keyword, task in zip(pairs['keyword'].values, pairs['task'].values)]
+    
+    referenced = pairs.groupby(['task', 'field'])['referenced'].any().unstack('field')
+    return referenced.reindex(index=range(len(task_content)), columns=list(NOTES_FIELDS)).fillna(False).astype(bool)
+
+def join_tasks_to_opportunities(tasks_data, raw_data):
+    """Attach each task's opportunity (first row per uuid/owner/experiment, opp_row = its position in raw_data)"""
+    
+    keys = ['opportunity_uuid', 'owner_username', 'experiment']
+    opp_columns = keys + ['full_conversion'] + [col for col in NOTES_FIELDS.values() if col in raw_data.columns]
+    
+    opps = raw_data[opp_columns].assign(opp_row=np.arange(len(raw_data)))
+    opps = opps.dropna(subset=keys).drop_duplicates(subset=keys, keep='first')
+    task_columns = [col for col in tasks_data.columns if col not in opp_columns + ['opp_row'] or col in keys]
+    
+    joined = tasks_data[task_columns].merge(opps, on=keys, how='left', indicator=True)
+    joined.index = tasks_data.index
+    return joined[joined.pop('_merge') == 'both']
+
+def score_engagement_batch(joined, notes_layer=None):
+    """Score every task/opportunity row at once, reproducing deep_engagement_analysis exactly
+    
+    Takes the output of join_tasks_to_opportunities and returns a compact frame with
+    engagement_score, ENGAGEMENT_LEVELS / EXIT_ASSESSMENTS codes and the strength, weakness and
+    recommendation flags packed into ENGAGEMENT_FLAG_SETS bit fields. Pass the build_notes_features layer of raw_data to
+    reuse its notes keywords; otherwise the notes are normalized from the joined rows.
+    """
+    
+    frame = joined.reset_index(drop=True)
+    content = text_column(frame, 'task_summary').str.lower()
+    converted = frame['full_conversion'].astype(bool)
+    is_sms = frame['task_type'] == 'SMS'
+    is_call = frame['task_type'] == 'Call'
+    
+    # Early exits - nothing else is scored for these rows
+    sms_skipped = is_sms & contains_any(content, ['ignore for analysis', 'no contact'])
+    call_brief = is_call & contains_any(content, ['ignore for analysis', 'call to short'])
+    call_no_contact = is_call & ~call_brief & content.str.contains('no contact', regex=False)
+    live = ~(sms_skipped | call_brief | call_no_contact)
+    sms = is_sms & live
+    call = is_call & live
+    
+    flags = pd.DataFrame(index=frame.index)
+    
+    # Content quality
+    flags['positive_response'] = sms & contains_any(content, ['thanks', 'thank you', 'awesome', 'perfect', 'great'])
+    flags['offers_assistance'] = sms & contains_any(content, ['help', 'support', 'guide', 'assist'])
+    flags['prospect_ready'] = sms & contains_any(content, ['ready', 'start', 'begin', 'driving'])
+    flags['not_recognized'] = sms & contains_any(content, ['who is this', 'who this', "who's this"])
+    flags['minimal_response'] = sms & content.isin(['?', '??', '???', 'stop'])
+    flags['disengaged'] = sms & contains_any(content, ['not interested', 'busy'])
+    flags['call_assistance'] = call & contains_any(content, ['discussed', 'explained', 'helped', 'guided'])
+    flags['proactive_follow_up'] = call & contains_any(content, ['follow up', 'check in'])
+    
+    # Notes capture and integration
+    if notes_layer is None:
+        notes_layer = build_notes_features(frame)
+        opp_rows = frame.index.values
+    else:
+        opp_rows = frame['opp_row'].values
+    captured = notes_layer['captured'].iloc[opp_rows].set_axis(frame.index)
+    referenced = match_notes_keywords(opp_rows, content.values, notes_layer).set_axis(frame.index)
+    has_notes = live & (captured['captured_count'] > 0)
+    
+    def noted(name):
+        return has_notes & referenced[name]
+    
+    flags['goals_referenced'] = noted('goals')
+    flags['submission_addressed'] = noted('submission_needs')
+    flags['bgc_addressed'] = (has_notes & captured['bgc_timeline'] & contains_any(content, ['bgc', 'background', 'check', 'documents', 'submit', 'paperwork'])) | noted('bgc_timeline')
+    flags['context_used'] = noted('additional')
+    
+    notes_referenced = flags['goals_referenced'] | flags['submission_addressed'] | flags['bgc_addressed'] | flags['context_used']
+    flags['notes_unused'] = has_notes & ~notes_referenced
+    flags['notes_missing'] = live & ~has_notes
+    
+    # Personalization
+    highly_personalized = live & contains_any(content, ['you mentioned', 'you said', 'your goals', 'your timeline', 'your situation'])
+    moderately_personalized = ~highly_personalized & notes_referenced
+    flags['generic_outreach'] = live & ~highly_personalized & ~moderately_personalized
+    
+    # Playbook adherence (identify root → address → pivot)
+    objection = live & contains_any(content, ['nervous', 'scared', 'worried', 'confused', 'how much', 'when paid', 'safe'])
+    addressed = contains_any(content, ['understand', 'help', 'support', 'explain', 'show', 'guide'])
+    pivoted = contains_any(content, ['ready', 'start', 'goals', 'schedule', 'next step'])
+    flags['objection_pivoted'] = objection & addressed & pivoted
+    flags['objection_addressed'] = objection & addressed & ~pivoted
+    flags['objection_missed'] = objection & ~addressed
+    
+    score_weights = {
+        'positive_response': 20, 'offers_assistance': 15, 'prospect_ready': 15,
+        'not_recognized': -25, 'minimal_response': -30, 'disengaged': -20,
+        'call_assistance': 25, 'proactive_follow_up': 15,
+        'goals_referenced': 20, 'submission_addressed': 15, 'bgc_addressed': 15, 'context_used': 15,
+        'notes_unused': -15,
+        'objection_pivoted': 20, 'objection_addressed': 10, 'objection_missed': -15
+    }
+    base_score = pd.Series(30, index=frame.index)
+    for flag, weight in score_weights.items():
+        base_score += flags[flag].astype(int) * weight
+    base_score += highly_personalized.astype(int) * 15 + moderately_personalized.astype(int) * 10
+    
+    # Outcome-based final adjustment, then early-exit scores
+    base_score = base_score.where(~converted, (base_score + 10).clip(lower=60))
+    base_score = base_score.where(converted, (base_score - 5).clip(upper=75))
+    engagement_score = base_score.clip(0, 100)
+    engagement_score[sms_skipped | call_brief] = 0
+    engagement_score[call_no_contact] = 10
+    
+    result = pd.DataFrame({
+        'opportunity_uuid': frame['opportunity_uuid'],
+        'owner_username': frame['owner_username'],
+        'experiment': frame['experiment'],
+        'task_type': frame['task_type'],
+        'converted': converted,
+        'engagement_score': engagement_score.astype(np.int8),
+        'notes_integration': np.select([flags['goals_referenced'], notes_referenced], [2, 1], 0).astype(np.int8),
+        'playbook_adherence': np.select([flags['objection_pivoted'], flags['objection_addressed']], [2, 1], 0).astype(np.int8),
+        'personalization_level': np.select([highly_personalized, moderately_personalized], [2, 1], 0).astype(np.int8),
+        'exit_assessment': np.select([sms_skipped, call_brief, call_no_contact], [1, 2, 3], 0).astype(np.int8)
+    })
+    for column, flag_texts in ENGAGEMENT_FLAG_SETS.items():
+        result[column] = pack_flags(flags, flag_texts)
+    if 'include_in_conext_analysis' in frame.columns:
+        result['include_in_conext_analysis'] = frame['include_in_conext_analysis']
+    
+    result.index = joined.index
+    return result
+
+# Persisted engagement table - one row per scored task, shared with the other reports
+ENGAGEMENT_TABLE_FILE = 'engagement_scores.npz'
+
+def engagement_ruleset_version():
+    """Hash of the batch scoring code and rule constants - changes whenever a scoring rule does"""
+    
+    import hashlib
+    import inspect
+    
+    scoring_functions = [
+        text_column, contains_any, build_notes_features, build_notes_keyword_index, match_notes_keywords,
+        pack_flags, join_tasks_to_opportunities, score_engagement_batch
+    ]
+    parts = [inspect.getsource(function) for function in scoring_functions]
+    parts.append(repr([NOTES_FIELDS, NOTES_KEYWORD_RULES, ENGAGEMENT_FLAG_SETS, ENGAGEMENT_LEVELS, EXIT_ASSESSMENTS]))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+def engagement_input_fingerprint(tasks_data, raw_data):
+    """Order-sensitive hash of the task rows and the opportunity columns the engagement table was scored from"""
+    
+    import hashlib
+    
+    opp_columns = ['opportunity_uuid', 'owner_username', 'experiment', 'full_conversion'] + list(NOTES_FIELDS.values())
+    opp_columns = [col for col in opp_columns if col in raw_data.columns]
+    task_columns = [col for col in ENGAGEMENT_TASK_COLUMNS if col in tasks_data.columns]
+    
+    digest = hashlib.sha256()
+    for frame in (tasks_data[task_columns], raw_data[opp_columns]):
+        digest.update(repr(list(frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    return digest.hexdigest()
+
+def save_engagement_table(path, engagement, ruleset_version, input_fingerprint):
+    """Write the engagement table column by column to a NumPy .npz archive
+    
+    Numeric and boolean columns are stored as-is; text columns are dictionary-encoded
+    (int32 codes, -1 for missing, plus a unicode categories array) so no pickling is needed.
+    """
+    
+    import os
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    arrays = {
+        '__ruleset_version': np.array(ruleset_version),
+        '__input_fingerprint': np.array(input_fingerprint),
+        '__columns': np.array(list(engagement.columns), dtype=str),
+        '__task_row': engagement.index.to_numpy()
+    }
+    for column in engagement.columns:
+        values = engagement[column]
+        if values.dtype.kind in 'biuf':
+            arrays[column] = values.to_numpy()
+        else:
+            codes, categories = pd.factorize(values)
+            if not all(isinstance(category, str) for category in categories):
+                raise TypeError(f"Engagement column {column} mixes text with other values; cannot dictionary-encode it")
+            arrays[f'{column}__codes'] = codes.astype(np.int32)
+            arrays[f'{column}__categories'] = np.array(list(categories), dtype=str)
+    
+    np.savez_compressed(path, **arrays)
+
+def load_engagement_table(path, columns=None):
+    """Read a saved engagement table, returning (frame indexed by task row, ruleset version, input fingerprint)
+    
+    Returns None when the file does not exist. Pass `columns` to decode only those columns.
+    """
+    
+    import os
+    if not os.path.exists(path):
+        return None
+    
+    with np.load(path, allow_pickle=False) as archive:
+        columns = [column for column in archive['__columns'] if columns is None or column in columns]
+        data = {}
+        for column in columns:
+            if column in archive.files:
+                data[column] = archive[column]
+            else:
+                categories = archive[f'{column}__categories'].astype(object)
+                data[column] = pd.Categorical.from_codes(archive[f'{column}__codes'], categories).astype(object)
+        engagement = pd.DataFrame(data, index=archive['__task_row'])
+        return engagement, str(archive['__ruleset_version']), str(archive['__input_fingerprint'])
+
+def get_engagement_table(tasks_data, raw_data, path, notes_layer=None):
+    """Load the shared engagement table, rescoring and saving it only if the rules or input data changed"""
+    
+    ruleset_version = engagement_ruleset_version()
+    input_fingerprint = engagement_input_fingerprint(tasks_data, raw_data)
+    
+    saved = load_engagement_table(path)
+    if saved is not None and saved[1:] == (ruleset_version, input_fingerprint):
+        print(f"   ♻️  Loaded engagement table ({len(saved[0]):,} scored tasks)")
+        return saved[0]
+    
+    engagement = score_engagement_batch(join_tasks_to_opportunities(tasks_data, raw_data), notes_layer)
+    save_engagement_table(path, engagement, ruleset_version, input_fingerprint)
+    print(f"   💾 Saved engagement table ({len(engagement):,} scored tasks)")
+    return engagement
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Incremental Store - Watermarked local partitions of the BigQuery extracts
+Incremental loads fetch only rows changed since the last run and upsert them by key
+"""
+
+import io
+import os
+import json
+import shutil
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+
+INCREMENTAL_STORE_DIR = 'data/store'
+
+# Changes are re-read this far behind the watermark, so rows that land late in the
+# warehouse (call transcripts, conversion backfills) are still picked up
+DEFAULT_LOOKBACK = timedelta(days=2)
+
+def window_month(today=None):
+    """The month the loader queries cover (the previous calendar month) as 'YYYY-MM'"""
+    today = today or datetime.now(timezone.utc).date()
+    return (today.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+
+def read_text_csv(source):
+    """Read a CSV as its exact text (no type inference, empty stays empty) so rewrites are lossless"""
+    return pd.read_csv(source, dtype=str, keep_default_na=False)
+
+class IncrementalStore:
+    def __init__(self, dataset, key_columns, store_dir=INCREMENTAL_STORE_DIR, lookback=DEFAULT_LOOKBACK):
+        """Partitions of one dataset under store_dir/<dataset>/ as <partition>.csv plus a <partition>.json watermark
+        
+        key_columns identify a record: rows fetched for a key replace every stored row with that key.
+        """
+        self.dataset = dataset
+        self.dataset_dir = os.path.join(store_dir, dataset)
+        self.key_columns = list(key_columns)
+        self.lookback = lookback
+    
+    def partition_path(self, partition):
+        return os.path.join(self.dataset_dir, f"{partition}.csv")
+    
+    def staging_path(self, partition):
+        """Where a loader writes the rows it fetched before they are merged"""
+        return os.path.join(self.dataset_dir, f"{partition}.fetch.csv")
+    
+    def _watermark_path(self, partition):
+        return os.path.join(self.dataset_dir, f"{partition}.json")
+    
+    def changed_since(self, partition):
+        """Date to fetch changes from (watermark minus lookback), or None if the partition needs a full load"""
+        watermark_path = self._watermark_path(partition)
+        if not (os.path.exists(watermark_path) and os.path.exists(self.partition_path(partition))):
+            return None
+        
+        with open(watermark_path) as f:
+            meta = json.load(f)
+        if meta.get('key_columns') != self.key_columns:
+            return None
+        return (datetime.fromisoformat(meta['watermark']) - self.lookback).date()
+    
+    def _key_index(self, frame):
+        return pd.MultiIndex.from_frame(frame[self.key_columns])
+    
+    def merge(self, partition, rows, watermark, replace=False):
+        """Upsert fetched rows into a partition and advance its watermark, returns the merged partition
+        
+        watermark is when the fetch started, so changes made while it ran are re-read next time.
+        replace=True (a full load) discards whatever the partition held. Values are kept as the
+        CSV text the loaders write, so an exported partition reads exactly like a full extract.
+        """
+        rows = read_text_csv(io.StringIO(rows.to_csv(index=False)))
+        partition_path = self.partition_path(partition)
+        
+        if replace or not os.path.exists(partition_path):
+            merged = rows
+            inserted, updated = rows[self.key_columns].drop_duplicates().shape[0], 0
+        else:
+            existing = read_text_csv(partition_path)
+            existing_keys, fetched_keys = self._key_index(existing), self._key_index(rows)
+            changed = existing_keys.isin(fetched_keys)
+            
+            # Unchanged rows keep their order; re-fetched and new keys follow in fetch order
+            merged = pd.concat([existing[~changed], rows], ignore_index=True)
+            updated = existing_keys[changed].nunique()
+            inserted = fetched_keys.nunique() - updated
+        
+        # Drop the watermark before replacing the partition so a partial update is never trusted
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        watermark_path = self._watermark_path(partition)
+        if os.path.exists(watermark_path):
+            os.remove(watermark_path)
+        merged.to_csv(f"{partition_path}.tmp", index=False)
+        os.replace(f"{partition_path}.tmp", partition_path)
+        with open(watermark_path, 'w') as f:
+            json.dump({
+                'dataset': self.dataset,
+                'partition': partition,
+                'key_columns': self.key_columns,
+                'watermark': watermark.isoformat(),
+                'rows': len(merged)
+            }, f, indent=2)
+        
+        print(f"🧩 {self.dataset} {partition}: {inserted:,} new, {updated:,} updated, {len(merged):,} stored (watermark {watermark:%Y-%m-%d %H:%M} UTC)")
+        return merged
+    
+    def export(self, partition, output_file):
+        """Write a partition out as a loader's regular output file"""
+        shutil.copyfile(self.partition_path(partition), output_file)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Sheet Cache - Local copies of Google Sheets CSV exports (or any HTTP CSV)
+Revalidates each copy with ETag / Last-Modified so unchanged sheets are never downloaded twice
+"""
+
+import os
+import json
+import hashlib
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+SHEET_CACHE_DIR = 'data/cache/sheets'
+
+class SheetCache:
+    def __init__(self, cache_dir=SHEET_CACHE_DIR, timeout=60):
+        """Cache downloads under cache_dir as <url hash>.csv with a <url hash>.json validator sidecar"""
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+    
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.csv"), os.path.join(self.cache_dir, f"{key}.json")
+    
+    def fetch(self, url):
+        """Return a local path holding url's current content, downloading only if it changed
+        
+        A cached copy is revalidated with If-None-Match / If-Modified-Since; a 304 reuses it.
+        If the server cannot be reached, the cached copy is used with a warning.
+        """
+        data_path, meta_path = self._paths(url)
+        meta = {}
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        
+        request = urllib.request.Request(url)
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+        
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                print(f"♻️  Sheet unchanged, using cached copy: {url}")
+                return data_path
+            raise
+        except OSError as e:
+            # Connection failures and timeouts (URLError is an OSError too)
+            if meta:
+                print(f"⚠️  Could not reach {url} ({getattr(e, 'reason', e)}), using cached copy from {meta.get('fetched_at')}")
+                return data_path
+            raise
+        
+        # Drop the old validators before replacing the copy so a partial update is never trusted
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        temp_path = f"{data_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, data_path)
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': datetime.now().isoformat()
+            }, f, indent=2)
+        
+        print(f"⬇️  Downloaded {len(content):,} bytes: {url}")
+        return data_path
@@ -0,0 +1,16 @@
+"""
+DDOK Paths - Puts the shared FGS modules (shared/) on sys.path and locates the DDOK service account key
+Scripts in this folder import it before the BigQuery client or query cache: import ddok_paths
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# FGS/shared, three levels up from SMS Analysis/DDOK/scripts
+SHARED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(SCRIPTS_DIR))), 'shared')
+# Opted into with bigquery_client.use_service_account_key; only the DDOK scripts use it
+SERVICE_ACCOUNT_KEY = os.path.join(os.path.dirname(SCRIPTS_DIR), 'agent', 'gcp_key.json')
+
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
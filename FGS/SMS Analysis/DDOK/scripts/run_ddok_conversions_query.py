@@ -9,10 +9,13 @@ Prerequisites:
 """
 
 import csv
-from google.cloud import bigquery
+import argparse
+import ddok_paths
+from bigquery_client import query_to_rows, use_service_account_key
+from query_cache import get_query_cache
 
-def run_ddok_conversions_query():
-    """Run the DDOK experiment conversions query and save results"""
+def run_ddok_conversions_query(use_cache=True):
+    """Run the DDOK experiment conversions query and save results (use_cache=False skips the local result cache)"""
     
     query = """
     with tags as (
@@ -50,27 +53,13 @@ def run_ddok_conversions_query():
     """
     
     try:
-        # Initialize BigQuery client
-        client = bigquery.Client(project="getsaleswarehouse")
-        print("Connected to BigQuery")
-        
         # Run query
         print("Executing conversions query...")
-        query_job = client.query(query)
-        results = query_job.result()
-        
-        # Convert to list first to avoid pandas dependency issues
-        rows = []
-        schema = results.schema
-        
-        for row in results:
-            rows.append(dict(row))
+        rows, columns = query_to_rows(query, use_cache=use_cache, label="ddok conversions")
         
         print(f"Query successful! Retrieved {len(rows)} rows")
         
         if len(rows) > 0:
-            # Get column names from schema
-            columns = [field.name for field in schema]
             print(f"Columns: {columns}")
             
             print("\nFirst 5 rows:")
@@ -136,4 +125,11 @@ def run_ddok_conversions_query():
         return None
 
 if __name__ == "__main__":
-    run_ddok_conversions_query()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the DDOK experiment conversions query")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and query BigQuery")
+    args = parser.parse_args()
+    
+    # The DDOK scripts authenticate with the DDOK service account when its key is present
+    use_service_account_key(ddok_paths.SERVICE_ACCOUNT_KEY)
+    run_ddok_conversions_query(use_cache=not args.no_cache)
+    get_query_cache().report()
\ No newline at end of file
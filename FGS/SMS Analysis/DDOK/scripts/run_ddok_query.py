@@ -8,11 +8,14 @@ Prerequisites:
 3. Set project: gcloud config set project getsaleswarehouse
 """
 
+import argparse
 import pandas as pd
-from google.cloud import bigquery
+import ddok_paths
+from bigquery_client import query_to_rows, use_service_account_key
+from query_cache import get_query_cache
 
-def run_ddok_query():
-    """Run the DDOK experiment query and save results"""
+def run_ddok_query(use_cache=True):
+    """Run the DDOK experiment query and save results (use_cache=False skips the local result cache)"""
     
     query = """
     with tags as (
@@ -54,27 +57,13 @@ def run_ddok_query():
     """
     
     try:
-        # Initialize BigQuery client
-        client = bigquery.Client(project="getsaleswarehouse")
-        print("Connected to BigQuery")
-        
         # Run query
         print("Executing query...")
-        query_job = client.query(query)
-        results = query_job.result()
-        
-        # Convert to list first to avoid pandas dependency issues
-        rows = []
-        schema = results.schema
-        
-        for row in results:
-            rows.append(dict(row))
+        rows, columns = query_to_rows(query, use_cache=use_cache, label="ddok sms messages")
         
         print(f"Query successful! Retrieved {len(rows)} rows")
         
         if len(rows) > 0:
-            # Get column names from schema
-            columns = [field.name for field in schema]
             print(f"Columns: {columns}")
             
             print("\nFirst 5 rows:")
@@ -122,4 +111,11 @@ def run_ddok_query():
         return None
 
 if __name__ == "__main__":
-    run_ddok_query()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the DDOK experiment query")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and query BigQuery")
+    args = parser.parse_args()
+    
+    # The DDOK scripts authenticate with the DDOK service account when its key is present
+    use_service_account_key(ddok_paths.SERVICE_ACCOUNT_KEY)
+    run_ddok_query(use_cache=not args.no_cache)
+    get_query_cache().report()
\ No newline at end of file
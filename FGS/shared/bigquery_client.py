@@ -0,0 +1,210 @@
+import os
+import importlib
+import threading
+import pandas as pd
+from google.cloud import bigquery
+from dotenv import load_dotenv
+from query_cache import cache_key, get_query_cache
+
+load_dotenv()
+
+DEFAULT_PROJECT = "getsaleswarehouse"
+# Service account key file a script opted into with use_service_account_key (None -> default credentials)
+_service_account_key = None
+
+def bigquery_backend(project):
+    """Build a real BigQuery client: default credentials, or the service account key the script opted into
+    
+    Credentials are passed to the client directly, so GOOGLE_APPLICATION_CREDENTIALS is never changed.
+    """
+    key_file = _service_account_key
+    if key_file and os.path.exists(key_file) and not os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"):
+        try:
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_file(key_file)
+            return bigquery.Client(project=project, credentials=credentials)
+        except Exception as e:
+            print(f"Service account auth failed: {e}")
+            print("Trying with default credentials...")
+    return bigquery.Client(project=project)
+
+def _backend_from_environment():
+    """Backend named by BIGQUERY_CLIENT_BACKEND ("module:function"), so subprocess stages can be pointed at a stand-in"""
+    backend_name = os.environ.get("BIGQUERY_CLIENT_BACKEND")
+    if not backend_name:
+        return bigquery_backend
+    module_name, _, function_name = backend_name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+class ClientProvider:
+    def __init__(self, backend=None):
+        """One client per project for the whole process, built on first use by backend(project)
+        
+        The client (and with it the credentials and pooled HTTP connections) is shared by every
+        loader and query. Creation is locked, so concurrent first calls still build one client.
+        """
+        self._backend = backend
+        self._clients = {}
+        self._lock = threading.Lock()
+    
+    def get(self, project=DEFAULT_PROJECT):
+        client = self._clients.get(project)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(project)
+                if client is None:
+                    if self._backend is None:
+                        self._backend = _backend_from_environment()
+                    client = self._backend(project)
+                    self._clients[project] = client
+        return client
+    
+    def set_backend(self, backend):
+        """Swap the client factory (e.g. a local stand-in for tests) and drop clients already built"""
+        with self._lock:
+            self._backend = backend
+            self._clients = {}
+    
+    def clear(self):
+        """Drop clients already built, so the next get() builds a fresh one"""
+        with self._lock:
+            self._clients = {}
+
+_client_provider = ClientProvider()
+
+def set_client_backend(backend):
+    """Build every client from here on with backend(project) instead of the real BigQuery client"""
+    _client_provider.set_backend(backend)
+
+def use_service_account_key(key_file):
+    """Authenticate real clients with the service account in key_file (when it exists) from here on
+    
+    Opt-in per script: only callers that own a key pass one (the DDOK scripts use
+    DDOK/agent/gcp_key.json); everything else, the Lyft loaders included, keeps default credentials.
+    """
+    global _service_account_key
+    _service_account_key = key_file
+    _client_provider.clear()
+
+def get_bigquery_client(project=DEFAULT_PROJECT):
+    """Shared BigQuery client for project, created on first use"""
+    return _client_provider.get(project)
+
+def query_to_rows(query_string, use_cache=True, label="query"):
+    """Execute BigQuery query and return (rows as dicts, column names), using the local result cache
+    
+    Rows served from the cache hold each value as its text (None stays None), which is
+    exactly what the CSV writers save. use_cache=False always queries and refreshes the entry.
+    """
+    cache = get_query_cache()
+    key = cache_key(query_string, params={"result": "rows"})
+    cached = cache.get(key, label=label) if use_cache else None
+    if cached is not None:
+        cached = cached.astype(object).where(cached.notna(), None)
+        return cached.to_dict("records"), list(cached.columns)
+    
+    client = get_bigquery_client()
+    results = client.query(query_string).result()
+    rows = [dict(row) for row in results]
+    columns = [field.name for field in results.schema]
+    
+    cache.put(key, pd.DataFrame(rows, columns=columns, dtype=object), label=label)
+    return rows, columns
+
+def run_query(query_string, use_cache=True):
+    """Execute BigQuery query and return its rows as dicts"""
+    try:
+        rows, _ = query_to_rows(query_string, use_cache=use_cache)
+        return rows
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        return None
+
+def query_to_dataframe(query_string, use_cache=True):
+    """Execute BigQuery query and return as pandas DataFrame (from the local result cache while it is fresh)"""
+    cache = get_query_cache()
+    key = cache_key(query_string, params={"result": "dataframe"})
+    cached = cache.get(key) if use_cache else None
+    if cached is not None:
+        return cached
+    
+    client = get_bigquery_client()
+    
+    try:
+        query_job = client.query(query_string)
+        # Get results as rows first, then convert to dataframe manually
+        results = query_job.result()
+        
+        # Convert to list of dictionaries
+        rows = []
+        for row in results:
+            rows.append(dict(row))
+        
+        # Convert to pandas DataFrame
+        df = pd.DataFrame(rows)
+        cache.put(key, df)
+        return df
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        return None
+
+# Example usage
+if __name__ == "__main__":
+    # Your query
+    query = """
+    with tags as (
+      select 
+      opportunity_uuid
+      ,lower(tag) like '%ai_agent%' ai_agent_tag
+      from getsales.tags
+      where lower(tag) in (
+              -- ddok experiment
+               'doordash_manned_sms_ddok_ai_agent_initial_unattempted_treatment'
+              ,'doordash_manned_sms_ddok_ai_agent_initial_unattempted_control'
+              ,'doordash_manned_sms_ddok_initial_unattempted_b_treatment'
+              ,'doordash_manned_sms_ddok_initial_unattempted_b_control'
+              ,'doordash_manned_sms_ddok_ai_agent_missed_unattempted_control'
+              ,'doordash_manned_sms_ddok_ai_agent_missed_unattempted_treatment'
+              ,'doordash_manned_sms_ddok_missed_unattempted_b_treatment'
+              ,'doordash_manned_sms_ddok_missed_unattempted_b_control'
+              )
+      and tag_creation_timestamp >= '2025-04-01'        
+    )      
+
+    select
+     oa.opportunity_uuid
+    ,oa.owner_username task_owner
+    ,oa.message
+    ,oa.direction
+    ,oa.overall_task_rank
+    ,dd.owner_username lead_owner
+    ,oa.task_datetime_cst
+    from `getsaleswarehouse.gsi_mart_core.sms_materialized_outreach_activities` oa 
+    join `getsaleswarehouse.gsi_mart_dd.dd_dim_opp` dd on oa.opportunity_uuid = dd.opportunity_uuid
+    join tags t on t.opportunity_uuid = oa.opportunity_uuid
+    where 1=1
+    and task_type = 'SMS'
+    """
+    
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the DDOK experiment query")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and query BigQuery")
+    args = parser.parse_args()
+    
+    # Execute query
+    print("Executing BigQuery query...")
+    df = query_to_dataframe(query, use_cache=not args.no_cache)
+    
+    if df is not None:
+        print(f"Query successful! Retrieved {len(df)} rows")
+        print("\nFirst 5 rows:")
+        print(df.head())
+        print(f"\nColumns: {list(df.columns)}")
+        
+        # Save to CSV
+        df.to_csv('ddok_experiment_results.csv', index=False)
+        print(f"\nResults saved to ddok_experiment_results.csv")
+    else:
+        print("Query failed")
+    get_query_cache().report()
\ No newline at end of file
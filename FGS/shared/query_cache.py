@@ -0,0 +1,281 @@
+"""
+Local cache of BigQuery query results, keyed by the query itself.
+
+Entries are columnar .npz files under data/cache/queries: one array per column,
+text columns dictionary-encoded, nothing pickled. Extracts written straight to
+CSV are cached as a copy of that file instead, never parsed. The key is a hash
+of the normalized SQL, its parameters and the resolved date window, so
+re-running an unchanged extract during the same window reads it back from disk
+instead of the warehouse. Entries expire after a TTL, and the least recently
+used ones are evicted once the cache grows past its size limit.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+QUERY_CACHE_DIR = os.environ.get("QUERY_CACHE_DIR", "data/cache/queries")
+QUERY_CACHE_TTL = 6 * 60 * 60          # seconds an entry stays fresh
+QUERY_CACHE_MAX_BYTES = 2 * 1024 ** 3  # evict least recently used entries past this size
+
+# Data file formats an entry can be stored in: a columnar frame or a copied CSV file
+ENTRY_KINDS = ("npz", "csv")
+
+# Queries relative to today resolve to a different window every day
+RELATIVE_DATE_PATTERN = re.compile(r"\bcurrent_(date|datetime|timestamp)\b", re.IGNORECASE)
+
+def normalize_sql(query_string):
+    """SQL with comments dropped and whitespace collapsed, so formatting changes keep the same key"""
+    without_comments = re.sub(r"--[^\n]*", " ", query_string)
+    return " ".join(without_comments.split())
+
+def cache_key(query_string, params=None, window=None):
+    """Hash of the normalized SQL, its parameters and the date window it resolves to
+    
+    window defaults to today's (UTC) date for SQL that uses current_date and
+    friends, and to nothing for SQL with fixed dates.
+    """
+    sql = normalize_sql(query_string)
+    if window is None and RELATIVE_DATE_PATTERN.search(sql):
+        window = datetime.now(timezone.utc).date().isoformat()
+    payload = json.dumps({
+        "sql": sql,
+        "params": {str(name): str(value) for name, value in (params or {}).items()},
+        "window": str(window) if window is not None else None
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _encode_text(values):
+    """Dictionary-encode a column as int32 codes (-1 missing) plus UTF-8 categories with offsets"""
+    texts = [None if pd.isna(value) else str(value) for value in values.astype(object)]
+    codes, categories = pd.factorize(pd.Series(texts, dtype=object))
+    encoded = [category.encode("utf-8") for category in categories]
+    offsets = np.cumsum([0] + [len(text) for text in encoded], dtype=np.int64)
+    return codes.astype(np.int32), np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _decode_text(codes, buffer, offsets):
+    """Object column back from codes, a UTF-8 buffer and offsets (missing -> None)"""
+    data = buffer.tobytes()
+    categories = [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+    return np.array(categories + [None], dtype=object)[codes]
+
+def write_columnar(frame, path):
+    """Write a DataFrame as a columnar .npz: numbers, booleans and datetimes as-is, everything else as text"""
+    arrays = {
+        "__columns": np.array([str(column) for column in frame.columns], dtype=str),
+        "__kinds": np.empty(len(frame.columns), dtype="<U8")
+    }
+    for position, column in enumerate(frame.columns):
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            timezone_name = getattr(values.dt, "tz", None)
+            arrays["__kinds"][position] = "datetime"
+            arrays[f"{position}__tz"] = np.array(str(timezone_name) if timezone_name is not None else "")
+            arrays[str(position)] = (values.dt.tz_convert(None) if timezone_name is not None else values).to_numpy()
+        elif values.dtype.kind in "biuf" and values.to_numpy().dtype != object:
+            # Nullable integer/boolean columns holding NA would need pickling, so they go as text
+            arrays["__kinds"][position] = "number"
+            arrays[str(position)] = values.to_numpy()
+        else:
+            arrays["__kinds"][position] = "text"
+            arrays[f"{position}__codes"], arrays[f"{position}__text"], arrays[f"{position}__offsets"] = _encode_text(values)
+    
+    # A temporary file of its own, so concurrent writers of one entry never share it
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(handle, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, path)
+
+def read_columnar(path):
+    """Read a DataFrame written by write_columnar"""
+    with np.load(path, allow_pickle=False) as archive:
+        data = {}
+        for position, (column, kind) in enumerate(zip(archive["__columns"].tolist(), archive["__kinds"].tolist())):
+            if kind == "datetime":
+                values = pd.Series(archive[str(position)])
+                timezone_name = str(archive[f"{position}__tz"])
+                data[column] = values.dt.tz_localize("UTC").dt.tz_convert(timezone_name) if timezone_name else values
+            elif kind == "number":
+                data[column] = archive[str(position)]
+            else:
+                data[column] = _decode_text(archive[f"{position}__codes"], archive[f"{position}__text"], archive[f"{position}__offsets"])
+        return pd.DataFrame(data)
+
+class QueryCache:
+    def __init__(self, cache_dir=QUERY_CACHE_DIR, ttl=QUERY_CACHE_TTL, max_bytes=QUERY_CACHE_MAX_BYTES):
+        """Entries live in cache_dir as <key>.npz with a <key>.json sidecar (created, last used, size)"""
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def _paths(self, key, kind="npz"):
+        return os.path.join(self.cache_dir, f"{key}.{kind}"), os.path.join(self.cache_dir, f"{key}.json")
+    
+    def _remove(self, key):
+        for path in [self._paths(key, kind)[0] for kind in ENTRY_KINDS] + [self._paths(key)[1]]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def _read_meta(self, meta_path):
+        """A sidecar's contents, or None if it is gone
+        
+        Loaders running side by side share the cache directory, so another process can evict or
+        rewrite any entry between two steps here; an entry that vanished is treated as a miss.
+        """
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _write_meta(self, meta_path, meta):
+        """Replace a sidecar in one step, so it is never read half-written"""
+        handle, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, meta_path)
+    
+    def _miss(self, label):
+        self.misses += 1
+        print(f"Query cache miss: {label}")
+        return None
+    
+    def _lookup(self, key, kind, label):
+        """Sidecar of a fresh entry for key stored as kind, or None (counted as a miss)"""
+        data_path, meta_path = self._paths(key, kind)
+        meta = self._read_meta(meta_path) if os.path.exists(data_path) else None
+        
+        if meta is None or time.time() - meta["created_at"] > self.ttl:
+            if meta is not None:
+                self._remove(key)
+            return self._miss(label)
+        return meta
+    
+    def _record_hit(self, key, meta, label):
+        meta["last_used_at"] = time.time()
+        self._write_meta(self._paths(key)[1], meta)
+        
+        self.hits += 1
+        age_minutes = (time.time() - meta["created_at"]) / 60
+        print(f"Query cache hit: {label} ({meta['rows']:,} rows, cached {age_minutes:.0f} min ago)")
+    
+    def _store(self, key, data_path, rows, label):
+        """Write the sidecar for a data file already in place, then evict"""
+        try:
+            size = os.path.getsize(data_path)
+        except FileNotFoundError:
+            # Another writer of the same key replaced the entry first; its sidecar follows
+            return
+        now = time.time()
+        self._write_meta(self._paths(key)[1], {
+            "label": label,
+            "rows": rows,
+            "bytes": size,
+            "created_at": now,
+            "last_used_at": now
+        })
+        
+        self.evict(keep=key)
+    
+    def get(self, key, label="query"):
+        """Cached result for key as a DataFrame, or None if it is missing or expired"""
+        meta = self._lookup(key, "npz", label)
+        if meta is None:
+            return None
+        
+        try:
+            frame = read_columnar(self._paths(key)[0])
+        except FileNotFoundError:
+            return self._miss(label)
+        self._record_hit(key, meta, label)
+        return frame
+    
+    def get_file(self, key, output_file, label="query"):
+        """Copy the CSV cached for key to output_file, returns its row count or None if it is missing or expired"""
+        meta = self._lookup(key, "csv", label)
+        if meta is None:
+            return None
+        
+        try:
+            cached_file = open(self._paths(key, "csv")[0], "rb")
+        except FileNotFoundError:
+            return self._miss(label)
+        # An open file stays readable even if the entry is evicted mid-copy
+        with cached_file, open(output_file, "wb") as f:
+            shutil.copyfileobj(cached_file, f)
+        self._record_hit(key, meta, label)
+        return meta["rows"]
+    
+    def put(self, key, frame, label="query"):
+        """Store a result under key, then evict expired and least recently used entries over the size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Drop the old entry first so a half-written one is never read
+        self._remove(key)
+        data_path = self._paths(key)[0]
+        write_columnar(frame, data_path)
+        self._store(key, data_path, len(frame), label)
+    
+    def put_file(self, key, source_file, rows, label="query"):
+        """Store a copy of the CSV source_file (rows data rows) under key, then evict like put"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove(key)
+        data_path = self._paths(key, "csv")[0]
+        handle, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(handle, "wb") as f, open(source_file, "rb") as source:
+            shutil.copyfileobj(source, f)
+        os.replace(temp_path, data_path)
+        self._store(key, data_path, rows, label)
+    
+    def evict(self, keep=None):
+        """Remove expired entries, then the least recently used ones (never keep) until the cache fits max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            meta = self._read_meta(os.path.join(self.cache_dir, name))
+            if meta is None:
+                continue
+            if time.time() - meta["created_at"] > self.ttl:
+                self._remove(key)
+            else:
+                entries.append((meta["last_used_at"], meta["bytes"], key))
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total_bytes -= size
+    
+    def report(self):
+        """One-line hit/miss summary for the end of a run"""
+        lookups = self.hits + self.misses
+        if lookups:
+            print(f"Query cache: {self.hits} hit(s), {self.misses} miss(es) ({self.hits / lookups:.0%} served from {self.cache_dir})")
+
+_default_cache = None
+
+def get_query_cache():
+    """Process-wide cache, so hits and misses are counted across every query in a run"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QueryCache()
+    return _default_cache